@@ -33,12 +33,56 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 from loguru import logger
 
+from config import BOT_CONFIG
+from utils import file_suffix
+
 SCREENSHOT_DIR = "data/screenshots"
 
+# Returns the first visible Kendo dropdown wrapper following a <label> whose text
+# contains arguments[0], or null if none is rendered yet
+JS_DROPDOWN_FOR_LABEL = """
+const labels = document.evaluate(
+    "//label[contains(normalize-space(text()), '" + arguments[0] + "')]",
+    document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+for (let i = 0; i < labels.snapshotLength; i++) {
+    const span = document.evaluate("following::span[contains(@class,'k-dropdown')][1]",
+        labels.snapshotItem(i), null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    if (span && (span.offsetWidth || span.offsetHeight || span.getClientRects().length)) return span;
+}
+return null;
+"""
+
 def _ensure_dir(path: str):
     if not os.path.exists(path):
         os.makedirs(path, exist_ok=True)
 
+# Selects an option through the Kendo DropDownList API for the widget following the
+# <label> containing arguments[0]. Returns 'selected', 'pending' (widget or its
+# cascaded data not loaded yet), 'missing' (data loaded but no option matches) or
+# 'unsupported' (no jQuery/Kendo on the page).
+JS_KENDO_SELECT = """
+if (typeof kendo === 'undefined' || !window.jQuery) return 'unsupported';
+const want = arguments[1].toLowerCase();
+const labels = document.evaluate(
+    "//label[contains(normalize-space(text()), '" + arguments[0] + "')]",
+    document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+for (let i = 0; i < labels.snapshotLength; i++) {
+    const input = document.evaluate("following::*[@data-role='dropdownlist'][1]",
+        labels.snapshotItem(i), null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    const ddl = input && jQuery(input).data('kendoDropDownList');
+    if (!ddl || !ddl.wrapper.is(':visible')) continue;
+    const field = ddl.options.dataTextField;
+    const matches = item => String(field ? item[field] : item).toLowerCase().indexOf(want) !== -1;
+    const data = ddl.dataSource.view();
+    if (!data.length || ddl.element.is('[disabled]')) return 'pending';
+    if (!data.some(matches)) return 'missing';
+    ddl.select(matches);
+    ddl.trigger('change');
+    return 'selected';
+}
+return 'pending';
+"""
+
 
 class AppointmentFormHandler:
     """High-level helper to complete the New Appointment form."""
@@ -47,6 +91,9 @@ class AppointmentFormHandler:
         self.driver = driver
         self.bot = bot_instance
         _ensure_dir(SCREENSHOT_DIR)
+        # Shared explicit wait – polls faster than the 0.5s default so each step
+        # proceeds as soon as the DOM is ready
+        self._wait = WebDriverWait(self.driver, 10, poll_frequency=0.2)
 
         # Load configuration from environment
         self.city = os.getenv("CITY_NAME") or os.getenv("APPT_CITY")
@@ -54,6 +101,13 @@ class AppointmentFormHandler:
         self.visa_sub_type = os.getenv("VISA_SUB_TYPE")
         self.category = os.getenv("VISA_CATEGORY")
         self.appointment_for = (os.getenv("APPOINTMENT_FOR") or "Individual").strip().lower()
+        # Drive Kendo widgets through their JS API instead of open/scroll/click;
+        # unless set explicitly, only when stealth is below full
+        fast_select = os.getenv("KENDO_FAST_SELECT")
+        if fast_select:
+            self.kendo_fast_select = fast_select.lower() == "true"
+        else:
+            self.kendo_fast_select = BOT_CONFIG["stealth_level"] < 2
 
     # ------------------------------------------------------------------
     # Public API
@@ -88,21 +142,24 @@ class AppointmentFormHandler:
         if not option_text:
             logger.error(f"[AppointmentForm] No option text provided for dropdown '{label_text}'")
             return False
+        if self.kendo_fast_select:
+            outcome = self._kendo_select(label_text, option_text)
+            if outcome == 'selected':
+                return True
+            if outcome == 'missing':
+                # The list is loaded, so the click path would only time out as well
+                logger.error(f"[AppointmentForm] Option '{option_text}' not available in '{label_text}' dropdown")
+                self._debug_screenshot(f"dropdown_{label_text.replace(' ','_')}_missing")
+                return False
         try:
             logger.info(f"[AppointmentForm] Selecting '{option_text}' in '{label_text}' dropdown")
-            # Locate ALL matching labels; choose the first whose associated dropdown is visible
-            label_xpath = f"//label[contains(normalize-space(text()), '{label_text}')]"
-            all_labels = self.driver.find_elements(By.XPATH, label_xpath)
-            dropdown_wrap = None
-            for lbl in all_labels:
-                try:
-                    cand = lbl.find_element(By.XPATH, "following::span[contains(@class,'k-dropdown')][1]")
-                    if cand.is_displayed():
-                        dropdown_wrap = cand
-                        break
-                except Exception:
-                    continue
-            if dropdown_wrap is None:
+            # Resolve label -> first visible Kendo dropdown in-page and keep retrying
+            # until it renders (auto-waiting locator), instead of one round-trip per label
+            try:
+                dropdown_wrap = self._wait.until(
+                    lambda d: d.execute_script(JS_DROPDOWN_FOR_LABEL, label_text)
+                )
+            except TimeoutException:
                 raise NoSuchElementException(f"Visible dropdown for '{label_text}' not found")
             # Scroll into view & click
             self.bot.move_to_element_with_randomness(dropdown_wrap)
@@ -115,7 +172,7 @@ class AppointmentFormHandler:
                 list_xpath = "//ul[contains(@class,'k-list') and not(contains(@style,'display: none'))]/li"
             # Wait for list to render and desired option to appear
             option_xpath = f"{list_xpath}[contains(translate(normalize-space(text()),'ABCDEFGHIJKLMNOPQRSTUVWXYZ','abcdefghijklmnopqrstuvwxyz'), '{option_text.lower()}')]"
-            option_elem = WebDriverWait(self.driver, 10).until(
+            option_elem = self._wait.until(
                 EC.element_to_be_clickable((By.XPATH, option_xpath))
             )
             self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", option_elem)
@@ -124,24 +181,52 @@ class AppointmentFormHandler:
             except Exception:
                 # Sometimes intercepted; try JS click
                 self.driver.execute_script("arguments[0].click();", option_elem)
-            time.sleep(random.uniform(0.6, 1.0))
+            # Wait for the popup to close instead of a fixed pause
+            try:
+                self._wait.until(EC.invisibility_of_element(option_elem))
+            except TimeoutException:
+                logger.debug(f"[AppointmentForm] Listbox for '{label_text}' still open after selection")
             return True
         except Exception as exc:
             logger.error(f"[AppointmentForm] Failed selecting '{option_text}' in '{label_text}': {exc}")
             self._debug_screenshot(f"dropdown_{label_text.replace(' ','_')}_error")
             return False
 
+    def _kendo_select(self, label_text: str, option_text: str) -> Optional[str]:
+        """Select via the Kendo API, waiting for cascaded data to load. Returns 'selected',
+        'missing' when the loaded data has no matching option, or None to use the click path."""
+        def attempt(d):
+            outcome = d.execute_script(JS_KENDO_SELECT, label_text, option_text)
+            return outcome if outcome != 'pending' else False
+
+        try:
+            result = self._wait.until(attempt)
+        except TimeoutException:
+            logger.debug(f"[AppointmentForm] Kendo API could not select '{option_text}' in '{label_text}'")
+            return None
+        except Exception as exc:
+            logger.debug(f"[AppointmentForm] Kendo API selection failed for '{label_text}': {exc}")
+            return None
+        if result == 'unsupported':
+            logger.debug("[AppointmentForm] Kendo not available on page – using click-based selection")
+            self.kendo_fast_select = False
+            return None
+        if result == 'missing':
+            return result
+        logger.info(f"[AppointmentForm] Selected '{option_text}' in '{label_text}' via Kendo API")
+        return result
+
     def _select_appointment_for(self) -> bool:
         try:
             value = "Individual" if self.appointment_for != "family" else "Family"
             logger.info(f"[AppointmentForm] Choosing appointment for: {value}")
             radio_xpath = f"//input[@type='radio' and translate(@value,'ABCDEFGHIJKLMNOPQRSTUVWXYZ','abcdefghijklmnopqrstuvwxyz')='{value.lower()}']"
-            radio = WebDriverWait(self.driver, 5).until(
+            radio = WebDriverWait(self.driver, 5, poll_frequency=0.2).until(
                 EC.element_to_be_clickable((By.XPATH, radio_xpath))
             )
             self.bot.move_to_element_with_randomness(radio)
             radio.click()
-            time.sleep(random.uniform(0.2, 0.4))
+            WebDriverWait(self.driver, 2, poll_frequency=0.1).until(EC.element_to_be_selected(radio))
             return True
         except Exception as exc:
             logger.error(f"[AppointmentForm] Failed to set 'Appointment For': {exc}")
@@ -151,12 +236,17 @@ class AppointmentFormHandler:
     def _click_submit(self) -> bool:
         try:
             logger.info("[AppointmentForm] Clicking Submit button")
-            submit_btn = WebDriverWait(self.driver, 5).until(
+            submit_btn = WebDriverWait(self.driver, 5, poll_frequency=0.2).until(
                 EC.element_to_be_clickable((By.XPATH, "//button[contains(@type,'submit') or contains(text(),'Submit')]"))
             )
+            current_url = self.driver.current_url
             self.bot.move_to_element_with_randomness(submit_btn)
             submit_btn.click()
-            time.sleep(random.uniform(2.0, 3.0))
+            # Proceed once the page navigates (URL change or the button detaches)
+            try:
+                self._wait.until(lambda d: d.current_url != current_url or EC.staleness_of(submit_btn)(d))
+            except TimeoutException:
+                logger.debug("[AppointmentForm] No navigation detected within 10s after submit")
             return True
         except Exception as exc:
             logger.error(f"[AppointmentForm] Failed to click submit: {exc}")
@@ -166,7 +256,7 @@ class AppointmentFormHandler:
     # ------------------------------------------------------------------
 
     def _debug_screenshot(self, name: str):
-        path = os.path.join(SCREENSHOT_DIR, f"{name}_{int(time.time())}.png")
+        path = os.path.join(SCREENSHOT_DIR, f"{name}_{int(time.time())}{file_suffix(getattr(self.bot, 'account_tag', ''))}.png")
         try:
             self.driver.save_screenshot(path)
             logger.info(f"[AppointmentForm] Screenshot saved: {path}")
@@ -17,24 +17,127 @@ from datetime import datetime
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait, Select
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException, ElementNotInteractableException
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, ElementNotInteractableException, StaleElementReferenceException
 from selenium.webdriver.common.action_chains import ActionChains
 from loguru import logger
 
+try:
+    import orjson  # optional, much faster JSON encoder
+except ImportError:
+    orjson = None
+
+from config import BOT_CONFIG, SCRAPED_DATA_DIR
+from utils import human_sleep, is_login_url, file_suffix
+from backend.captcha.captcha_utils import is_captcha_present, solve_captcha
+
+# Captcha retry backoff: exponential with full jitter, capped per wait
+CAPTCHA_RETRY_MAX_TRIES = 4
+CAPTCHA_RETRY_BASE_DELAY = 2.0
+CAPTCHA_RETRY_MAX_DELAY = 60.0
+
+# Runs several XPath/CSS queries in one round-trip. arguments[0] maps a name to a
+# selector (XPath if it starts with '/' or '('); each name maps to the visible
+# matches as {el, text, enabled}
+JS_BATCH_QUERY = """
+const visible = el => !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+const out = {};
+for (const [name, sel] of Object.entries(arguments[0])) {
+    let nodes = [];
+    if (sel.startsWith('/') || sel.startsWith('(')) {
+        const snap = document.evaluate(sel, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        for (let i = 0; i < snap.snapshotLength; i++) nodes.push(snap.snapshotItem(i));
+    } else {
+        nodes = Array.from(document.querySelectorAll(sel));
+    }
+    out[name] = nodes.filter(visible).map(el => ({
+        el: el, text: (el.innerText || el.value || '').trim(), enabled: !el.disabled
+    }));
+}
+return out;
+"""
+
+# Appointment table that already has rows rendered
+APPOINTMENT_TABLE_XPATH = "//table[contains(@class, 'appointment') or contains(@id, 'appointment')][.//tr]"
+
+# Trimmed <td> texts of each table row that is not the first <tr> of its section
+JS_TABLE_ROWS = """
+return Array.from(arguments[0].querySelectorAll('tr'))
+    .filter(r => r !== r.parentNode.querySelector(':scope > tr'))
+    .map(r => Array.from(r.querySelectorAll('td')).map(c => c.innerText.trim()));
+"""
+
+# Fallback locators for pages that show appointments without the usual table.
+# Plain attribute matches use CSS; text matches need XPath
+APPOINTMENT_HINT_LOCATORS = (
+    (By.CSS_SELECTOR, "div[class*='appointment'], div[id*='appointment']"),
+    (By.XPATH, "//div[contains(text(), 'appointment') or contains(text(), 'Appointment')]"),
+    (By.XPATH, "//*[self::h1 or self::h2][contains(text(), 'appointment') or contains(text(), 'Appointment')]"),
+    (By.XPATH, "//button[contains(text(), 'Book') or contains(text(), 'Schedule')]"),
+)
+
+# "No appointments" banners in any of the usual text containers
+NO_APPOINTMENT_XPATH = (
+    "//*[self::div or self::p or self::span or self::h1 or self::h2]"
+    "[contains(text(), 'No appointment') or contains(text(), 'no appointment')"
+    " or contains(text(), 'No slots') or contains(text(), 'no slots')]"
+)
+
+# Tables the scraper tries when no appointment table was located earlier, most specific first
+SCRAPE_TABLE_SELECTORS = (
+    "table[class*='appointment'], table[id*='appointment']",
+    "table[class*='slot'], table[id*='slot']",
+    "table[class*='schedule'], table[id*='schedule']",
+    "table",
+)
+
+# Slot-like elements for non-table layouts (one CSS query, de-duplicated by the browser)
+SCRAPE_SLOT_CSS = (
+    "div[class*='slot'], div[class*='appointment'], div[id*='appointment'], "
+    "button[class*='appointment'], button[class*='slot']"
+)
+
+# Appointment slot locators, in the order slots are preferred
+SLOT_SELECTORS = {
+    "rows": "//table[contains(@class, 'appointment') or contains(@id, 'appointment')]//tr[position() > 1]",  # Skip header row
+    "slots": "div[class*='slot']",
+    "buttons": "//button[contains(@class, 'appointment') or contains(@class, 'slot') or contains(text(), 'Book') or contains(text(), 'Schedule')]",
+}
+
+CONFIRM_BUTTON_SELECTORS = {
+    "button": "//button[contains(text(), 'Confirm') or contains(text(), 'confirm') or contains(text(), 'Book') or contains(text(), 'book')]",
+    "submit": "//input[@type='submit' and (contains(@value, 'Confirm') or contains(@value, 'confirm') or contains(@value, 'Book') or contains(@value, 'book'))]",
+    "link": "//a[contains(text(), 'Confirm') or contains(text(), 'confirm') or contains(text(), 'Book') or contains(text(), 'book')]",
+}
+
+# How long a URL check result stays valid while the URL is unchanged; covers the
+# availability -> selection -> scrape calls made back to back on the same page
+URL_CHECK_TTL = 3.0
+
+# Write buffer size for scraped appointment snapshots
+SAVE_BUFFER_SIZE = 64 * 1024
+
 class AppointmentHandler:
     """Handles appointment-related functionality for the Visa Checker Bot."""
 
+    # Output directories already created by this process
+    _created_dirs = set()
+
     def __init__(self, driver, browser_manager, target_url):
         """Initialize the appointment handler."""
         self.driver = driver
         self.browser_manager = browser_manager
         self.target_url = target_url
         self.appointment_data = {}
+        # Table located by the last availability/selection pass, reused by the scraper
+        self._appointment_table = None
+        self._login_url = os.getenv("LOGIN_URL", "") or ""
+        self._last_url_check = None  # (url, monotonic time, result) of the last URL check
 
-    def check_current_url_and_act(self):
-        """Check the current URL and perform appropriate actions based on the page type."""
+    def check_current_url_and_act(self, current_url=None):
+        """Check the current URL and perform appropriate actions based on the page type.
+        Callers that already read the URL can pass it in to save a round-trip."""
         try:
-            current_url = self.driver.current_url
+            current_url = current_url or self.driver.current_url
             logger.info(f"Current URL: {current_url}")
             
             # Check if we're on the login page
@@ -43,11 +146,10 @@ class AppointmentHandler:
                 return False
             
             # Check if we're on a captcha page (by detecting captcha presence)
-            from backend.captcha.captcha_utils import is_captcha_present, solve_captcha
             captcha_type = is_captcha_present(self.driver)
             if captcha_type:
                 logger.info(f"Detected captcha page with type: {captcha_type}, solving captcha")
-                solved = solve_captcha(self.driver, os.getenv("CAPTCHA_API_KEY"))
+                solved = self._solve_captcha_with_backoff()
                 if solved:
                     logger.info("Captcha solved successfully")
                     return True
@@ -62,14 +164,13 @@ class AppointmentHandler:
             
             # If we're on an unknown page, navigate to the target URL
             logger.warning(f"Unknown page type: {current_url}, navigating to target URL")
-            self.driver.get(self.target_url)
-            time.sleep(random.uniform(3.0, 5.0))
+            self._nav_and_wait(self.target_url)
             
             # Check again if we're on a captcha page after navigation
             captcha_type = is_captcha_present(self.driver)
             if captcha_type:
                 logger.info(f"Detected captcha page after navigation with type: {captcha_type}, solving captcha")
-                solved = solve_captcha(self.driver, os.getenv("CAPTCHA_API_KEY"))
+                solved = self._solve_captcha_with_backoff()
                 if solved:
                     logger.info("Captcha solved successfully after navigation")
                     return True
@@ -87,17 +188,78 @@ class AppointmentHandler:
             logger.error(f"Error checking current URL: {str(e)}")
             return False
 
+    def check_url_cached(self, ttl=URL_CHECK_TTL):
+        """check_current_url_and_act(), reusing the last result if the URL has not changed within ttl seconds."""
+        url = self.driver.current_url
+        last = self._last_url_check
+        if last and last[0] == url and time.monotonic() - last[1] < ttl:
+            return last[2]
+        result = self.check_current_url_and_act(url)
+        self._last_url_check = (self.driver.current_url, time.monotonic(), result)
+        return result
+
+    def _nav_and_wait(self, url, timeout=30):
+        """Navigate to url and return as soon as the DOM is usable.
+        With the eager load strategy driver.get() already returns at DOMContentLoaded;
+        the short poll only covers client-side redirects that start a new load."""
+        self.driver.get(url)
+        try:
+            WebDriverWait(self.driver, timeout, poll_frequency=0.05).until(
+                lambda d: d.execute_script("return document.readyState") in ("interactive", "complete")
+            )
+            return True
+        except TimeoutException:
+            logger.warning(f"Timeout waiting for {url} to load")
+            return False
+
+    def _solve_captcha_with_backoff(self):
+        """Solve the captcha, retrying failures with exponential backoff and full jitter."""
+        api_key = BOT_CONFIG["captcha_api_key"]
+        for attempt in range(CAPTCHA_RETRY_MAX_TRIES):
+            # This loop is the only retry layer: each solve_captcha() call makes a single
+            # attempt per solver, so a stuck captcha costs at most CAPTCHA_RETRY_MAX_TRIES
+            # paid submissions per solver
+            if solve_captcha(self.driver, api_key, max_attempts=1):
+                return True
+            if attempt == CAPTCHA_RETRY_MAX_TRIES - 1:
+                break
+            # Full jitter keeps retries from several bot instances out of lockstep
+            delay = random.uniform(0, min(CAPTCHA_RETRY_MAX_DELAY, CAPTCHA_RETRY_BASE_DELAY * 2 ** attempt))
+            logger.info(f"Captcha attempt {attempt + 1}/{CAPTCHA_RETRY_MAX_TRIES} failed, retrying in {delay:.1f}s")
+            time.sleep(delay)
+            if not is_captcha_present(self.driver):
+                # The page moved on (or the captcha went away) while we waited
+                return True
+        return False
+
+    def _reusable_table(self):
+        """Return the table found by the last availability/selection check if it is still attached."""
+        if self._appointment_table is None:
+            return None
+        try:
+            self._appointment_table.is_enabled()  # raises if the page has been replaced
+            return self._appointment_table
+        except StaleElementReferenceException:
+            self._appointment_table = None
+            return None
+
+    def _batch_query(self, selectors):
+        """Run a {name: selector} map in a single script call; returns {name: [{el, text, enabled}]} of visible matches."""
+        try:
+            return self.driver.execute_script(JS_BATCH_QUERY, selectors) or {}
+        except Exception as e:
+            logger.debug(f"Batched element query failed: {str(e)}")
+            return {}
+
     def is_login_page(self, url):
         """Check if the given URL is a login page."""
-        return ("login" in url.lower() or 
-                "signin" in url.lower() or 
-                os.getenv("LOGIN_URL", "") in url)
+        return is_login_url(url, self._login_url)
 
     def check_appointment_availability(self):
         """Check if appointments are available."""
         try:
             # First, check the current URL and act accordingly
-            if not self.check_current_url_and_act():
+            if not self.check_url_cached():
                 logger.warning("URL check failed, cannot check appointment availability")
                 return False
                 
@@ -105,27 +267,20 @@ class AppointmentHandler:
             
             # Wait for the appointment table to load
             try:
-                WebDriverWait(self.driver, 30).until(
-                    EC.presence_of_element_located((By.XPATH, "//table[contains(@class, 'appointment') or contains(@id, 'appointment')]//tr"))
+                # Keep the table itself so later steps reuse it instead of re-querying
+                self._appointment_table = WebDriverWait(self.driver, 10, poll_frequency=0.1).until(
+                    EC.presence_of_element_located((By.XPATH, APPOINTMENT_TABLE_XPATH))
                 )
                 logger.info("Appointment table loaded")
             except TimeoutException:
                 logger.warning("Appointment table not found, checking for alternative elements")
                 
                 # Check for alternative elements that indicate appointments
-                alternative_elements = [
-                    "//div[contains(@class, 'appointment') or contains(@id, 'appointment')]",
-                    "//div[contains(text(), 'appointment') or contains(text(), 'Appointment')]",
-                    "//h1[contains(text(), 'appointment') or contains(text(), 'Appointment')]",
-                    "//h2[contains(text(), 'appointment') or contains(text(), 'Appointment')]",
-                    "//button[contains(text(), 'Book') or contains(text(), 'Schedule')]"
-                ]
-                
                 found_alternative = False
-                for selector in alternative_elements:
+                for locator in APPOINTMENT_HINT_LOCATORS:
                     try:
-                        element = WebDriverWait(self.driver, 5).until(
-                            EC.presence_of_element_located((By.XPATH, selector))
+                        element = WebDriverWait(self.driver, 5, poll_frequency=0.1).until(
+                            EC.presence_of_element_located(locator)
                         )
                         logger.info(f"Found alternative appointment element: {element.text}")
                         found_alternative = True
@@ -137,35 +292,18 @@ class AppointmentHandler:
                     logger.warning("No appointment elements found on the page")
                     return False
             
-            # Check for "No appointments available" message
-            no_appointment_selectors = [
-                "//div[contains(text(), 'No appointment') or contains(text(), 'no appointment') or contains(text(), 'No slots') or contains(text(), 'no slots')]",
-                "//p[contains(text(), 'No appointment') or contains(text(), 'no appointment') or contains(text(), 'No slots') or contains(text(), 'no slots')]",
-                "//span[contains(text(), 'No appointment') or contains(text(), 'no appointment') or contains(text(), 'No slots') or contains(text(), 'no slots')]",
-                "//h1[contains(text(), 'No appointment') or contains(text(), 'no appointment') or contains(text(), 'No slots') or contains(text(), 'no slots')]",
-                "//h2[contains(text(), 'No appointment') or contains(text(), 'no appointment') or contains(text(), 'No slots') or contains(text(), 'no slots')]"
-            ]
+            # Probe for the "No appointments available" message and every slot
+            # locator in a single script call
+            found = self._batch_query({"no_appointment": NO_APPOINTMENT_XPATH, **SLOT_SELECTORS})
             
-            for selector in no_appointment_selectors:
-                elements = self.driver.find_elements(By.XPATH, selector)
-                for element in elements:
-                    if element.is_displayed():
-                        logger.info(f"No appointments available message found: {element.text}")
-                        return False
+            if found.get("no_appointment"):
+                logger.info(f"No appointments available message found: {found['no_appointment'][0]['text']}")
+                return False
             
             # Check for appointment slots
-            appointment_selectors = [
-                "//table[contains(@class, 'appointment') or contains(@id, 'appointment')]//tr[position() > 1]",  # Skip header row
-                "//div[contains(@class, 'appointment-slot') or contains(@class, 'slot')]",
-                "//button[contains(@class, 'appointment') or contains(@class, 'slot') or contains(text(), 'Book') or contains(text(), 'Schedule')]"
-            ]
-            
-            for selector in appointment_selectors:
-                elements = self.driver.find_elements(By.XPATH, selector)
-                visible_elements = [e for e in elements if e.is_displayed()]
-                
-                if visible_elements:
-                    logger.info(f"Found {len(visible_elements)} appointment slots")
+            for name in SLOT_SELECTORS:
+                if found.get(name):
+                    logger.info(f"Found {len(found[name])} appointment slots")
                     return True
             
             logger.info("No appointment slots found")
@@ -178,7 +316,7 @@ class AppointmentHandler:
         """Select an appointment based on preferences."""
         try:
             # First, check the current URL and act accordingly
-            if not self.check_current_url_and_act():
+            if not self.check_url_cached():
                 logger.warning("URL check failed, cannot select appointment")
                 return False
                 
@@ -186,25 +324,20 @@ class AppointmentHandler:
             
             # Wait for the appointment table to load
             try:
-                WebDriverWait(self.driver, 30).until(
-                    EC.presence_of_element_located((By.XPATH, "//table[contains(@class, 'appointment') or contains(@id, 'appointment')]//tr"))
+                # Keep the table itself so later steps reuse it instead of re-querying
+                self._appointment_table = WebDriverWait(self.driver, 10, poll_frequency=0.1).until(
+                    EC.presence_of_element_located((By.XPATH, APPOINTMENT_TABLE_XPATH))
                 )
                 logger.info("Appointment table loaded")
             except TimeoutException:
                 logger.warning("Appointment table not found, checking for alternative elements")
                 
                 # Check for alternative elements that indicate appointments
-                alternative_elements = [
-                    "//div[contains(@class, 'appointment') or contains(@id, 'appointment')]",
-                    "//div[contains(text(), 'appointment') or contains(text(), 'Appointment')]",
-                    "//button[contains(text(), 'Book') or contains(text(), 'Schedule')]"
-                ]
-                
                 found_alternative = False
-                for selector in alternative_elements:
+                for locator in APPOINTMENT_HINT_LOCATORS:
                     try:
-                        element = WebDriverWait(self.driver, 5).until(
-                            EC.presence_of_element_located((By.XPATH, selector))
+                        element = WebDriverWait(self.driver, 5, poll_frequency=0.1).until(
+                            EC.presence_of_element_located(locator)
                         )
                         logger.info(f"Found alternative appointment element: {element.text}")
                         found_alternative = True
@@ -216,18 +349,9 @@ class AppointmentHandler:
                     logger.warning("No appointment elements found on the page")
                     return False
             
-            # Find all available appointment slots
-            appointment_selectors = [
-                "//table[contains(@class, 'appointment') or contains(@id, 'appointment')]//tr[position() > 1]",  # Skip header row
-                "//div[contains(@class, 'appointment-slot') or contains(@class, 'slot')]",
-                "//button[contains(@class, 'appointment') or contains(@class, 'slot') or contains(text(), 'Book') or contains(text(), 'Schedule')]"
-            ]
-            
-            all_slots = []
-            for selector in appointment_selectors:
-                elements = self.driver.find_elements(By.XPATH, selector)
-                visible_elements = [e for e in elements if e.is_displayed()]
-                all_slots.extend(visible_elements)
+            # Find all available appointment slots (all selectors in one round-trip)
+            found = self._batch_query(SLOT_SELECTORS)
+            all_slots = [item for name in SLOT_SELECTORS for item in found.get(name, [])]
             
             if not all_slots:
                 logger.warning("No appointment slots found")
@@ -241,7 +365,7 @@ class AppointmentHandler:
                 logger.info(f"Looking for preferred date: {preferred_date}, preferred time: {preferred_time}")
                 
                 for slot in all_slots:
-                    slot_text = slot.text.lower()
+                    slot_text = slot["text"].lower()
                     
                     # Check if the slot matches the preferred date and time
                     date_match = not preferred_date or preferred_date.lower() in slot_text
@@ -255,37 +379,26 @@ class AppointmentHandler:
             # If no matching slot found or no preferences specified, select the first available slot
             if not selected_slot and all_slots:
                 selected_slot = all_slots[0]
-                logger.info(f"Selecting first available slot: {selected_slot.text}")
+                logger.info(f"Selecting first available slot: {selected_slot['text']}")
             
             # Click the selected slot
             if selected_slot:
-                self.browser_manager.move_to_element_with_randomness(selected_slot)
-                selected_slot.click()
+                self.browser_manager.move_to_element_with_randomness(selected_slot["el"])
+                selected_slot["el"].click()
                 logger.info("Clicked on the selected appointment slot")
                 
                 # Wait for the confirmation page to load
-                time.sleep(random.uniform(2.0, 4.0))
+                human_sleep(2.0, 4.0)
                 
                 # Look for confirm button
-                confirm_button_selectors = [
-                    "//button[contains(text(), 'Confirm') or contains(text(), 'confirm') or contains(text(), 'Book') or contains(text(), 'book')]",
-                    "//input[@type='submit' and (contains(@value, 'Confirm') or contains(@value, 'confirm') or contains(@value, 'Book') or contains(@value, 'book'))]",
-                    "//a[contains(text(), 'Confirm') or contains(text(), 'confirm') or contains(text(), 'Book') or contains(text(), 'book')]"
-                ]
-                
+                found = self._batch_query(CONFIRM_BUTTON_SELECTORS)
                 confirm_button = None
-                for selector in confirm_button_selectors:
-                    try:
-                        buttons = self.driver.find_elements(By.XPATH, selector)
-                        for button in buttons:
-                            if button.is_displayed() and button.is_enabled():
-                                confirm_button = button
-                                logger.info(f"Found confirm button with text: {button.text}")
-                                break
-                        if confirm_button:
-                            break
-                    except Exception as e:
-                        logger.debug(f"Error with confirm button selector {selector}: {str(e)}")
+                for name in CONFIRM_BUTTON_SELECTORS:
+                    enabled = [item for item in found.get(name, []) if item["enabled"]]
+                    if enabled:
+                        confirm_button = enabled[0]["el"]
+                        logger.info(f"Found confirm button with text: {enabled[0]['text']}")
+                        break
                 
                 # If we found a confirm button, click it
                 if confirm_button:
@@ -294,7 +407,7 @@ class AppointmentHandler:
                     confirm_button.click()
                     
                     # Wait for the confirmation to complete
-                    time.sleep(random.uniform(3.0, 5.0))
+                    human_sleep(3.0, 5.0)
                     
                     logger.info("Appointment selection completed")
                     return True
@@ -308,28 +421,30 @@ class AppointmentHandler:
             logger.error(f"Error selecting appointment: {str(e)}")
             return False
 
-    def scrape_appointment_data(self):
-        """Scrape appointment data from the current page."""
+    def scrape_appointment_data(self, table=None):
+        """Scrape appointment data from the current page.
+        Pass the appointment table element if the caller already located it."""
         try:
             # First, check the current URL and act accordingly
-            if not self.check_current_url_and_act():
+            if not self.check_url_cached():
                 logger.warning("URL check failed, cannot scrape appointment data")
                 return {}
                 
             logger.info("Scraping appointment data")
             
-            # Simulate human scrolling and mouse movements
-            try:
-                # Scroll down slowly to simulate reading
-                for i in range(10):
-                    self.driver.execute_script(f"window.scrollBy(0, {random.randint(100, 300)});")
-                    time.sleep(random.uniform(0.3, 0.7))
-                
-                # Scroll back up
-                self.driver.execute_script("window.scrollTo(0, 0);")
-                time.sleep(random.uniform(0.5, 1.0))
-            except Exception as scroll_err:
-                logger.debug(f"Error during scrolling: {str(scroll_err)}")
+            # Simulate human scrolling to look like reading (full stealth only)
+            if BOT_CONFIG["stealth_level"] >= 2:
+                try:
+                    # Scroll down slowly to simulate reading
+                    for i in range(10):
+                        self.driver.execute_script(f"window.scrollBy(0, {random.randint(100, 300)});")
+                        human_sleep(0.3, 0.7)
+                    
+                    # Scroll back up
+                    self.driver.execute_script("window.scrollTo(0, 0);")
+                    human_sleep(0.5, 1.0)
+                except Exception as scroll_err:
+                    logger.debug(f"Error during scrolling: {str(scroll_err)}")
             
             # Initialize data dictionary
             appointment_data = {
@@ -337,72 +452,44 @@ class AppointmentHandler:
                 "appointments": []
             }
             
-            # Find the appointment table
-            appointment_table = None
-            table_selectors = [
-                "//table[contains(@class, 'appointment') or contains(@id, 'appointment')]",
-                "//table[contains(@class, 'slot') or contains(@id, 'slot')]",
-                "//table[contains(@class, 'schedule') or contains(@id, 'schedule')]",
-                "//table"
-            ]
-            
-            for selector in table_selectors:
-                tables = self.driver.find_elements(By.XPATH, selector)
+            # Find the appointment table, reusing one located earlier in this pass
+            appointment_table = table or self._reusable_table()
+            for selector in ([] if appointment_table else SCRAPE_TABLE_SELECTORS):
+                tables = self.driver.find_elements(By.CSS_SELECTOR, selector)
                 if tables:
                     appointment_table = tables[0]
                     logger.info(f"Found appointment table with selector: {selector}")
                     break
             
             if appointment_table:
-                # Get all rows from the table (skip header row)
-                rows = appointment_table.find_elements(By.XPATH, ".//tr[position() > 1]")
+                # One human-like glance at the table instead of hovering every row
+                self.browser_manager.move_to_element_with_randomness(appointment_table)
+                
+                # Extract every row's cell texts in a single script call (skip header row)
+                rows = self.driver.execute_script(JS_TABLE_ROWS, appointment_table) or []
                 logger.info(f"Found {len(rows)} appointment rows")
                 
-                # Extract data from each row with human-like behavior
-                for row in rows:
-                    try:
-                        # Move mouse to the row to simulate human interest
-                        self.browser_manager.move_to_element_with_randomness(row)
-                        time.sleep(random.uniform(0.2, 0.5))
+                for cells in rows:
+                    if len(cells) >= 2:
+                        date_cell = cells[0] or "Unknown"
+                        time_cell = cells[1] or "Unknown"
+                        location = cells[2] if len(cells) > 2 else "Unknown"
+                        status = cells[3] if len(cells) > 3 else "Available"
                         
-                        # Extract cells
-                        cells = row.find_elements(By.XPATH, ".//td")
+                        appointment_data["appointments"].append({
+                            "date": date_cell,
+                            "time": time_cell,
+                            "location": location,
+                            "status": status
+                        })
                         
-                        if len(cells) >= 2:
-                            # Extract date and time
-                            date_cell = cells[0].text.strip() if len(cells) > 0 else "Unknown"
-                            time_cell = cells[1].text.strip() if len(cells) > 1 else "Unknown"
-                            
-                            # Extract additional information if available
-                            location = cells[2].text.strip() if len(cells) > 2 else "Unknown"
-                            status = cells[3].text.strip() if len(cells) > 3 else "Available"
-                            
-                            appointment_data["appointments"].append({
-                                "date": date_cell,
-                                "time": time_cell,
-                                "location": location,
-                                "status": status
-                            })
-                            
-                            logger.debug(f"Extracted appointment: {date_cell} at {time_cell}, {location}, {status}")
-                    except Exception as row_err:
-                        logger.debug(f"Error extracting data from row: {str(row_err)}")
-                        continue
+                        logger.debug("Extracted appointment: {} at {}, {}, {}", date_cell, time_cell, location, status)
             else:
                 # Alternative approach for non-table layouts
                 logger.info("No appointment table found, trying alternative approach")
                 
                 # Look for appointment slots in divs or other elements
-                slot_selectors = [
-                    "//div[contains(@class, 'appointment-slot') or contains(@class, 'slot')]",
-                    "//div[contains(@class, 'appointment') or contains(@id, 'appointment')]",
-                    "//button[contains(@class, 'appointment') or contains(@class, 'slot')]"
-                ]
-                
-                all_slots = []
-                for selector in slot_selectors:
-                    slots = self.driver.find_elements(By.XPATH, selector)
-                    all_slots.extend([s for s in slots if s.is_displayed()])
+                all_slots = [s for s in self.driver.find_elements(By.CSS_SELECTOR, SCRAPE_SLOT_CSS) if s.is_displayed()]
                 
                 logger.info(f"Found {len(all_slots)} appointment slots using alternative approach")
                 
@@ -410,7 +497,7 @@ class AppointmentHandler:
                     try:
                         # Move mouse to the slot to simulate human interest
                         self.browser_manager.move_to_element_with_randomness(slot)
-                        time.sleep(random.uniform(0.2, 0.5))
+                        human_sleep(0.2, 0.5)
                         
                         # Extract text and parse it
                         slot_text = slot.text.strip()
@@ -432,7 +519,7 @@ class AppointmentHandler:
                             "raw_text": slot_text
                         })
                         
-                        logger.debug(f"Extracted appointment from slot: {slot_text}")
+                        logger.debug("Extracted appointment from slot: {}", slot_text)
                     except Exception as slot_err:
                         logger.debug(f"Error extracting data from slot: {str(slot_err)}")
                         continue
@@ -450,17 +537,24 @@ class AppointmentHandler:
     def save_appointment_data(self):
         """Save appointment data to a JSON file."""
         try:
-            # Create the directory if it doesn't exist
-            data_dir = os.path.join("data", "scraped_data")
-            os.makedirs(data_dir, exist_ok=True)
+            # Create the directory if it doesn't exist (once per process)
+            if SCRAPED_DATA_DIR not in self._created_dirs:
+                os.makedirs(SCRAPED_DATA_DIR, exist_ok=True)
+                self._created_dirs.add(SCRAPED_DATA_DIR)
             
             # Generate a filename with timestamp
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = os.path.join(data_dir, f"appointments_{timestamp}.json")
-            
-            # Save the data to a JSON file
-            with open(filename, "w") as f:
-                json.dump(self.appointment_data, f, indent=4)
+            tag = file_suffix(getattr(self.browser_manager, "account_tag", ""))
+            filename = os.path.join(SCRAPED_DATA_DIR, f"appointments_{timestamp}{tag}.json")
+            
+            # Save the data to a JSON file (orjson only supports 2-space indentation;
+            # the json fallback keeps the original 4)
+            if orjson is not None:
+                with open(filename, "wb", buffering=SAVE_BUFFER_SIZE) as f:
+                    f.write(orjson.dumps(self.appointment_data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+            else:
+                with open(filename, "w", buffering=SAVE_BUFFER_SIZE) as f:
+                    json.dump(self.appointment_data, f, indent=4)
             
             logger.info(f"Saved appointment data to {filename}")
             return True
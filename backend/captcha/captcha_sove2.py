@@ -20,23 +20,29 @@ get_coordinates(driver, api_key, max_wait=120) → list[tuple[int,int]]
 
 from __future__ import annotations
 
-import os
+import io
 import time
-import tempfile
 from typing import List, Tuple
 
 from loguru import logger
 
 try:
-    import pytesseract  # type: ignore
+    import numpy as np  # type: ignore
     from PIL import Image  # type: ignore
-    HAS_OCR = True
+    HAS_IMAGING = True
+except Exception:
+    HAS_IMAGING = False
+
+try:
+    import pytesseract  # type: ignore
+    HAS_OCR = HAS_IMAGING
 except Exception:
     HAS_OCR = False
 
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.common.by import By
 from selenium.webdriver.remote.webdriver import WebDriver
+from selenium.common.exceptions import InvalidSessionIdException
 
 # Re-use logic from the standalone tester
 from backend.captcha import coordinate_captcha_solver as csolver
@@ -44,15 +50,56 @@ from backend.captcha import coordinate_captcha_solver as csolver
 # ---------------------------------------------------------------------------
 
 
+def _handle_invalid_session(exc: Exception, context: str) -> bool:
+    """Log and return True if *exc* is a dead WebDriver session the caller must re-raise."""
+    if isinstance(exc, InvalidSessionIdException):
+        logger.error(f"[captcha_sove2] Invalid session ID during {context}: {exc}")
+        return True
+    return False
+
+
+# Digit gate thresholds on the greyscale capture: below BLANK_STD the image is treated as
+# blank/solid; at or above CONTENT_STD with a mean horizontal gradient of at least
+# CONTENT_EDGE it clearly has glyphs. Anything between goes to Tesseract.
+DIGIT_GATE_BLANK_STD = 8.0
+DIGIT_GATE_CONTENT_STD = 15.0
+DIGIT_GATE_CONTENT_EDGE = 3.0
+# Single-word mode restricted to digits keeps the OCR fallback short
+DIGIT_OCR_CONFIG = "--psm 8 -c tessedit_char_whitelist=0123456789"
+
+# Spacing between the dispatched clicks, as the site expects separate human taps
+CLICK_GAP_MS = 350
+
+# Converts page coords (arguments[0]) to viewport coords and clicks them arguments[1] ms
+# apart; reports the scaling it used and how many points hit an element
+JS_CLICK_PAGE_COORDS = """
+const pts = arguments[0], gap = arguments[1], done = arguments[arguments.length - 1];
+const ratio = window.devicePixelRatio || 1;
+const scrollX = window.pageXOffset || document.documentElement.scrollLeft || 0;
+const scrollY = window.pageYOffset || document.documentElement.scrollTop || 0;
+const report = clicked => done({ratio: ratio, scrollX: scrollX, scrollY: scrollY, clicked: clicked});
+let clicked = 0;
+if (!pts.length) report(0);
+pts.forEach((p, i) => setTimeout(() => {
+    const x = Math.round((p[0] - scrollX) / ratio), y = Math.round((p[1] - scrollY) / ratio);
+    const el = document.elementFromPoint(x, y);
+    if (el) {
+        el.dispatchEvent(new MouseEvent('click', {bubbles: true, cancelable: true, view: window, detail: 1, clientX: x, clientY: y}));
+        clicked++;
+    }
+    if (i === pts.length - 1) setTimeout(() => report(clicked), gap);
+}, i * gap));
+"""
+
 CAPTCHA_XPATH = "//img[contains(@src,'captcha') and (contains(@src,'.jpg') or contains(@src,'.png'))]"
 
-def _screenshot_to_temp(driver: WebDriver) -> Tuple[str, Tuple[int,int]]:
+def _capture_screenshot(driver: WebDriver) -> Tuple[bytes, Tuple[int,int]]:
     """
-Return screenshot path and (offset_x, offset_y) representing origin used for coords.
+    Return screenshot PNG bytes and (offset_x, offset_y) representing origin used for coords.
 
     We try to screenshot only the captcha <img>. If found, we return element screenshot and its
     bounding-box top-left coordinates (page coords). If not found, we fall back to full-page screenshot
-    and return offset (0,0).
+    and return offset (0,0). The PNG stays in memory; nothing is written to disk.
     
     Raises exceptions for invalid session ID to allow proper session recovery.
     """
@@ -62,52 +109,54 @@ Return screenshot path and (offset_x, offset_y) representing origin used for coo
         size = elem.size
         # small delay to make sure scroll done
         time.sleep(0.3)
-        tmp_fd, img_path = tempfile.mkstemp(prefix="captcha_elem_", suffix=".png")
-        os.close(tmp_fd)
-        elem.screenshot(img_path)
-        logger.debug(f"[captcha_sove2] Element screenshot saved: {img_path} at {location} size={size}")
-        return img_path, (int(location["x"]), int(location["y"]))
+        png = elem.screenshot_as_png
+        logger.debug(f"[captcha_sove2] Element screenshot taken ({len(png)} bytes) at {location} size={size}")
+        return png, (int(location["x"]), int(location["y"]))
     except Exception as e:
         # Check for invalid session id and re-raise to allow caller to handle it
-        if "invalid session id" in str(e).lower():
-            logger.error(f"[captcha_sove2] Invalid session ID during element screenshot: {e}")
+        if _handle_invalid_session(e, "element screenshot"):
             raise  # Re-raise to be caught by the caller for session recovery
             
         logger.debug(f"[captcha_sove2] Element screenshot failed ({e}) – falling back to full page")
         try:
-            tmp_fd, img_path = tempfile.mkstemp(prefix="captcha_full_", suffix=".png")
-            os.close(tmp_fd)
-            driver.save_screenshot(img_path)
-            return img_path, (0, 0)
+            return driver.get_screenshot_as_png(), (0, 0)
         except Exception as full_err:
             # Check for invalid session id in full page screenshot
-            if "invalid session id" in str(full_err).lower():
-                logger.error(f"[captcha_sove2] Invalid session ID during full page screenshot: {full_err}")
+            if _handle_invalid_session(full_err, "full page screenshot"):
                 raise  # Re-raise to be caught by the caller for session recovery
             logger.error(f"[captcha_sove2] Full page screenshot failed: {full_err}")
             raise
-    """Save a PNG screenshot to a temporary file and return its path."""
-    fd, path = tempfile.mkstemp(prefix="captcha_", suffix=".png")
-    os.close(fd)
-    driver.save_screenshot(path)
-    return path
 
 
-def _image_has_digits(image_path: str) -> bool:
-    """Return True if OCR detects at least one digit in the image.
-    
+def _image_has_digits(png: bytes) -> bool:
+    """Return True if the PNG image looks like it holds digits.
+
+    A pixel-variance/edge check settles clear cases (blank or solid captures vs. rendered
+    glyphs) without OCR; only captures in between are passed to Tesseract.
     Raises exceptions for invalid session ID to allow proper session recovery.
     """
-    if not HAS_OCR:
-        logger.debug("[captcha_sove2] OCR libs not available, skipping digit check – assuming True")
+    if not HAS_IMAGING:
+        logger.debug("[captcha_sove2] Imaging libs not available, skipping digit check – assuming True")
         return True
     try:
-        text = pytesseract.image_to_string(Image.open(image_path))
+        img = Image.open(io.BytesIO(png)).convert("L")
+        arr = np.asarray(img, dtype=np.int16)
+        std = float(arr.std())
+        edge = float(np.abs(np.diff(arr, axis=1)).mean()) if arr.shape[1] > 1 else 0.0
+        if std < DIGIT_GATE_BLANK_STD:
+            logger.debug(f"[captcha_sove2] Capture looks blank (std={std:.1f})")
+            return False
+        if std >= DIGIT_GATE_CONTENT_STD and edge >= DIGIT_GATE_CONTENT_EDGE:
+            return True
+        
+        # Uncertain – fall back to OCR if it is available
+        if not HAS_OCR:
+            return True
+        text = pytesseract.image_to_string(img, config=DIGIT_OCR_CONFIG)
         return any(char.isdigit() for char in text)
     except Exception as ocr_err:
         # Check for invalid session id and re-raise to allow caller to handle it
-        if "invalid session id" in str(ocr_err).lower():
-            logger.error(f"[captcha_sove2] Invalid session ID during OCR check: {ocr_err}")
+        if _handle_invalid_session(ocr_err, "OCR check"):
             raise  # Re-raise to be caught by the caller for session recovery
             
         logger.warning(f"[captcha_sove2] OCR error: {ocr_err}")
@@ -121,50 +170,41 @@ def get_coordinates(driver: WebDriver, api_key: str, max_wait: int = 120) -> Lis
     """
     try:
         logger.info("[captcha_sove2] Capturing screenshot for captcha solving")
-        image_path, offset = _screenshot_to_temp(driver)
-        logger.debug(f"[captcha_sove2] Screenshot saved: {image_path}")
+        png, offset = _capture_screenshot(driver)
 
-        # OCR gating – ensure we see digits before submitting to API
-        if not _image_has_digits(image_path):
+        # Gate before the paid upload: a blank capture is never sent to 2Captcha
+        if not _image_has_digits(png):
             logger.warning("[captcha_sove2] No digits detected in captcha image – skipping solve")
             return []
 
-        # Encode + submit
-        logger.info("[captcha_sove2] Encoding image and submitting to 2Captcha")
-        b64 = csolver._encode_image(image_path)
-        captcha_id = csolver._submit_captcha(api_key, b64)
+        # Submit the raw PNG as a multipart upload; base64 is only the fallback
+        logger.info("[captcha_sove2] Submitting image to 2Captcha")
+        try:
+            captcha_id = csolver._submit_captcha_png(api_key, png)
+        except Exception as upload_err:
+            logger.warning(f"[captcha_sove2] Multipart upload failed ({upload_err}) – retrying as base64")
+            captcha_id = csolver._submit_captcha(api_key, csolver._encode_image_bytes(png))
         logger.debug(f"[captcha_sove2] Captcha ID: {captcha_id}")
 
-        # Override global timeout if provided
-        original_timeout = csolver.RESOLVE_TIMEOUT
-        csolver.RESOLVE_TIMEOUT = max_wait
-        try:
-            logger.info("[captcha_sove2] Polling for captcha result …")
-            raw = csolver._poll_result(api_key, captcha_id)
-            logger.debug(f"[captcha_sove2] Raw coordinate string: {raw}")
-        finally:
-            csolver.RESOLVE_TIMEOUT = original_timeout
-
-        # Parse and, if too few/many points, keep polling the SAME captcha ID a few extra times
-        attempts_left = 4  # total extra polls (approx 12-15 s)
-        # First polling loop to obtain a seemingly complete set of coords
-        while True:
-            coords = csolver._parse_coords(raw)
+        logger.info("[captcha_sove2] Polling for captcha result …")
+        raw = csolver._poll_result(api_key, captcha_id, timeout=max_wait)
+        logger.debug(f"[captcha_sove2] Raw coordinate string: {raw}")
+
+        # Parse and, if too few/many points, re-read the SAME captcha ID once
+        coords = csolver._parse_coords(raw)
+        logger.info(f"[captcha_sove2] Parsed {len(coords)} coordinate points: {coords}")
+        if not 3 <= len(coords) <= 6:
+            logger.info("[captcha_sove2] Coordinate count seems incomplete; polling again …")
+            coords = csolver._parse_coords(csolver._poll_result(api_key, captcha_id, first_delay=0))
             logger.info(f"[captcha_sove2] Parsed {len(coords)} coordinate points: {coords}")
-            if 3 <= len(coords) <= 6:
-                break
-            attempts_left -= 1
-            if attempts_left <= 0:
+            if not 3 <= len(coords) <= 6:
                 logger.warning("[captcha_sove2] Giving up on this captcha ID – unexpected coordinate count")
                 return []
-            logger.info("[captcha_sove2] Coordinate count seems incomplete; polling again in 3s …")
-            time.sleep(3)
-            raw = csolver._poll_result(api_key, captcha_id)
 
         # Confirmation poll – fetch the result one more time and make sure it's the same to reduce errors
         try:
             time.sleep(1.5)
-            confirm_raw = csolver._poll_result(api_key, captcha_id)
+            confirm_raw = csolver._poll_result(api_key, captcha_id, first_delay=0)
             confirm_coords = csolver._parse_coords(confirm_raw)
             if confirm_coords == coords:
                 logger.info("[captcha_sove2] Confirmation poll matched first result – proceeding")
@@ -183,8 +223,7 @@ def get_coordinates(driver: WebDriver, api_key: str, max_wait: int = 120) -> Lis
         return coords
     except Exception as e:
         # Check for invalid session id and re-raise to allow caller to handle it
-        if "invalid session id" in str(e).lower():
-            logger.error(f"[captcha_sove2] Invalid session ID during coordinate capture: {e}")
+        if _handle_invalid_session(e, "coordinate capture"):
             raise  # Re-raise to be caught by the caller for session recovery
         logger.error(f"[captcha_sove2] Error getting coordinates: {e}")
         return []
@@ -192,38 +231,22 @@ def get_coordinates(driver: WebDriver, api_key: str, max_wait: int = 120) -> Lis
 
 def _click_page_coords(driver: WebDriver, coords: List[Tuple[int, int]]):
     """Click absolute page coordinates using JS offset clicking."""
-    # Selenium can move relative to the top-left of the page via jquery trick
     try:
-        # Determine scaling factor between screenshot and current page viewport
-        device_ratio = driver.execute_script("return window.devicePixelRatio") or 1.0
-        scroll_y = driver.execute_script("return window.pageYOffset || document.documentElement.scrollTop") or 0
-        scroll_x = driver.execute_script("return window.pageXOffset || document.documentElement.scrollLeft") or 0
-        logger.debug(f"[captcha_sove2] devicePixelRatio={device_ratio}, scrollX={scroll_x}, scrollY={scroll_y}")
-
-        for (x, y) in coords:
-            try:
-                # Translate screenshot coords -> viewport coords
-                # First translate page coords to viewport by subtracting scroll, then scale down for HiDPI
-                sx = round((x - scroll_x) / device_ratio)
-                sy = round((y - scroll_y) / device_ratio)
-                logger.debug(f"[captcha_sove2] Clicking at screenshot({sx},{sy}) -> viewport({sx},{sy})")
-                driver.execute_script(
-                    "var el=document.elementFromPoint(arguments[0],arguments[1]);if(el){var e=document.createEvent('MouseEvents');e.initMouseEvent('click',true,true,window,1,0,0,arguments[0],arguments[1],false,false,false,false,0,null);el.dispatchEvent(e);} ",
-                    int(sx),
-                    int(sy),
-                )
-                time.sleep(0.35)
-            except Exception as click_err:
-                # Check for invalid session id
-                if "invalid session id" in str(click_err).lower():
-                    logger.error(f"[captcha_sove2] Invalid session ID during coordinate click: {click_err}")
-                    raise  # Re-raise to be caught by the caller
-                logger.warning(f"[captcha_sove2] Error clicking coordinate ({sx},{sy}): {click_err}")
-                # Continue with next coordinate even if one fails
+        # Scaling, scroll offsets and every click happen in one async script; it returns
+        # once the last click has settled. Page coords are translated to viewport coords
+        # by subtracting the scroll, then scaled down for HiDPI
+        result = driver.execute_async_script(
+            JS_CLICK_PAGE_COORDS, [[int(x), int(y)] for (x, y) in coords], CLICK_GAP_MS
+        ) or {}
+        logger.debug(
+            f"[captcha_sove2] devicePixelRatio={result.get('ratio')}, scrollX={result.get('scrollX')}, "
+            f"scrollY={result.get('scrollY')}"
+        )
+        if result.get("clicked", 0) < len(coords):
+            logger.warning(f"[captcha_sove2] Only {result.get('clicked', 0)} of {len(coords)} coordinates hit an element")
     except Exception as e:
         # Check for invalid session id
-        if "invalid session id" in str(e).lower():
-            logger.error(f"[captcha_sove2] Invalid session ID during coordinate clicks: {e}")
+        if _handle_invalid_session(e, "coordinate clicks"):
             raise  # Re-raise to be caught by the caller
         logger.error(f"[captcha_sove2] Error in coordinate clicking: {e}")
         raise
@@ -244,8 +267,7 @@ def solve_and_click(driver: WebDriver, api_key: str, max_wait: int = 120) -> boo
         return True
     except Exception as exc:
         # Check for invalid session id and re-raise to allow caller to handle it
-        if "invalid session id" in str(exc).lower():
-            logger.error(f"[captcha_sove2] Invalid session ID error: {exc}")
+        if _handle_invalid_session(exc, "solve_and_click"):
             raise  # Re-raise to be caught by the caller for session recovery
         logger.error(f"[captcha_sove2] failed: {exc}")
         return False
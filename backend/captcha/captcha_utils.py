@@ -11,6 +11,7 @@ It serves as a bridge between the main bot and the captcha solving implementatio
 import os
 import time
 import random
+from collections import OrderedDict
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
@@ -29,8 +30,82 @@ except Exception:
     LEGACY_SOLVER_AVAILABLE = False
 # Import Tesseract configuration helper
 from backend.captcha import tesseract_config
-import os
 from config import BOT_CONFIG
+from utils import find_first_usable, PASSWORD_XPATHS
+
+# Clicks the first visible, enabled verify/submit button shown after the captcha grid
+# (#btnVerify, an onSubmit handler, or "verify"/"submit" in any case) and returns its
+# id or label, or null if none is on the page yet
+JS_CLICK_VERIFY = """
+const visible = el => !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+const btn = Array.from(document.querySelectorAll("button, input[type='submit']")).find(el =>
+    !el.disabled && visible(el) && (
+        el.id === 'btnVerify' ||
+        (el.tagName === 'BUTTON' && ((el.getAttribute('onclick') || '').indexOf('onSubmit') !== -1 ||
+                                     /verify|submit/i.test(el.textContent || '')))));
+if (!btn) return null;
+btn.click();
+return btn.id || (btn.textContent || btn.value || '').trim() || 'button';
+"""
+
+# Indices of iframes worth searching for the password field: captcha widgets,
+# same-origin pages and frames without a src (inline content)
+JS_PASSWORD_FRAME_CANDIDATES = """
+return Array.from(document.querySelectorAll('iframe')).map((f, i) => [i, f.src || '']).filter(([i, src]) =>
+    !src || src.startsWith('about:') || src.startsWith(location.origin) || /captcha/i.test(src)
+).map(([i]) => i);
+"""
+
+# Most pages remembered in each driver's URL -> candidate iframe indices cache
+PASSWORD_FRAME_CACHE_SIZE = 16
+
+
+def _password_frame_cache(driver):
+    """Per-driver URL -> candidate iframe indices cache (kept on the driver, so parallel
+    accounts never share it and it goes away with the browser)."""
+    cache = getattr(driver, "_password_frame_cache", None)
+    if cache is None:
+        cache = driver._password_frame_cache = OrderedDict()
+    return cache
+
+# Captcha detection in a single in-page pass; checks run in the same order as the
+# former per-XPath lookups (image, then reCAPTCHA, then hCaptcha).
+# The verdict is cached on the page and reused until a MutationObserver sees the
+# DOM change; a navigation starts a fresh window, which drops the cache per URL.
+JS_DETECT_CAPTCHA = """
+const w = window;
+if (!w.__captchaObs) {
+    w.__captchaMut = 0;
+    w.__captchaObs = new MutationObserver(() => { w.__captchaMut++; });
+    w.__captchaObs.observe(document.documentElement, {
+        childList: true, subtree: true, characterData: true,
+        attributes: true, attributeFilter: ['src', 'alt', 'class', 'id']
+    });
+} else if (w.__captchaCache && w.__captchaCache.mut === w.__captchaMut
+           && w.__captchaCache.href === location.href) {
+    return w.__captchaCache.val;
+}
+const has = sel => document.querySelector(sel) !== null;
+const ownTextMatches = tags => {
+    // Walk text nodes only and stop at the first hit, rather than collecting
+    // every container element up front
+    const walker = document.createTreeWalker(document.body || document.documentElement, NodeFilter.SHOW_TEXT);
+    for (let n = walker.nextNode(); n; n = walker.nextNode()) {
+        if (/captcha|CAPTCHA/.test(n.nodeValue) && n.parentNode && tags.has(n.parentNode.nodeName)) return true;
+    }
+    return false;
+};
+const detect = () => {
+    if (has("img[src*='captcha'], img[alt*='captcha'], div[class*='captcha'], div[id*='captcha'], iframe[src*='captcha']")
+            || ownTextMatches(new Set(['DIV', 'LABEL', 'SPAN', 'P']))) return 'image';
+    if (has("div[class*='recaptcha'], div[id*='recaptcha'], iframe[src*='recaptcha']")) return 'recaptcha';
+    if (has("div[class*='h-captcha'], div[class*='hcaptcha'], div[id*='hcaptcha'], iframe[src*='hcaptcha']")) return 'hcaptcha';
+    return null;
+};
+const val = detect();
+w.__captchaCache = {mut: w.__captchaMut, href: location.href, val: val};
+return val;
+"""
 
 class CaptchaUtils:
     """Class for handling captcha detection and solving."""
@@ -113,47 +188,51 @@ def is_captcha_present(driver):
         str or None: Type of captcha detected ('image', 'recaptcha', 'hcaptcha', etc.) or None if no captcha
     """
     try:
-        # Check for image-based captcha
-        image_captcha = driver.find_elements(By.XPATH, "//img[contains(@src, 'captcha') or contains(@alt, 'captcha')]") or \
-                        driver.find_elements(By.XPATH, "//div[contains(@class, 'captcha') or contains(@id, 'captcha')]") or \
-                        driver.find_elements(By.XPATH, "//iframe[contains(@src, 'captcha')]") or \
-                        driver.find_elements(By.XPATH, "//div[contains(text(), 'captcha') or contains(text(), 'CAPTCHA')]") or \
-                        driver.find_elements(By.XPATH, "//label[contains(text(), 'captcha') or contains(text(), 'CAPTCHA')]") or \
-                        driver.find_elements(By.XPATH, "//span[contains(text(), 'captcha') or contains(text(), 'CAPTCHA')]") or \
-                        driver.find_elements(By.XPATH, "//p[contains(text(), 'captcha') or contains(text(), 'CAPTCHA')]")
-        
-        if image_captcha:
+        captcha_type = driver.execute_script(JS_DETECT_CAPTCHA)
+        if captcha_type == "image":
             logger.info("Image-based captcha detected")
-            return "image"
-        
-        # Check for reCAPTCHA
-        recaptcha = driver.find_elements(By.XPATH, "//div[@class='g-recaptcha' or contains(@class, 'g-recaptcha')]") or \
-                    driver.find_elements(By.XPATH, "//iframe[contains(@src, 'recaptcha')]") or \
-                    driver.find_elements(By.XPATH, "//div[contains(@class, 'recaptcha') or contains(@id, 'recaptcha')]")
-        
-        if recaptcha:
+        elif captcha_type == "recaptcha":
             logger.info("reCAPTCHA detected")
-            return "recaptcha"
-        
-        # Check for hCaptcha
-        hcaptcha = driver.find_elements(By.XPATH, "//div[@class='h-captcha' or contains(@class, 'h-captcha')]") or \
-                   driver.find_elements(By.XPATH, "//iframe[contains(@src, 'hcaptcha')]") or \
-                   driver.find_elements(By.XPATH, "//div[contains(@class, 'hcaptcha') or contains(@id, 'hcaptcha')]")
-        
-        if hcaptcha:
+        elif captcha_type == "hcaptcha":
             logger.info("hCaptcha detected")
-            return "hcaptcha"
-        
-        # No captcha detected
-        return None
+        return captcha_type or None
     except Exception as e:
         logger.error(f"Error checking for captcha: {str(e)}")
         return None
 
+def _click_verify_button(driver, timeout=3):
+    """
+    Click the captcha verify/submit button if one becomes clickable.
+    
+    Args:
+        driver: Selenium WebDriver instance
+        timeout: Seconds to wait for the button
+        
+    Returns:
+        bool: True if a button was clicked, False otherwise
+    """
+    try:
+        # Find and click in one script call per poll instead of wait + attribute reads + click
+        label = WebDriverWait(driver, timeout, poll_frequency=0.1).until(
+            lambda d: d.execute_script(JS_CLICK_VERIFY))
+        logger.info(f"Clicked captcha verify button: {label}")
+        time.sleep(random.uniform(0.5, 1.5))
+        return True
+    except TimeoutException:
+        logger.debug("No captcha verify button found or clickable after solving")
+        return False
+    except Exception as click_err:
+        logger.warning(f"Error clicking verify button after captcha: {click_err}")
+        return False
+
 def solve_captcha(driver, captcha_api_key, max_attempts=3):
     """
     Solve the captcha on the current page.
     
+    Lifts the browser's resource block list for the duration of the solve (captcha
+    images are blocked otherwise) and restores it afterwards, so every caller gets
+    a fully rendered challenge.
+    
     Args:
         driver: Selenium WebDriver instance
         captcha_api_key: API key for captcha solving service
@@ -162,6 +241,16 @@ def solve_captcha(driver, captcha_api_key, max_attempts=3):
     Returns:
         bool: True if captcha was solved successfully, False otherwise
     """
+    manager = getattr(driver, "_browser_manager", None)
+    lifted = manager is not None and manager.unblock_for_captcha(reload=True)
+    try:
+        return _solve_captcha(driver, captcha_api_key, max_attempts)
+    finally:
+        if lifted:
+            manager.reblock_resources()
+
+def _solve_captcha(driver, captcha_api_key, max_attempts):
+    """solve_captcha() body, run with the resource block list lifted."""
     try:
         # Check if we're on a captcha or login page
         current_url = driver.current_url
@@ -187,26 +276,7 @@ def solve_captcha(driver, captcha_api_key, max_attempts=3):
             if solved:
                 logger.info("Image captcha solved successfully")
                 # After solving, try to click a verify/submit button if present
-                try:
-                    submit_selectors = [
-                        "//button[@id='btnVerify']",
-                        "//button[contains(@onclick, 'onSubmit')]",
-                        "//button[contains(text(), 'Submit')]",
-                        "//button[contains(text(), 'Verify')]",
-                        "//input[@type='submit' and @id='btnVerify']",
-                    ]
-                    for sel in submit_selectors:
-                        elems = driver.find_elements(By.XPATH, sel)
-                        for btn in elems:
-                            if btn.is_displayed() and btn.is_enabled():
-                                logger.info(f"Clicking captcha verify button via selector: {sel}")
-                                btn.click()
-                                time.sleep(random.uniform(0.5, 1.5))
-                                break
-                    else:
-                        logger.debug("No captcha verify button found or clickable after solving")
-                except Exception as click_err:
-                    logger.warning(f"Error clicking verify button after captcha: {click_err}")
+                _click_verify_button(driver)
                 return True
             else:
                 logger.warning("Failed to solve image captcha with new solver")
@@ -218,24 +288,7 @@ def solve_captcha(driver, captcha_api_key, max_attempts=3):
                         if legacy_success:
                             logger.info("Legacy captcha solver succeeded")
                             # attempt verify button click similar to above
-                            try:
-                                submit_selectors = [
-                                    "//button[@id='btnVerify']",
-                                    "//button[contains(@onclick, 'onSubmit')]",
-                                    "//button[contains(text(), 'Submit')]",
-                                    "//button[contains(text(), 'Verify')]",
-                                    "//input[@type='submit' and @id='btnVerify']",
-                                ]
-                                for sel in submit_selectors:
-                                    elems = driver.find_elements(By.XPATH, sel)
-                                    for btn in elems:
-                                        if btn.is_displayed() and btn.is_enabled():
-                                            logger.info(f"Clicking captcha verify button via selector: {sel} (legacy)")
-                                            btn.click()
-                                            time.sleep(random.uniform(0.5, 1.5))
-                                            break
-                            except Exception as click_err:
-                                logger.warning(f"Legacy solver verify button click error: {click_err}")
+                            _click_verify_button(driver)
                             return True
                         else:
                             logger.warning("Legacy captcha solver also failed")
@@ -252,6 +305,50 @@ def solve_captcha(driver, captcha_api_key, max_attempts=3):
         logger.error(f"Error solving captcha: {str(e)}")
         return False
 
+def _find_password_field(driver):
+    """
+    Find a visible, enabled password field in the current browsing context.
+    
+    Args:
+        driver: Selenium WebDriver instance
+        
+    Returns:
+        WebElement or None: The password field, or None if not found
+    """
+    try:
+        return find_first_usable(driver, PASSWORD_XPATHS)[0]
+    except Exception as e:
+        logger.debug(f"Password field lookup failed: {str(e)}")
+        return None
+
+def _frames_have_password_field(driver):
+    """
+    Ask Chrome directly (CDP) whether any child frame contains a password input,
+    without switching WebDriver into each frame.
+    
+    Args:
+        driver: Selenium WebDriver instance
+        
+    Returns:
+        bool or None: True/False from the probe, or None if CDP is unavailable
+    """
+    try:
+        tree = driver.execute_cdp_cmd("Page.getFrameTree", {})
+        for child in tree.get("frameTree", {}).get("childFrames", []):
+            world = driver.execute_cdp_cmd("Page.createIsolatedWorld",
+                                           {"frameId": child["frame"]["id"], "worldName": "pw_probe"})
+            res = driver.execute_cdp_cmd("Runtime.evaluate", {
+                "expression": "!!document.querySelector(\"input[type='password']\")",
+                "contextId": world["executionContextId"],
+                "returnByValue": True,
+            })
+            if res.get("result", {}).get("value"):
+                return True
+        return False
+    except Exception as e:
+        logger.debug(f"CDP frame probe unavailable: {str(e)}")
+        return None
+
 def retry_with_password_retyping(driver, user_password):
     """
     Retry captcha solving with password retyping.
@@ -267,66 +364,54 @@ def retry_with_password_retyping(driver, user_password):
     try:
         logger.info("Retrying captcha with password retyping")
         
-        # Look for password field with dynamic IDs
-        password_selectors = [
-            "//input[@type='password' and contains(@class, 'form-control')]",
-            "//input[@type='password']",
-            "//label[contains(text(), 'Password')]/following-sibling::input",
-            "//label[contains(text(), 'Password')]/..//input[@type='password']"
-        ]
-        
         # First try in the main document
-        password_field = None
-        for selector in password_selectors:
-            try:
-                fields = driver.find_elements(By.XPATH, selector)
-                for field in fields:
-                    if field.is_displayed() and field.is_enabled():
-                        password_field = field
-                        break
-                if password_field:
-                    break
-            except Exception:
-                continue
+        password_field = _find_password_field(driver)
         
-        # If not found, check iframes
-        if not password_field:
+        # If not found, check iframes – unless CDP already shows none of them has one
+        if not password_field and _frames_have_password_field(driver) is False:
+            logger.debug("No iframe contains a password field, skipping frame switches")
+        elif not password_field:
             logger.debug("Checking iframes for password field...")
             # Store current context to return to it later
             try:
                 # Switch to default content first to ensure we're at the top level
                 driver.switch_to.default_content()
                 
-                # Find all iframes
-                iframes = driver.find_elements(By.TAG_NAME, "iframe")
-                logger.debug(f"Found {len(iframes)} iframes to check")
+                # Enumerate frames in-page and only enter the ones that can hold the
+                # login form: captcha widgets, same-origin pages and srcless frames.
+                # The candidate list is remembered per URL for subsequent retries.
+                current_url = driver.execute_script("return location.href;")
+                frame_cache = _password_frame_cache(driver)
+                candidates = frame_cache.get(current_url)
+                if candidates is None:
+                    candidates = driver.execute_script(JS_PASSWORD_FRAME_CANDIDATES) or []
+                    frame_cache[current_url] = candidates
+                    if len(frame_cache) > PASSWORD_FRAME_CACHE_SIZE:
+                        frame_cache.popitem(last=False)
+                else:
+                    frame_cache.move_to_end(current_url)
+                logger.debug(f"Checking {len(candidates)} candidate iframes: {candidates}")
                 
-                for idx, iframe in enumerate(iframes):
+                for idx in candidates:
                     try:
-                        driver.switch_to.frame(iframe)
+                        driver.switch_to.frame(idx)
                         logger.debug(f"Switched to iframe #{idx}")
                         
                         # Try to find password field in this iframe
-                        for selector in password_selectors:
-                            try:
-                                fields = driver.find_elements(By.XPATH, selector)
-                                for field in fields:
-                                    if field.is_displayed() and field.is_enabled():
-                                        password_field = field
-                                        break
-                                if password_field:
-                                    break
-                            except Exception:
-                                continue
+                        password_field = _find_password_field(driver)
                         
                         if password_field:
+                            # Stay in this frame so the element remains usable
                             logger.info(f"Found password field in iframe #{idx}")
                             break
+                        driver.switch_to.default_content()
                     except Exception as iframe_err:
                         logger.debug(f"Error checking iframe #{idx}: {str(iframe_err)}")
-                    finally:
-                        # Return to main document after checking each iframe
                         driver.switch_to.default_content()
+                
+                if not password_field:
+                    # The frames changed since they were enumerated (or never had it) – forget them
+                    frame_cache.pop(current_url, None)
             except Exception as frame_err:
                 logger.debug(f"Error during iframe search: {str(frame_err)}")
                 # Make sure we're back to the default content
@@ -359,6 +444,9 @@ def retry_with_password_retyping(driver, user_password):
             for char in user_password:
                 password_field.send_keys(char)
                 time.sleep(random.uniform(0.05, 0.2))
+            
+            # Leave the iframe (if the field was inside one)
+            driver.switch_to.default_content()
                 
             logger.info("Password retyped successfully for captcha retry")
             return True
@@ -27,6 +27,8 @@ import time
 from typing import List, Tuple
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 try:
     from PIL import Image, ImageDraw
@@ -39,10 +41,23 @@ DEFAULT_API_KEY = "3fcc471527b7fd1d1c07ca94b5b2bfd0"
 
 IN_ENDPOINT = "https://2captcha.com/in.php"
 RES_ENDPOINT = "https://2captcha.com/res.php"
-POLL_INTERVAL = 5          # seconds between each status check
+FIRST_POLL_DELAY = 8       # seconds before the first status check (solves take ~15-25 s)
+POLL_INTERVAL = 2.0        # initial seconds between status checks …
+POLL_INTERVAL_MAX = 5.0    # … growing by POLL_BACKOFF per not-ready answer up to this
+POLL_BACKOFF = 1.25
 RESOLVE_TIMEOUT = 120      # maximum seconds to wait for solution
 # ----------------------------------------------------------------- #
 
+# Shared keep-alive session so the submit and every poll reuse one TLS connection.
+# Retry only covers idempotent requests (the GET polls), so a submit is never sent twice.
+_SESSION = requests.Session()
+_SESSION.headers["Connection"] = "keep-alive"
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=2,
+    pool_maxsize=4,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504]),
+))
+
 def _get_api_key() -> str:
     """Return API key from $API_KEY or fallback constant."""
     return os.getenv("API_KEY", DEFAULT_API_KEY)
@@ -51,7 +66,12 @@ def _get_api_key() -> str:
 def _encode_image(path: str) -> str:
     """Return base64 string of the image file."""
     with open(path, "rb") as f:
-        return base64.b64encode(f.read()).decode()
+        return _encode_image_bytes(f.read())
+
+
+def _encode_image_bytes(data: bytes) -> str:
+    """Return base64 string of in-memory image bytes."""
+    return base64.b64encode(data).decode("ascii")
 
 
 def _submit_captcha(api_key: str, b64_img: str) -> str:
@@ -63,7 +83,24 @@ def _submit_captcha(api_key: str, b64_img: str) -> str:
         "json": 1,
         "coordinatescaptcha": 1,
     }
-    resp = requests.post(IN_ENDPOINT, data=data, timeout=30)
+    return _post_submission(data)
+
+
+def _submit_captcha_png(api_key: str, png: bytes) -> str:
+    """Send captcha PNG bytes as a multipart file upload (no base64 inflation);
+    return the captcha ID on success."""
+    data = {
+        "key": api_key,
+        "method": "post",
+        "json": 1,
+        "coordinatescaptcha": 1,
+    }
+    return _post_submission(data, files={"file": ("captcha.png", png, "image/png")})
+
+
+def _post_submission(data: dict, files: dict = None) -> str:
+    """POST a submission to in.php; return the captcha ID on success."""
+    resp = _SESSION.post(IN_ENDPOINT, data=data, files=files, timeout=30)
     resp.raise_for_status()
     j = resp.json()
     if j.get("status") != 1:
@@ -71,9 +108,14 @@ def _submit_captcha(api_key: str, b64_img: str) -> str:
     return j["request"]  # captcha ID
 
 
-def _poll_result(api_key: str, captcha_id: str) -> str:
-    """Poll 2Captcha until we get a solution or timeout; return raw string."""
-    deadline = time.time() + RESOLVE_TIMEOUT
+def _poll_result(api_key: str, captcha_id: str, first_delay: float = FIRST_POLL_DELAY,
+                 timeout: float = None) -> str:
+    """Poll 2Captcha until we get a solution or timeout; return raw string.
+    Pass first_delay=0 to re-read an ID that is already solved; timeout defaults to
+    RESOLVE_TIMEOUT."""
+    deadline = time.time() + (RESOLVE_TIMEOUT if timeout is None else timeout)
+    interval = POLL_INTERVAL
+    time.sleep(first_delay)
     params = {
         "key": api_key,
         "action": "get",
@@ -81,13 +123,14 @@ def _poll_result(api_key: str, captcha_id: str) -> str:
         "json": 1,
     }
     while time.time() < deadline:
-        resp = requests.get(RES_ENDPOINT, params=params, timeout=30)
+        resp = _SESSION.get(RES_ENDPOINT, params=params, timeout=30)
         resp.raise_for_status()
         j = resp.json()
         if j.get("status") == 1:
             return j["request"]  # "x1,y1|x2,y2|..."
         elif j.get("request") == "CAPCHA_NOT_READY":
-            time.sleep(POLL_INTERVAL)
+            time.sleep(interval)
+            interval = min(interval * POLL_BACKOFF, POLL_INTERVAL_MAX)
         else:
             raise RuntimeError(f"2Captcha error: {j.get('request')}")
     raise TimeoutError("Timed out waiting for 2Captcha solution")
@@ -150,11 +193,12 @@ def solve_captcha(image_path: str, visualise: bool = False) -> None:
         print("Error: API key is missing. Set the API_KEY environment variable or edit DEFAULT_API_KEY.")
         sys.exit(1)
 
-    print("[*] Encoding image …")
-    b64 = _encode_image(image_path)
+    print("[*] Reading image …")
+    with open(image_path, "rb") as f:
+        png = f.read()
 
     print("[*] Submitting captcha to 2Captcha …")
-    captcha_id = _submit_captcha(api_key, b64)
+    captcha_id = _submit_captcha_png(api_key, png)
     print(f"    Captcha ID: {captcha_id}")
 
     print("[*] Waiting for solution …")
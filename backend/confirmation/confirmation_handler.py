@@ -10,16 +10,94 @@ and save confirmation details.
 """
 
 import os
-import time
 import random
 import json
 from datetime import datetime
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, StaleElementReferenceException
 from loguru import logger
 
+try:
+    import orjson  # optional, much faster JSON encoder
+except ImportError:
+    orjson = None
+
+from config import BOT_CONFIG
+from utils import human_sleep, file_suffix
+
+# Headings/containers that mark a confirmation or success page, as one union XPath
+CONFIRMATION_PAGE_XPATH = " | ".join([
+    "//*[self::div or self::h1 or self::h2][contains(text(), 'confirm') or contains(text(), 'Confirm') or contains(text(), 'success') or contains(text(), 'Success')]",
+    "//div[contains(@class, 'confirmation') or contains(@id, 'confirmation')]",
+    "//div[contains(@class, 'success') or contains(@id, 'success')]",
+])
+
+# Returns the first visible node matched by the XPath in arguments[0], or null
+JS_FIRST_VISIBLE_XPATH = """
+const snap = document.evaluate(arguments[0], document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+for (let i = 0; i < snap.snapshotLength; i++) {
+    const el = snap.snapshotItem(i);
+    if (el.offsetWidth || el.offsetHeight || el.getClientRects().length) return el;
+}
+return null;
+"""
+
+# Page section enclosing the confirmation marker in arguments[0] (never the marker itself,
+# which may be just the banner), or null if there is none
+JS_CONFIRMATION_BLOCK = """
+const parent = arguments[0] && arguments[0].parentElement;
+return parent ? parent.closest('section, main, form, .card, .container') : null;
+"""
+
+def _label_value_xpaths(*words):
+    """Sibling-value XPaths for a label whose own text contains any of the words."""
+    cond = " or ".join(f"contains(text(), '{w}') or contains(text(), '{w.capitalize()}')" for w in words)
+    return (
+        f"//div[{cond}]/following-sibling::div",
+        f"//span[{cond}]/following-sibling::span",
+        f"//label[{cond}]/following-sibling::*",
+        f"//div[{cond}]/parent::*/following-sibling::*",
+    )
+
+# Confirmation fields and the XPaths tried for each, in priority order
+CONFIRMATION_FIELD_XPATHS = {
+    "reference_id": _label_value_xpaths("reference", "confirmation"),
+    "appointment": _label_value_xpaths("appointment"),
+    "date": _label_value_xpaths("date"),
+    "time": _label_value_xpaths("time"),
+    "location": _label_value_xpaths("location", "address"),
+}
+
+# For each field in arguments[0] returns the trimmed text of the first visible match
+# (fields listed in arguments[1] must contain a digit), plus the <td> texts of every
+# row of every visible table
+JS_SCRAPE_CONFIRMATION = """
+const visible = el => !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+const needDigits = new Set(arguments[1]);
+const fields = {};
+for (const [name, xpaths] of Object.entries(arguments[0])) {
+    fields[name] = null;
+    search: for (const xp of xpaths) {
+        const snap = document.evaluate(xp, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        for (let i = 0; i < snap.snapshotLength; i++) {
+            const el = snap.snapshotItem(i);
+            if (!visible(el)) continue;
+            const text = (el.innerText || '').trim();
+            if (text && (!needDigits.has(name) || /[0-9]/.test(text))) {
+                fields[name] = text;
+                break search;
+            }
+        }
+    }
+}
+const tables = Array.from(document.querySelectorAll('table')).filter(visible).map(t =>
+    Array.from(t.querySelectorAll('tr')).map(r =>
+        Array.from(r.querySelectorAll('td')).map(c => c.innerText.trim())));
+return {fields: fields, tables: tables};
+"""
+
 class ConfirmationHandler:
     """Handles confirmation page functionality for the Visa Checker Bot."""
 
@@ -29,28 +107,51 @@ class ConfirmationHandler:
         self.browser_manager = browser_manager
         self.screenshots_dir = os.path.join("data", "screenshots")
         self.data_dir = os.path.join("data", "scraped_data")
+        # Keeps files of parallel accounts from overwriting each other
+        self._file_tag = file_suffix(getattr(browser_manager, "account_tag", ""))
         os.makedirs(self.screenshots_dir, exist_ok=True)
         os.makedirs(self.data_dir, exist_ok=True)
+        # Element that identified the confirmation page on the last positive check
+        self._confirmation_marker = None
+
+    def _evaluate(self, js, *args):
+        """Run a value-returning script body with arguments[...] set to args.
+        Uses a single CDP Runtime.evaluate on Chrome and falls back to execute_script
+        elsewhere. Results must be JSON-serialisable (no DOM elements)."""
+        if hasattr(self.driver, "execute_cdp_cmd"):
+            try:
+                res = self.driver.execute_cdp_cmd("Runtime.evaluate", {
+                    "expression": f"(function(){{ {js} }}).apply(null, {json.dumps(args)})",
+                    "returnByValue": True,
+                })
+                if "exceptionDetails" not in res:
+                    return res["result"].get("value")
+                logger.debug(f"CDP evaluate raised: {res['exceptionDetails'].get('text')}")
+            except Exception as e:
+                logger.debug(f"CDP evaluate unavailable: {str(e)}")
+        return self.driver.execute_script(js, *args)
 
     def is_confirmation_page(self):
         """Check if the current page is a confirmation page."""
         try:
             logger.info("Checking if current page is a confirmation page")
             
-            # Check for confirmation-related elements
-            confirmation_selectors = [
-                "//div[contains(text(), 'confirm') or contains(text(), 'Confirm') or contains(text(), 'success') or contains(text(), 'Success')]",
-                "//h1[contains(text(), 'confirm') or contains(text(), 'Confirm') or contains(text(), 'success') or contains(text(), 'Success')]",
-                "//h2[contains(text(), 'confirm') or contains(text(), 'Confirm') or contains(text(), 'success') or contains(text(), 'Success')]",
-                "//div[contains(@class, 'confirmation') or contains(@id, 'confirmation')]",
-                "//div[contains(@class, 'success') or contains(@id, 'success')]"
-            ]
-            
-            for selector in confirmation_selectors:
-                elements = self.driver.find_elements(By.XPATH, selector)
-                if elements and any(e.is_displayed() for e in elements):
-                    logger.info(f"Detected confirmation page with selector: {selector}")
-                    return True
+            # Still on the page we detected last time?
+            if self._confirmation_marker is not None:
+                try:
+                    if self._confirmation_marker.is_displayed():
+                        logger.info("Confirmation page marker still displayed")
+                        return True
+                except StaleElementReferenceException:
+                    pass
+            
+            # Check all confirmation-related elements in one script call
+            self._confirmation_marker = self.driver.execute_script(
+                JS_FIRST_VISIBLE_XPATH, CONFIRMATION_PAGE_XPATH
+            )
+            if self._confirmation_marker is not None:
+                logger.info("Detected confirmation page")
+                return True
             
             logger.info("Current page is not a confirmation page")
             return False
@@ -58,20 +159,31 @@ class ConfirmationHandler:
             logger.error(f"Error checking if current page is a confirmation page: {str(e)}")
             return False
 
-    def take_confirmation_screenshot(self):
+    def take_confirmation_screenshot(self, timestamp=None):
         """Take a screenshot of the confirmation page."""
         try:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            screenshot_path = os.path.join(self.screenshots_dir, f"confirmation_{timestamp}.png")
-            self.driver.save_screenshot(screenshot_path)
+            timestamp = timestamp or datetime.now().strftime("%Y%m%d_%H%M%S")
+            screenshot_path = os.path.join(self.screenshots_dir, f"confirmation_{timestamp}{self._file_tag}.png")
+            # Capture only the block holding the confirmation marker; that is the proof we
+            # need and a much smaller PNG than the whole viewport
+            try:
+                block = self.driver.execute_script(JS_CONFIRMATION_BLOCK, self._confirmation_marker)
+                if block is None:
+                    raise ValueError("no section encloses the confirmation marker")
+                with open(screenshot_path, "wb") as f:
+                    f.write(block.screenshot_as_png)
+            except Exception as shot_err:
+                logger.debug(f"Element screenshot unavailable, using full viewport: {str(shot_err)}")
+                self.driver.save_screenshot(screenshot_path)
             logger.info(f"Saved confirmation screenshot to {screenshot_path}")
             return screenshot_path
         except Exception as e:
             logger.error(f"Error taking confirmation screenshot: {str(e)}")
             return None
 
-    def scrape_confirmation_data(self):
-        """Scrape confirmation data from the current page."""
+    def scrape_confirmation_data(self, now=None):
+        """Scrape confirmation data from the current page.
+        now (a datetime) stamps the JSON, the screenshot and the saved file alike."""
         try:
             logger.info("Scraping confirmation data")
             
@@ -80,163 +192,57 @@ class ConfirmationHandler:
                 logger.warning("Not on a confirmation page, cannot scrape confirmation data")
                 return {}
             
+            # One timestamp for the record and both file names
+            now = now or datetime.now()
+            timestamp = now.strftime("%Y%m%d_%H%M%S")
+            
             # Take a screenshot of the confirmation page
-            screenshot_path = self.take_confirmation_screenshot()
+            screenshot_path = self.take_confirmation_screenshot(timestamp)
             
             # Initialize data dictionary
             confirmation_data = {
-                "timestamp": datetime.now().isoformat(),
+                "timestamp": now.isoformat(),
                 "screenshot_path": screenshot_path,
                 "details": {}
             }
             
-            # Simulate human scrolling and mouse movements
-            try:
-                # Scroll down slowly to simulate reading
-                for i in range(10):
-                    self.driver.execute_script(f"window.scrollBy(0, {random.randint(100, 300)});")
-                    time.sleep(random.uniform(0.3, 0.7))
-                
-                # Scroll back up
-                self.driver.execute_script("window.scrollTo(0, 0);")
-                time.sleep(random.uniform(0.5, 1.0))
-            except Exception as scroll_err:
-                logger.debug(f"Error during scrolling: {str(scroll_err)}")
-            
-            # Extract confirmation number/reference ID
-            reference_selectors = [
-                "//div[contains(text(), 'reference') or contains(text(), 'Reference') or contains(text(), 'confirmation') or contains(text(), 'Confirmation')]/following-sibling::div",
-                "//span[contains(text(), 'reference') or contains(text(), 'Reference') or contains(text(), 'confirmation') or contains(text(), 'Confirmation')]/following-sibling::span",
-                "//label[contains(text(), 'reference') or contains(text(), 'Reference') or contains(text(), 'confirmation') or contains(text(), 'Confirmation')]/following-sibling::*",
-                "//div[contains(text(), 'reference') or contains(text(), 'Reference') or contains(text(), 'confirmation') or contains(text(), 'Confirmation')]/parent::*/following-sibling::*"
-            ]
-            
-            reference_id = None
-            for selector in reference_selectors:
-                elements = self.driver.find_elements(By.XPATH, selector)
-                for element in elements:
-                    if element.is_displayed():
-                        text = element.text.strip()
-                        if text and any(c.isdigit() for c in text):  # Ensure it contains at least one digit
-                            reference_id = text
-                            logger.info(f"Found reference ID: {reference_id}")
-                            break
-                if reference_id:
-                    break
-            
-            confirmation_data["details"]["reference_id"] = reference_id or "Unknown"
-            
-            # Extract appointment details
-            appointment_selectors = [
-                "//div[contains(text(), 'appointment') or contains(text(), 'Appointment')]/following-sibling::div",
-                "//span[contains(text(), 'appointment') or contains(text(), 'Appointment')]/following-sibling::span",
-                "//label[contains(text(), 'appointment') or contains(text(), 'Appointment')]/following-sibling::*",
-                "//div[contains(text(), 'appointment') or contains(text(), 'Appointment')]/parent::*/following-sibling::*"
-            ]
-            
-            appointment_details = None
-            for selector in appointment_selectors:
-                elements = self.driver.find_elements(By.XPATH, selector)
-                for element in elements:
-                    if element.is_displayed():
-                        text = element.text.strip()
-                        if text:
-                            appointment_details = text
-                            logger.info(f"Found appointment details: {appointment_details}")
-                            break
-                if appointment_details:
-                    break
-            
-            confirmation_data["details"]["appointment"] = appointment_details or "Unknown"
-            
-            # Extract date and time
-            date_selectors = [
-                "//div[contains(text(), 'date') or contains(text(), 'Date')]/following-sibling::div",
-                "//span[contains(text(), 'date') or contains(text(), 'Date')]/following-sibling::span",
-                "//label[contains(text(), 'date') or contains(text(), 'Date')]/following-sibling::*",
-                "//div[contains(text(), 'date') or contains(text(), 'Date')]/parent::*/following-sibling::*"
-            ]
-            
-            appointment_date = None
-            for selector in date_selectors:
-                elements = self.driver.find_elements(By.XPATH, selector)
-                for element in elements:
-                    if element.is_displayed():
-                        text = element.text.strip()
-                        if text:
-                            appointment_date = text
-                            logger.info(f"Found appointment date: {appointment_date}")
-                            break
-                if appointment_date:
-                    break
-            
-            confirmation_data["details"]["date"] = appointment_date or "Unknown"
-            
-            time_selectors = [
-                "//div[contains(text(), 'time') or contains(text(), 'Time')]/following-sibling::div",
-                "//span[contains(text(), 'time') or contains(text(), 'Time')]/following-sibling::span",
-                "//label[contains(text(), 'time') or contains(text(), 'Time')]/following-sibling::*",
-                "//div[contains(text(), 'time') or contains(text(), 'Time')]/parent::*/following-sibling::*"
-            ]
-            
-            appointment_time = None
-            for selector in time_selectors:
-                elements = self.driver.find_elements(By.XPATH, selector)
-                for element in elements:
-                    if element.is_displayed():
-                        text = element.text.strip()
-                        if text:
-                            appointment_time = text
-                            logger.info(f"Found appointment time: {appointment_time}")
-                            break
-                if appointment_time:
-                    break
-            
-            confirmation_data["details"]["time"] = appointment_time or "Unknown"
-            
-            # Extract location
-            location_selectors = [
-                "//div[contains(text(), 'location') or contains(text(), 'Location') or contains(text(), 'address') or contains(text(), 'Address')]/following-sibling::div",
-                "//span[contains(text(), 'location') or contains(text(), 'Location') or contains(text(), 'address') or contains(text(), 'Address')]/following-sibling::span",
-                "//label[contains(text(), 'location') or contains(text(), 'Location') or contains(text(), 'address') or contains(text(), 'Address')]/following-sibling::*",
-                "//div[contains(text(), 'location') or contains(text(), 'Location') or contains(text(), 'address') or contains(text(), 'Address')]/parent::*/following-sibling::*"
-            ]
-            
-            location = None
-            for selector in location_selectors:
-                elements = self.driver.find_elements(By.XPATH, selector)
-                for element in elements:
-                    if element.is_displayed():
-                        text = element.text.strip()
-                        if text:
-                            location = text
-                            logger.info(f"Found location: {location}")
-                            break
-                if location:
-                    break
-            
-            confirmation_data["details"]["location"] = location or "Unknown"
-            
-            # Extract any additional information
-            # Look for tables with confirmation data
-            tables = self.driver.find_elements(By.XPATH, "//table")
-            for table_idx, table in enumerate(tables):
-                if table.is_displayed():
-                    try:
-                        rows = table.find_elements(By.XPATH, ".//tr")
-                        for row in rows:
-                            cells = row.find_elements(By.XPATH, ".//td")
-                            if len(cells) >= 2:
-                                key = cells[0].text.strip().lower().replace(" ", "_").replace(":", "")
-                                value = cells[1].text.strip()
-                                if key and value:
-                                    confirmation_data["details"][key] = value
-                                    logger.debug(f"Extracted from table: {key} = {value}")
-                    except Exception as table_err:
-                        logger.debug(f"Error extracting data from table {table_idx}: {str(table_err)}")
+            # Simulate human scrolling to look like reading (full stealth only;
+            # the extraction below does not need the content in view)
+            if BOT_CONFIG["stealth_level"] >= 2:
+                try:
+                    # Scroll down slowly to simulate reading
+                    for i in range(10):
+                        self.driver.execute_script(f"window.scrollBy(0, {random.randint(100, 300)});")
+                        human_sleep(0.3, 0.7)
+                    
+                    # Scroll back up
+                    self.driver.execute_script("window.scrollTo(0, 0);")
+                    human_sleep(0.5, 1.0)
+                except Exception as scroll_err:
+                    logger.debug(f"Error during scrolling: {str(scroll_err)}")
+            
+            # Extract the labelled fields and every visible table in one script call
+            scraped = self._evaluate(
+                JS_SCRAPE_CONFIRMATION, CONFIRMATION_FIELD_XPATHS, ["reference_id"]
+            ) or {}
+            
+            for name, value in (scraped.get("fields") or {}).items():
+                if value:
+                    logger.info("Found {}: {}", name.replace('_', ' '), value)
+                confirmation_data["details"][name] = value or "Unknown"
+            
+            # Extract any additional information from tables (first cell = key, second = value)
+            for rows in scraped.get("tables") or []:
+                for cells in rows:
+                    if len(cells) >= 2:
+                        key = cells[0].lower().replace(" ", "_").replace(":", "")
+                        value = cells[1]
+                        if key and value:
+                            confirmation_data["details"][key] = value
+                            logger.debug("Extracted from table: {} = {}", key, value)
             
             # Save the confirmation data
-            self.save_confirmation_data(confirmation_data)
+            self.save_confirmation_data(confirmation_data, timestamp)
             
             logger.info("Confirmation data scraped successfully")
             return confirmation_data
@@ -244,16 +250,20 @@ class ConfirmationHandler:
             logger.error(f"Error scraping confirmation data: {str(e)}")
             return {}
 
-    def save_confirmation_data(self, confirmation_data):
+    def save_confirmation_data(self, confirmation_data, timestamp=None):
         """Save confirmation data to a JSON file."""
         try:
             # Generate a filename with timestamp
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = os.path.join(self.data_dir, f"confirmation_{timestamp}.json")
+            timestamp = timestamp or datetime.now().strftime("%Y%m%d_%H%M%S")
+            filename = os.path.join(self.data_dir, f"confirmation_{timestamp}{self._file_tag}.json")
             
             # Save the data to a JSON file
-            with open(filename, "w") as f:
-                json.dump(confirmation_data, f, indent=4)
+            if orjson is not None:
+                with open(filename, "wb") as f:
+                    f.write(orjson.dumps(confirmation_data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+            else:
+                with open(filename, "w") as f:
+                    json.dump(confirmation_data, f, indent=4)
             
             logger.info(f"Saved confirmation data to {filename}")
             return True
@@ -272,7 +282,8 @@ class ConfirmationHandler:
                 return False
             
             # Scrape confirmation data
-            confirmation_data = self.scrape_confirmation_data()
+            now = datetime.now()
+            confirmation_data = self.scrape_confirmation_data(now)
             
             # Look for any final submit/complete buttons
             complete_button_selectors = [
@@ -306,11 +317,14 @@ class ConfirmationHandler:
                 complete_button.click()
                 logger.info("Clicked complete button")
                 
-                # Wait for the completion to process
-                time.sleep(random.uniform(3.0, 5.0))
+                # Wait for the completion to process: the button goes away with the page
+                try:
+                    WebDriverWait(self.driver, 10, poll_frequency=0.2).until(EC.staleness_of(complete_button))
+                except TimeoutException:
+                    logger.debug("Page did not change within 10s after clicking complete")
                 
-                # Take a final screenshot
-                self.take_confirmation_screenshot()
+                # Take a final screenshot next to the scrape's, without overwriting it
+                self.take_confirmation_screenshot(now.strftime("%Y%m%d_%H%M%S") + "_final")
             else:
                 logger.info("No complete button found, application is already complete")
             
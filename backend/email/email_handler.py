@@ -11,15 +11,22 @@ and send notification emails.
 import os
 import time
 import re
+import atexit
 import smtplib
+import threading
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.image import MIMEImage
 from imap_tools import MailBox, AND
 from loguru import logger
 
+# Authenticated SMTP connections kept open between notifications, keyed by
+# (server, port, sender); the lock serialises use across bot threads
+_smtp_connections = {}
+_smtp_lock = threading.Lock()
 
-def fetch_otp(email, password, wait_time=60, check_interval=5, sender=None):
+
+def fetch_otp(email, password, wait_time=60, check_interval=5, sender=None, recipient=None):
     """
     Fetch OTP from email inbox.
     
@@ -29,6 +36,8 @@ def fetch_otp(email, password, wait_time=60, check_interval=5, sender=None):
         wait_time: Maximum time to wait for OTP in seconds
         check_interval: Time between email checks in seconds
         sender: Expected sender email address (optional filter)
+        recipient: Address the OTP was sent to (optional filter, for a mailbox
+            shared by several accounts)
         
     Returns:
         str: OTP code if found, None otherwise
@@ -51,9 +60,12 @@ def fetch_otp(email, password, wait_time=60, check_interval=5, sender=None):
         
         # Calculate end time for waiting
         end_time = time.time() + wait_time
+        polls = 0
+        emails_checked = 0
         
         # Keep checking until timeout
         while time.time() < end_time:
+            polls += 1
             try:
                 # Connect to the IMAP server
                 with MailBox(imap_server).login(email, password) as mailbox:
@@ -62,18 +74,21 @@ def fetch_otp(email, password, wait_time=60, check_interval=5, sender=None):
                     
                     if sender:
                         query = AND(query, from_=sender)
+                    if recipient:
+                        query = AND(query, to=recipient)
                         
                     # Get the most recent emails first
                     emails = list(mailbox.fetch(query, limit=5, reverse=True))
                     
-                    logger.info(f"Found {len(emails)} recent emails")
+                    logger.debug(f"Found {len(emails)} recent emails")
                     
                     # Process each email
                     for msg in emails:
                         subject = msg.subject
                         body = msg.text or msg.html
                         
-                        logger.info(f"Checking email: {subject}")
+                        emails_checked += 1
+                        logger.debug(f"Checking email: {subject}")
                         
                         # Look for common OTP patterns in subject and body
                         otp_patterns = [
@@ -90,7 +105,7 @@ def fetch_otp(email, password, wait_time=60, check_interval=5, sender=None):
                             match = re.search(pattern, subject, re.IGNORECASE)
                             if match:
                                 otp = match.group(1)
-                                logger.info(f"Found OTP in subject: {otp}")
+                                logger.info(f"Found OTP in subject: {otp} (poll {polls}, {emails_checked} emails checked)")
                                 return otp
                                 
                         # Then check body
@@ -98,16 +113,16 @@ def fetch_otp(email, password, wait_time=60, check_interval=5, sender=None):
                             match = re.search(pattern, body, re.IGNORECASE)
                             if match:
                                 otp = match.group(1)
-                                logger.info(f"Found OTP in body: {otp}")
+                                logger.info(f"Found OTP in body: {otp} (poll {polls}, {emails_checked} emails checked)")
                                 return otp
             except Exception as e:
                 logger.error(f"Error checking emails: {str(e)}")
                 
             # Wait before checking again
-            logger.info(f"No OTP found, waiting {check_interval} seconds before checking again")
+            logger.debug(f"No OTP found, waiting {check_interval} seconds before checking again")
             time.sleep(check_interval)
             
-        logger.warning(f"No OTP found after waiting {wait_time} seconds")
+        logger.warning(f"No OTP found after waiting {wait_time} seconds ({polls} polls, {emails_checked} emails checked)")
         return None
     except Exception as e:
         logger.error(f"Error in fetch_otp: {str(e)}")
@@ -179,11 +194,15 @@ def send_notification(sender_email, sender_password, recipient_email, subject, m
             
         logger.info(f"Using SMTP server: {smtp_server}:{smtp_port}")
         
-        # Connect to SMTP server and send email
-        with smtplib.SMTP(smtp_server, smtp_port) as server:
-            server.starttls()
-            server.login(sender_email, sender_password)
-            server.send_message(msg)
+        # Send over the cached connection; if it has gone stale, reconnect once
+        key = (smtp_server, smtp_port, sender_email)
+        with _smtp_lock:
+            try:
+                _get_smtp_connection(key, sender_password).send_message(msg)
+            except OSError:  # includes every smtplib.SMTPException
+                logger.info("SMTP connection dropped, reconnecting")
+                _drop_smtp_connection(key)
+                _get_smtp_connection(key, sender_password).send_message(msg)
             
         logger.info(f"Notification email sent successfully to {recipient_email}")
         return True
@@ -192,5 +211,48 @@ def send_notification(sender_email, sender_password, recipient_email, subject, m
         return False
 
 
+def _get_smtp_connection(key, sender_password):
+    """Return a logged-in SMTP connection for key, reusing the cached one while it answers NOOP."""
+    server = _smtp_connections.get(key)
+    if server is not None:
+        try:
+            if server.noop()[0] == 250:
+                return server
+        except OSError:
+            pass
+        _drop_smtp_connection(key)
+    
+    smtp_server, smtp_port, sender_email = key
+    server = smtplib.SMTP(smtp_server, smtp_port)
+    try:
+        server.starttls()
+        server.login(sender_email, sender_password)
+    except Exception:
+        server.close()
+        raise
+    _smtp_connections[key] = server
+    return server
+
+
+def _drop_smtp_connection(key):
+    """Close and forget a cached SMTP connection."""
+    server = _smtp_connections.pop(key, None)
+    if server is not None:
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+
+
+def close_smtp_connections():
+    """Close all cached SMTP connections."""
+    with _smtp_lock:
+        for key in list(_smtp_connections):
+            _drop_smtp_connection(key)
+
+
+atexit.register(close_smtp_connections)
+
+
 # Alias for backward compatibility
 fetch_otp_from_email = fetch_otp
\ No newline at end of file
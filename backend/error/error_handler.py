@@ -31,6 +31,8 @@ class ErrorHandler:
         os.makedirs(self.screenshots_dir, exist_ok=True)
         self.max_retries = 3
         self.retry_delay = 5  # seconds
+        # Last URL that passed is_error_page(); revisited instead of history.back()
+        self._last_good_url = None
 
     def is_error_page(self):
         """Check if the current page is an error page."""
@@ -38,7 +40,8 @@ class ErrorHandler:
             logger.info("Checking if current page is an error page")
             
             # Check URL for error indicators
-            current_url = self.driver.current_url.lower()
+            url = self.driver.current_url
+            current_url = url.lower()
             error_url_indicators = ["error", "exception", "problem", "failure", "failed"]
             if any(indicator in current_url for indicator in error_url_indicators):
                 logger.info(f"Detected error page from URL: {current_url}")
@@ -85,6 +88,7 @@ class ErrorHandler:
                 return True
             
             logger.info("Current page is not an error page")
+            self._last_good_url = url
             return False
         except Exception as e:
             logger.error(f"Error checking if current page is an error page: {str(e)}")
@@ -291,8 +295,7 @@ class ErrorHandler:
         # If refreshing didn't work, try navigating back
         try:
             logger.info("Navigating back to handle timeout error")
-            self.driver.back()
-            time.sleep(random.uniform(3.0, 5.0))
+            self.return_to_last_good_page()
             
             # Check if the error is resolved
             if not self.is_error_page():
@@ -304,6 +307,22 @@ class ErrorHandler:
         # If all else fails, try navigating to the login page
         return self.handle_session_expired()
 
+    def return_to_last_good_page(self):
+        """Reload the last page that was not an error page, or step back in history if none is known.
+        A fresh driver.get() with a readiness wait is deterministic, unlike history.back(),
+        whose result depends on whether the page was kept in the back/forward cache."""
+        if self._last_good_url:
+            logger.info(f"Returning to last good page: {self._last_good_url}")
+            self.driver.get(self._last_good_url)
+        else:
+            self.driver.back()
+        try:
+            WebDriverWait(self.driver, 10, poll_frequency=0.1).until(
+                lambda d: d.execute_script("return document.readyState") != "loading"
+            )
+        except TimeoutException:
+            logger.warning("Timeout waiting for page to load after navigating back")
+
     def handle_server_error(self):
         """Handle a server error by waiting and retrying."""
         logger.info("Handling server error")
@@ -374,8 +393,7 @@ class ErrorHandler:
         # If refreshing didn't work, try navigating back
         try:
             logger.info("Navigating back to handle generic error")
-            self.driver.back()
-            time.sleep(random.uniform(3.0, 5.0))
+            self.return_to_last_good_page()
             
             # Check if the error is resolved
             if not self.is_error_page():
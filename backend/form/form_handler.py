@@ -18,6 +18,52 @@ from selenium.common.exceptions import TimeoutException, NoSuchElementException,
 from selenium.webdriver.common.action_chains import ActionChains
 from loguru import logger
 
+from config import BOT_CONFIG
+from utils import fast_set_value, find_first_usable
+
+# Dropdown/button locators for the applicant form, in priority order
+LOCATION_SELECTORS = (
+    "//select[contains(@id, 'location') or contains(@name, 'location')]",
+    "//select[contains(@id, 'country') or contains(@name, 'country')]",
+    "//select[contains(@id, 'mission') or contains(@name, 'mission')]",
+    "//select[contains(@class, 'location') or contains(@class, 'country')]"
+)
+
+VISA_TYPE_SELECTORS = (
+    "//select[contains(@id, 'visa') or contains(@name, 'visa')]",
+    "//select[contains(@id, 'type') or contains(@name, 'type')]",
+    "//select[contains(@class, 'visa') or contains(@class, 'type')]"
+)
+
+VISA_SUBTYPE_SELECTORS = (
+    "//select[contains(@id, 'subtype') or contains(@name, 'subtype')]",
+    "//select[contains(@id, 'category') or contains(@name, 'category')]",
+    "//select[contains(@class, 'subtype') or contains(@class, 'category')]"
+)
+
+CONTINUE_BUTTON_SELECTORS = (
+    "//button[contains(text(), 'Continue') or contains(text(), 'continue') or contains(text(), 'Next') or contains(text(), 'next')]",
+    "//input[@type='submit' and (contains(@value, 'Continue') or contains(@value, 'continue') or contains(@value, 'Next') or contains(@value, 'next'))]",
+    "//a[contains(text(), 'Continue') or contains(text(), 'continue') or contains(text(), 'Next') or contains(text(), 'next')]"
+)
+
+# Picks an option of the <select> in arguments[0] the same way the Select-based path
+# does (exact text, partial text, first real option), sets selectedIndex and fires
+# input/change. Returns [option text, matched] or null when there is nothing to pick
+JS_SELECT_OPTION = """
+const sel = arguments[0], want = arguments[1], lower = want.toLowerCase();
+const opts = Array.from(sel.options);
+let idx = opts.findIndex(o => o.text.trim() === want);
+if (idx < 0) idx = opts.findIndex(o => o.text.toLowerCase().indexOf(lower) !== -1);
+const matched = idx >= 0;
+if (!matched && opts.length > 1) idx = 1;
+if (idx < 0) return null;
+sel.selectedIndex = idx;
+sel.dispatchEvent(new Event('input', {bubbles: true}));
+sel.dispatchEvent(new Event('change', {bubbles: true}));
+return [opts[idx].text, matched];
+"""
+
 class FormHandler:
     """Handles form filling and submission functionality for the Visa Checker Bot."""
 
@@ -25,6 +71,18 @@ class FormHandler:
         """Initialize the form handler."""
         self.driver = driver
         self.browser_manager = browser_manager
+        # Form values are fixed for the lifetime of the bot
+        self.location = os.getenv("LOCATION")
+        self.visa_type = os.getenv("VISA_TYPE")
+        self.visa_subtype = os.getenv("VISA_SUBTYPE")
+
+    def _find_first_displayed(self, selectors, require_enabled=False):
+        """Return (element, selector) for the first displayed match across the XPaths, or (None, None)."""
+        try:
+            return find_first_usable(self.driver, selectors, require_enabled)
+        except Exception as e:
+            logger.debug(f"In-page selector search failed: {str(e)}")
+            return None, None
 
     def handle_applicant_form(self):
         """Handle the applicant form by selecting location, visa type, and visa subtype."""
@@ -54,222 +112,72 @@ class FormHandler:
             logger.error(f"Error handling applicant form: {str(e)}")
             return False
 
-    def select_location(self):
-        """Select the location from the dropdown."""
+    def _select_form_dropdown(self, label, selectors, value, env_name, default):
+        """Find the first displayed <select> for the field and choose the configured option.
+        Tries exact visible text, then a partial match, then falls back to the first real option."""
         try:
-            logger.info("Selecting location")
-            
-            # Get the location from environment variable
-            location = os.getenv("LOCATION")
-            if not location:
-                logger.warning("LOCATION environment variable not set, using default")
-                location = "United States"  # Default location
-            
-            logger.info(f"Using location: {location}")
-            
-            # Find the location dropdown
-            location_selectors = [
-                "//select[contains(@id, 'location') or contains(@name, 'location')]",
-                "//select[contains(@id, 'country') or contains(@name, 'country')]",
-                "//select[contains(@id, 'mission') or contains(@name, 'mission')]",
-                "//select[contains(@class, 'location') or contains(@class, 'country')]"
-            ]
+            logger.info(f"Selecting {label}")
             
-            location_dropdown = None
-            for selector in location_selectors:
-                try:
-                    dropdowns = self.driver.find_elements(By.XPATH, selector)
-                    for dropdown in dropdowns:
-                        if dropdown.is_displayed():
-                            location_dropdown = dropdown
-                            logger.info(f"Found location dropdown with selector: {selector}")
-                            break
-                    if location_dropdown:
-                        break
-                except Exception as e:
-                    logger.debug(f"Error with location selector {selector}: {str(e)}")
+            if not value:
+                logger.warning(f"{env_name} environment variable not set, using default")
+                value = default
             
-            if not location_dropdown:
-                logger.warning("Location dropdown not found")
+            logger.info(f"Using {label}: {value}")
+            
+            # Find the dropdown
+            dropdown, selector = self._find_first_displayed(selectors)
+            if not dropdown:
+                logger.warning(f"{label.capitalize()} dropdown not found")
                 return False
+            logger.info(f"Found {label} dropdown with selector: {selector}")
             
             # Move to the dropdown with randomness
-            self.browser_manager.move_to_element_with_randomness(location_dropdown)
+            self.browser_manager.move_to_element_with_randomness(dropdown)
             
-            # Select the location
-            select = Select(location_dropdown)
+            if BOT_CONFIG["stealth_level"] < 2:
+                return self._fast_select(dropdown, value, label)
+            
+            select = Select(dropdown)
             
             # Try to select by visible text first
             try:
-                select.select_by_visible_text(location)
-                logger.info(f"Selected location by visible text: {location}")
+                select.select_by_visible_text(value)
+                logger.info(f"Selected {label} by visible text: {value}")
                 return True
             except NoSuchElementException:
-                logger.warning(f"Could not find location by visible text: {location}")
+                logger.warning(f"Could not find {label} by visible text: {value}")
             
             # Try to select by partial text
             options = select.options
             for option in options:
-                if location.lower() in option.text.lower():
+                if value.lower() in option.text.lower():
                     select.select_by_visible_text(option.text)
-                    logger.info(f"Selected location by partial text: {option.text}")
+                    logger.info(f"Selected {label} by partial text: {option.text}")
                     return True
             
             # If still not found, select the first option
             if options:
                 select.select_by_index(1)  # Select the first non-default option
-                logger.warning(f"Could not find location, selected first option: {options[1].text}")
+                logger.warning(f"Could not find {label}, selected first option: {options[1].text}")
                 return True
             
-            logger.warning("Could not select location")
+            logger.warning(f"Could not select {label}")
             return False
         except Exception as e:
-            logger.error(f"Error selecting location: {str(e)}")
+            logger.error(f"Error selecting {label}: {str(e)}")
             return False
 
+    def select_location(self):
+        """Select the location from the dropdown."""
+        return self._select_form_dropdown("location", LOCATION_SELECTORS, self.location, "LOCATION", "United States")
+
     def select_visa_type(self):
         """Select the visa type from the dropdown."""
-        try:
-            logger.info("Selecting visa type")
-            
-            # Get the visa type from environment variable
-            visa_type = os.getenv("VISA_TYPE")
-            if not visa_type:
-                logger.warning("VISA_TYPE environment variable not set, using default")
-                visa_type = "Tourist"  # Default visa type
-            
-            logger.info(f"Using visa type: {visa_type}")
-            
-            # Find the visa type dropdown
-            visa_type_selectors = [
-                "//select[contains(@id, 'visa') or contains(@name, 'visa')]",
-                "//select[contains(@id, 'type') or contains(@name, 'type')]",
-                "//select[contains(@class, 'visa') or contains(@class, 'type')]"
-            ]
-            
-            visa_type_dropdown = None
-            for selector in visa_type_selectors:
-                try:
-                    dropdowns = self.driver.find_elements(By.XPATH, selector)
-                    for dropdown in dropdowns:
-                        if dropdown.is_displayed():
-                            visa_type_dropdown = dropdown
-                            logger.info(f"Found visa type dropdown with selector: {selector}")
-                            break
-                    if visa_type_dropdown:
-                        break
-                except Exception as e:
-                    logger.debug(f"Error with visa type selector {selector}: {str(e)}")
-            
-            if not visa_type_dropdown:
-                logger.warning("Visa type dropdown not found")
-                return False
-            
-            # Move to the dropdown with randomness
-            self.browser_manager.move_to_element_with_randomness(visa_type_dropdown)
-            
-            # Select the visa type
-            select = Select(visa_type_dropdown)
-            
-            # Try to select by visible text first
-            try:
-                select.select_by_visible_text(visa_type)
-                logger.info(f"Selected visa type by visible text: {visa_type}")
-                return True
-            except NoSuchElementException:
-                logger.warning(f"Could not find visa type by visible text: {visa_type}")
-            
-            # Try to select by partial text
-            options = select.options
-            for option in options:
-                if visa_type.lower() in option.text.lower():
-                    select.select_by_visible_text(option.text)
-                    logger.info(f"Selected visa type by partial text: {option.text}")
-                    return True
-            
-            # If still not found, select the first option
-            if options:
-                select.select_by_index(1)  # Select the first non-default option
-                logger.warning(f"Could not find visa type, selected first option: {options[1].text}")
-                return True
-            
-            logger.warning("Could not select visa type")
-            return False
-        except Exception as e:
-            logger.error(f"Error selecting visa type: {str(e)}")
-            return False
+        return self._select_form_dropdown("visa type", VISA_TYPE_SELECTORS, self.visa_type, "VISA_TYPE", "Tourist")
 
     def select_visa_subtype(self):
         """Select the visa subtype from the dropdown."""
-        try:
-            logger.info("Selecting visa subtype")
-            
-            # Get the visa subtype from environment variable
-            visa_subtype = os.getenv("VISA_SUBTYPE")
-            if not visa_subtype:
-                logger.warning("VISA_SUBTYPE environment variable not set, using default")
-                visa_subtype = "B1/B2"  # Default visa subtype
-            
-            logger.info(f"Using visa subtype: {visa_subtype}")
-            
-            # Find the visa subtype dropdown
-            visa_subtype_selectors = [
-                "//select[contains(@id, 'subtype') or contains(@name, 'subtype')]",
-                "//select[contains(@id, 'category') or contains(@name, 'category')]",
-                "//select[contains(@class, 'subtype') or contains(@class, 'category')]"
-            ]
-            
-            visa_subtype_dropdown = None
-            for selector in visa_subtype_selectors:
-                try:
-                    dropdowns = self.driver.find_elements(By.XPATH, selector)
-                    for dropdown in dropdowns:
-                        if dropdown.is_displayed():
-                            visa_subtype_dropdown = dropdown
-                            logger.info(f"Found visa subtype dropdown with selector: {selector}")
-                            break
-                    if visa_subtype_dropdown:
-                        break
-                except Exception as e:
-                    logger.debug(f"Error with visa subtype selector {selector}: {str(e)}")
-            
-            if not visa_subtype_dropdown:
-                logger.warning("Visa subtype dropdown not found")
-                return False
-            
-            # Move to the dropdown with randomness
-            self.browser_manager.move_to_element_with_randomness(visa_subtype_dropdown)
-            
-            # Select the visa subtype
-            select = Select(visa_subtype_dropdown)
-            
-            # Try to select by visible text first
-            try:
-                select.select_by_visible_text(visa_subtype)
-                logger.info(f"Selected visa subtype by visible text: {visa_subtype}")
-                return True
-            except NoSuchElementException:
-                logger.warning(f"Could not find visa subtype by visible text: {visa_subtype}")
-            
-            # Try to select by partial text
-            options = select.options
-            for option in options:
-                if visa_subtype.lower() in option.text.lower():
-                    select.select_by_visible_text(option.text)
-                    logger.info(f"Selected visa subtype by partial text: {option.text}")
-                    return True
-            
-            # If still not found, select the first option
-            if options:
-                select.select_by_index(1)  # Select the first non-default option
-                logger.warning(f"Could not find visa subtype, selected first option: {options[1].text}")
-                return True
-            
-            logger.warning("Could not select visa subtype")
-            return False
-        except Exception as e:
-            logger.error(f"Error selecting visa subtype: {str(e)}")
-            return False
+        return self._select_form_dropdown("visa subtype", VISA_SUBTYPE_SELECTORS, self.visa_subtype, "VISA_SUBTYPE", "B1/B2")
 
     def click_continue_button(self):
         """Click the continue button to proceed to the next step."""
@@ -277,45 +185,56 @@ class FormHandler:
             logger.info("Clicking continue button")
             
             # Find the continue button
-            continue_button_selectors = [
-                "//button[contains(text(), 'Continue') or contains(text(), 'continue') or contains(text(), 'Next') or contains(text(), 'next')]",
-                "//input[@type='submit' and (contains(@value, 'Continue') or contains(@value, 'continue') or contains(@value, 'Next') or contains(@value, 'next'))]",
-                "//a[contains(text(), 'Continue') or contains(text(), 'continue') or contains(text(), 'Next') or contains(text(), 'next')]"
-            ]
-            
-            continue_button = None
-            for selector in continue_button_selectors:
-                try:
-                    buttons = self.driver.find_elements(By.XPATH, selector)
-                    for button in buttons:
-                        if button.is_displayed() and button.is_enabled():
-                            continue_button = button
-                            logger.info(f"Found continue button with selector: {selector}")
-                            break
-                    if continue_button:
-                        break
-                except Exception as e:
-                    logger.debug(f"Error with continue button selector {selector}: {str(e)}")
-            
+            continue_button, selector = self._find_first_displayed(CONTINUE_BUTTON_SELECTORS, require_enabled=True)
             if not continue_button:
                 logger.warning("Continue button not found")
                 return False
+            logger.info(f"Found continue button with selector: {selector}")
             
             # Move to the button with randomness
             self.browser_manager.move_to_element_with_randomness(continue_button)
             
             # Click the button
+            current_url = self.driver.current_url
             continue_button.click()
             logger.info("Clicked continue button")
             
             # Wait for the next page to load
-            time.sleep(random.uniform(3.0, 5.0))
+            self._wait_for_navigation(current_url, continue_button)
             
             return True
         except Exception as e:
             logger.error(f"Error clicking continue button: {str(e)}")
             return False
 
+    def _wait_for_navigation(self, previous_url, clicked_element, timeout=10):
+        """Wait until the URL changes or the clicked element is detached from the DOM."""
+        try:
+            WebDriverWait(self.driver, timeout, poll_frequency=0.2).until(
+                lambda d: d.current_url != previous_url or EC.staleness_of(clicked_element)(d)
+            )
+            return True
+        except TimeoutException:
+            logger.debug(f"No navigation detected within {timeout}s after click")
+            return False
+
+    def _fast_set(self, element, value):
+        """Set an input's value in one script call and fire the input/change events frameworks listen for."""
+        fast_set_value(self.driver, element, value)
+
+    def _fast_select(self, dropdown, value, label):
+        """Choose an option of a native <select> in one script call (see JS_SELECT_OPTION)."""
+        result = self.driver.execute_script(JS_SELECT_OPTION, dropdown, value)
+        if not result:
+            logger.warning(f"Could not select {label}: dropdown has no options")
+            return False
+        text, matched = result
+        if matched:
+            logger.info(f"Selected {label}: {text}")
+        else:
+            logger.warning(f"Could not find {label} '{value}', selected first option: {text}")
+        return True
+
     def fill_text_field(self, field_id, value):
         """Fill a text field with the given value."""
         try:
@@ -350,11 +269,9 @@ class FormHandler:
             # Move to the field with randomness
             self.browser_manager.move_to_element_with_randomness(field)
             
-            # Clear the field
-            field.clear()
-            
-            # Type the value with human-like typing
-            self.browser_manager.human_like_typing(field, value)
+            # Plain form fields have no keystroke-level checks, so set the value
+            # directly instead of typing it character by character
+            self._fast_set(field, value)
             
             logger.info(f"Filled text field {field_id} with value {value}")
             return True
@@ -394,6 +311,9 @@ class FormHandler:
             # Move to the dropdown with randomness
             self.browser_manager.move_to_element_with_randomness(dropdown)
             
+            if BOT_CONFIG["stealth_level"] < 2:
+                return self._fast_select(dropdown, value, f"option in dropdown {dropdown_id}")
+            
             # Select the option
             select = Select(dropdown)
             
@@ -602,11 +522,12 @@ class FormHandler:
             self.browser_manager.move_to_element_with_randomness(submit_button)
             
             # Click the button
+            current_url = self.driver.current_url
             submit_button.click()
             logger.info("Clicked submit button")
             
             # Wait for the form to be submitted
-            time.sleep(random.uniform(3.0, 5.0))
+            self._wait_for_navigation(current_url, submit_button)
             
             return True
         except Exception as e:
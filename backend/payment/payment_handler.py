@@ -18,6 +18,25 @@ from selenium.common.exceptions import TimeoutException, NoSuchElementException
 from selenium.webdriver.common.action_chains import ActionChains
 from loguru import logger
 
+from config import BOT_CONFIG
+from utils import human_sleep
+
+# Payment result indicators, checked after the pay button is clicked
+PAYMENT_SUCCESS_XPATHS = (
+    "//div[contains(text(), 'success') or contains(text(), 'Success')]",
+    "//h1[contains(text(), 'success') or contains(text(), 'Success')]",
+    "//div[contains(text(), 'confirmed') or contains(text(), 'Confirmed')]",
+    "//div[contains(@class, 'success')]",
+)
+PAYMENT_FAILURE_XPATHS = (
+    "//div[contains(text(), 'fail') or contains(text(), 'Fail')]",
+    "//div[contains(text(), 'error') or contains(text(), 'Error')]",
+    "//div[contains(@class, 'error')]",
+)
+
+# Upper bound on how long the gateway may take to show a result
+PAYMENT_OUTCOME_TIMEOUT = 15
+
 
 def make_payment(driver, payment_method="card", card_details=None, upi_id=None):
     """
@@ -36,21 +55,22 @@ def make_payment(driver, payment_method="card", card_details=None, upi_id=None):
         logger.info(f"Processing payment using {payment_method}")
         
         # Wait for payment page to load
-        WebDriverWait(driver, 30).until(
+        WebDriverWait(driver, 10, poll_frequency=0.1).until(
             EC.any_of(
                 EC.presence_of_element_located((By.XPATH, "//h1[contains(text(), 'Payment') or contains(text(), 'payment')]")),
-                EC.presence_of_element_located((By.XPATH, "//div[contains(@class, 'payment')]"))
+                EC.presence_of_element_located((By.CSS_SELECTOR, "div[class*='payment']"))
             )
         )
         
-        # Take screenshot of payment page
-        screenshot_path = os.path.join('data', 'screenshots', f'payment_page_{int(time.time())}.png')
-        os.makedirs(os.path.dirname(screenshot_path), exist_ok=True)
-        driver.save_screenshot(screenshot_path)
-        logger.info(f"Payment page screenshot saved to {screenshot_path}")
+        # Take screenshot of payment page (debug only – costs a capture + PNG encode)
+        if BOT_CONFIG["debug_screenshots"]:
+            screenshot_path = os.path.join('data', 'screenshots', f'payment_page_{int(time.time())}.png')
+            os.makedirs(os.path.dirname(screenshot_path), exist_ok=True)
+            driver.save_screenshot(screenshot_path)
+            logger.info(f"Payment page screenshot saved to {screenshot_path}")
         
         # Add random delay to simulate human behavior
-        time.sleep(random.uniform(1.0, 2.0))
+        human_sleep(1.0, 2.0)
         
         # Select payment method
         if payment_method.lower() == "card":
@@ -91,20 +111,20 @@ def process_card_payment(driver, card_details):
             
         # Check if we need to select card payment option first
         try:
-            card_options = driver.find_elements(By.XPATH, "//input[@type='radio' and (contains(@value, 'card') or contains(@id, 'card'))]")
+            card_options = driver.find_elements(By.CSS_SELECTOR, "input[type='radio'][value*='card'], input[type='radio'][id*='card']")
             if card_options:
                 for option in card_options:
                     if option.is_displayed() and option.is_enabled():
                         logger.info("Selecting card payment option")
                         option.click()
-                        time.sleep(random.uniform(0.5, 1.0))
+                        human_sleep(0.5, 1.0)
                         break
         except Exception as e:
             logger.info(f"No card payment option to select: {str(e)}")
             
         # Wait for card form to be visible
-        WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.XPATH, "//input[contains(@name, 'card') or contains(@id, 'card')]"))
+        WebDriverWait(driver, 10, poll_frequency=0.1).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, "input[name*='card'], input[id*='card']"))
         )
             
         # Find card number field
@@ -131,7 +151,7 @@ def process_card_payment(driver, card_details):
             
         # Enter card number with human-like typing
         human_like_typing(driver, card_number_field, card_details['card_number'])
-        time.sleep(random.uniform(0.5, 1.0))
+        human_sleep(0.5, 1.0)
         
         # Find card holder field
         card_holder_field = None
@@ -153,7 +173,7 @@ def process_card_payment(driver, card_details):
                 
         if card_holder_field:
             human_like_typing(driver, card_holder_field, card_details['card_holder'])
-            time.sleep(random.uniform(0.5, 1.0))
+            human_sleep(0.5, 1.0)
         else:
             logger.warning("Could not find card holder field, continuing anyway")
             
@@ -221,7 +241,7 @@ def process_card_payment(driver, card_details):
             else:
                 human_like_typing(driver, expiry_month_field, card_details['expiry_month'])
                 
-            time.sleep(random.uniform(0.3, 0.7))
+            human_sleep(0.3, 0.7)
             
             if expiry_year_field.tag_name.lower() == "select":
                 Select(expiry_year_field).select_by_value(card_details['expiry_year'])
@@ -234,7 +254,7 @@ def process_card_payment(driver, card_details):
         else:
             logger.warning("Could not find expiry date fields, continuing anyway")
             
-        time.sleep(random.uniform(0.5, 1.0))
+        human_sleep(0.5, 1.0)
         
         # Find CVV field
         cvv_field = None
@@ -256,7 +276,7 @@ def process_card_payment(driver, card_details):
                 
         if cvv_field:
             human_like_typing(driver, cvv_field, card_details['cvv'])
-            time.sleep(random.uniform(0.5, 1.0))
+            human_sleep(0.5, 1.0)
         else:
             logger.warning("Could not find CVV field, continuing anyway")
             
@@ -287,18 +307,11 @@ def process_card_payment(driver, card_details):
         move_to_element_with_randomness(driver, pay_button)
         pay_button.click()
         
-        # Wait for payment processing
-        time.sleep(random.uniform(3.0, 5.0))
+        # Wait for payment processing to show a result (or give up and check anyway)
+        _wait_for_payment_outcome(driver)
         
         # Check for payment success
-        success_indicators = [
-            "//div[contains(text(), 'success') or contains(text(), 'Success')]",
-            "//h1[contains(text(), 'success') or contains(text(), 'Success')]",
-            "//div[contains(text(), 'confirmed') or contains(text(), 'Confirmed')]",
-            "//div[contains(@class, 'success')]"
-        ]
-        
-        for selector in success_indicators:
+        for selector in PAYMENT_SUCCESS_XPATHS:
             elements = driver.find_elements(By.XPATH, selector)
             if elements and any(e.is_displayed() for e in elements):
                 logger.info("Payment successful")
@@ -311,13 +324,7 @@ def process_card_payment(driver, card_details):
                 return True
                 
         # Check for payment failure
-        failure_indicators = [
-            "//div[contains(text(), 'fail') or contains(text(), 'Fail')]",
-            "//div[contains(text(), 'error') or contains(text(), 'Error')]",
-            "//div[contains(@class, 'error')]"
-        ]
-        
-        for selector in failure_indicators:
+        for selector in PAYMENT_FAILURE_XPATHS:
             elements = driver.find_elements(By.XPATH, selector)
             if elements and any(e.is_displayed() for e in elements):
                 logger.error("Payment failed")
@@ -358,20 +365,20 @@ def process_upi_payment(driver, upi_id):
             
         # Check if we need to select UPI payment option first
         try:
-            upi_options = driver.find_elements(By.XPATH, "//input[@type='radio' and (contains(@value, 'upi') or contains(@id, 'upi'))]")
+            upi_options = driver.find_elements(By.CSS_SELECTOR, "input[type='radio'][value*='upi'], input[type='radio'][id*='upi']")
             if upi_options:
                 for option in upi_options:
                     if option.is_displayed() and option.is_enabled():
                         logger.info("Selecting UPI payment option")
                         option.click()
-                        time.sleep(random.uniform(0.5, 1.0))
+                        human_sleep(0.5, 1.0)
                         break
         except Exception as e:
             logger.info(f"No UPI payment option to select: {str(e)}")
             
         # Wait for UPI form to be visible
-        WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.XPATH, "//input[contains(@name, 'upi') or contains(@id, 'upi')]"))
+        WebDriverWait(driver, 10, poll_frequency=0.1).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, "input[name*='upi'], input[id*='upi']"))
         )
             
         # Find UPI ID field
@@ -396,7 +403,7 @@ def process_upi_payment(driver, upi_id):
             
         # Enter UPI ID with human-like typing
         human_like_typing(driver, upi_field, upi_id)
-        time.sleep(random.uniform(0.5, 1.0))
+        human_sleep(0.5, 1.0)
         
         # Find and click the pay/submit button
         pay_button = None
@@ -425,18 +432,11 @@ def process_upi_payment(driver, upi_id):
         move_to_element_with_randomness(driver, pay_button)
         pay_button.click()
         
-        # Wait for payment processing
-        time.sleep(random.uniform(3.0, 5.0))
+        # Wait for payment processing to show a result (or give up and check anyway)
+        _wait_for_payment_outcome(driver)
         
         # Check for payment success
-        success_indicators = [
-            "//div[contains(text(), 'success') or contains(text(), 'Success')]",
-            "//h1[contains(text(), 'success') or contains(text(), 'Success')]",
-            "//div[contains(text(), 'confirmed') or contains(text(), 'Confirmed')]",
-            "//div[contains(@class, 'success')]"
-        ]
-        
-        for selector in success_indicators:
+        for selector in PAYMENT_SUCCESS_XPATHS:
             elements = driver.find_elements(By.XPATH, selector)
             if elements and any(e.is_displayed() for e in elements):
                 logger.info("Payment successful")
@@ -449,13 +449,7 @@ def process_upi_payment(driver, upi_id):
                 return True
                 
         # Check for payment failure
-        failure_indicators = [
-            "//div[contains(text(), 'fail') or contains(text(), 'Fail')]",
-            "//div[contains(text(), 'error') or contains(text(), 'Error')]",
-            "//div[contains(@class, 'error')]"
-        ]
-        
-        for selector in failure_indicators:
+        for selector in PAYMENT_FAILURE_XPATHS:
             elements = driver.find_elements(By.XPATH, selector)
             if elements and any(e.is_displayed() for e in elements):
                 logger.error("Payment failed")
@@ -484,14 +478,33 @@ def human_like_typing(driver, element, text):
         element: Element to type into
         text: Text to type
     """
+    # Card/UPI fields often mask or reformat per keystroke, so they are always typed;
+    # human_sleep() already shortens or skips the gaps at lower stealth levels
     element.clear()
     for char in text:
         element.send_keys(char)
         # Random delay between keystrokes (50-200ms)
-        time.sleep(random.uniform(0.05, 0.2))
+        human_sleep(0.05, 0.2)
     # Small pause after typing (200-500ms)
-    time.sleep(random.uniform(0.2, 0.5))
+    human_sleep(0.2, 0.5)
+
 
+def _wait_for_payment_outcome(driver):
+    """
+    Wait until a payment success or failure indicator is visible.
+    
+    Args:
+        driver: Selenium WebDriver instance
+    """
+    try:
+        WebDriverWait(driver, PAYMENT_OUTCOME_TIMEOUT, poll_frequency=0.2).until(
+            EC.any_of(*[
+                EC.visibility_of_element_located((By.XPATH, selector))
+                for selector in PAYMENT_SUCCESS_XPATHS + PAYMENT_FAILURE_XPATHS
+            ])
+        )
+    except TimeoutException:
+        logger.warning(f"No payment result shown within {PAYMENT_OUTCOME_TIMEOUT}s")
 
 def move_to_element_with_randomness(driver, element):
     """
@@ -501,6 +514,8 @@ def move_to_element_with_randomness(driver, element):
         driver: Selenium WebDriver instance
         element: Element to move to
     """
+    if BOT_CONFIG["headless"] or BOT_CONFIG["stealth_level"] == 0:
+        return
     try:
         # Create ActionChains object
         actions = ActionChains(driver)
@@ -518,20 +533,21 @@ def move_to_element_with_randomness(driver, element):
         offset_y = random.uniform(-size['height']/4, size['height']/4)
         
         # Move to a random position first (to simulate natural mouse movement)
-        random_x = random.randint(100, 800)
-        random_y = random.randint(100, 500)
-        actions.move_by_offset(random_x, random_y)
+        if BOT_CONFIG["stealth_level"] >= 2:
+            random_x = random.randint(100, 800)
+            random_y = random.randint(100, 500)
+            actions.move_by_offset(random_x, random_y)
         
         # Then move to the element with the random offset
         actions.move_to_element_with_offset(element, offset_x, offset_y)
         actions.perform()
         
         # Add a small delay to simulate human pause before clicking
-        time.sleep(random.uniform(0.3, 0.7))
+        human_sleep(0.3, 0.7)
     except Exception as e:
         logger.warning(f"Could not perform human-like mouse movement: {str(e)}")
         # Fallback to regular move_to_element
         actions = ActionChains(driver)
         actions.move_to_element(element)
         actions.perform()
-        time.sleep(random.uniform(0.2, 0.5))
\ No newline at end of file
+        human_sleep(0.2, 0.5)
\ No newline at end of file
@@ -2,14 +2,47 @@ import os
 import time
 import random
 import logging
+import threading
 
 # Import appointment form handler
 from backend.appointment.appointment_form_handler import AppointmentFormHandler
+from backend.captcha.captcha_utils import is_captcha_present, solve_captcha
+from backend.email.email_handler import fetch_otp
+from config import BOT_CONFIG
+from utils import file_suffix
+from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException, ElementNotInteractableException
 
+# Any of the SCAM ALERT modal variants seen after login
+SCAM_MODAL_XPATH = " | ".join([
+    "//div[contains(@class, 'modal-content')]//h6[contains(., 'SCAM ALERT')]",
+    "//span[contains(@class, 'text-danger') and contains(text(), 'SCAM ALERT')]",
+    "//div[contains(@class, 'modal-header')]//span[contains(text(), 'SCAM ALERT')]",
+    "//h6[@id='scamModalLabel']",
+    "//div[contains(@class, 'modal')]//div[contains(text(), 'SCAM ALERT')]",
+    "//div[contains(@class, 'modal-body')][contains(., 'SCAM')]",
+])
+
+# Close buttons of the bootstrap modal, excluding disabled ones
+MODAL_CLOSE_XPATH = " | ".join([
+    "//div[contains(@class, 'modal-header')]//button[contains(@class, 'btn-close')][not(@disabled)]",
+    "//button[@data-bs-dismiss='modal'][not(@disabled)]",
+    "//div[contains(@class, 'modal-content')]//button[contains(@class, 'btn-close')][not(@disabled)]",
+])
+
+# True once no modal, backdrop, spinner or preloader is visible
+OVERLAY_GONE_JS = (
+    "const s = document.querySelector('.modal.show, .modal-backdrop, .spinner, .overlay, #preloader');"
+    "return !s || s.offsetParent === null;"
+)
+
+# Parallel accounts may share one IMAP mailbox (EMAIL_IMAP_USER); only one account
+# at a time waits for and submits its OTP, so none picks up another's code
+_otp_lock = threading.Lock()
+
 # Configure logger
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger('post_login')
@@ -25,6 +58,8 @@ class PostLoginHandler:
         """
         self.driver = driver
         self.bot = bot_instance
+        # Keeps screenshots of parallel accounts from overwriting each other
+        self._file_tag = file_suffix(getattr(bot_instance, "account_tag", ""))
         # Inject a fallback for move_to_element_with_randomness if the main bot lacks it
         if not hasattr(self.bot, 'move_to_element_with_randomness'):
             def _fallback_move(element, jitter: float = 5):
@@ -33,7 +68,6 @@ class PostLoginHandler:
                     self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", element)
                     # Small mouse move jitter using ActionChains if needed
                     try:
-                        from selenium.webdriver.common.action_chains import ActionChains
                         ActionChains(self.driver).move_to_element(element).perform()
                     except Exception:
                         pass
@@ -69,9 +103,10 @@ class PostLoginHandler:
         """
         try:
             # Take a screenshot before checking for modal
-            pre_check_screenshot = f"data/screenshots/pre_scam_modal_check_{int(time.time())}.png"
-            self.driver.save_screenshot(pre_check_screenshot)
-            logger.info(f"Saved pre-modal check screenshot: {pre_check_screenshot}")
+            if BOT_CONFIG["debug_screenshots"]:
+                pre_check_screenshot = f"data/screenshots/pre_scam_modal_check_{int(time.time())}{self._file_tag}.png"
+                self.driver.save_screenshot(pre_check_screenshot)
+                logger.info(f"Saved pre-modal check screenshot: {pre_check_screenshot}")
             
             # Log current URL to help with debugging
             current_url = self.driver.current_url
@@ -79,18 +114,6 @@ class PostLoginHandler:
             
             logger.info("Checking for SCAM ALERT modal")
             
-            # Wait for a short time to see if the modal appears
-            time.sleep(random.uniform(1.0, 2.0))
-            
-            # Try to find the SCAM ALERT modal using different selectors
-            modal_selectors = [
-                "//div[contains(@class, 'modal-content')]//h6[contains(., 'SCAM ALERT')]",
-                "//span[contains(@class, 'text-danger') and contains(text(), 'SCAM ALERT')]",
-                "//div[contains(@class, 'modal-header')]//span[contains(text(), 'SCAM ALERT')]",
-                "//h6[@id='scamModalLabel']",
-                "//div[contains(@class, 'modal')]//div[contains(text(), 'SCAM ALERT')]",
-                "//div[contains(@class, 'modal-body')][contains(., 'SCAM')]"
-            ]
             
             # Log page source for debugging if needed
             try:
@@ -99,41 +122,33 @@ class PostLoginHandler:
             except Exception as ps_err:
                 logger.debug(f"Could not get page source: {ps_err}")
             
+            # One wait over all modal variants: the common no-modal case costs 3s instead of 6 x 3s
             modal_found = False
-            for selector in modal_selectors:
-                try:
-                    modal_header = WebDriverWait(self.driver, 3).until(
-                        EC.presence_of_element_located((By.XPATH, selector))
-                    )
-                    logger.info(f"Found SCAM ALERT modal with selector: {selector}")
-                    modal_found = True
-                    break
-                except Exception as e:
-                    logger.debug(f"Modal selector failed: {selector} - {str(e)}")
-                    continue
+            try:
+                WebDriverWait(self.driver, 3).until(
+                    EC.presence_of_element_located((By.XPATH, SCAM_MODAL_XPATH))
+                )
+                logger.info("Found SCAM ALERT modal")
+                modal_found = True
+            except TimeoutException:
+                logger.debug("SCAM ALERT modal did not appear within 3s")
             
             if not modal_found:
                 logger.info("No SCAM ALERT modal detected - this is normal if already dismissed")
                 return False
             
-            # If modal found, look for the close button
-            close_button_selectors = [
-                "//div[contains(@class, 'modal-header')]//button[contains(@class, 'btn-close')]",
-                "//button[@data-bs-dismiss='modal']",
-                "//div[contains(@class, 'modal-content')]//button[contains(@class, 'btn-close')]"
-            ]
-            
+            # If modal found, look for the close button: one union query, filtered for visibility in-page
             close_button = None
-            for selector in close_button_selectors:
-                try:
-                    close_button = WebDriverWait(self.driver, 3).until(
-                        EC.element_to_be_clickable((By.XPATH, selector))
+            try:
+                close_button = WebDriverWait(self.driver, 3).until(
+                    lambda d: d.execute_script(
+                        "return arguments[0].find(e => e.offsetParent !== null && !e.disabled) || null;",
+                        d.find_elements(By.XPATH, MODAL_CLOSE_XPATH)
                     )
-                    logger.info(f"Found modal close button with selector: {selector}")
-                    break
-                except Exception as e:
-                    logger.debug(f"Close button selector failed: {selector} - {str(e)}")
-                    continue
+                )
+                logger.info("Found modal close button")
+            except TimeoutException:
+                logger.debug("No visible modal close button within 3s")
             
             if close_button:
                 # Move to the element with randomness (using bot's method)
@@ -144,11 +159,16 @@ class PostLoginHandler:
                 close_button.click()
                 logger.info("Clicked on SCAM ALERT modal close button")
                 
-                # Wait for the modal to disappear
-                time.sleep(random.uniform(1.0, 2.0))
+                # Wait for the modal and any overlay to disappear, polled with one script per tick
+                try:
+                    WebDriverWait(self.driver, 5, poll_frequency=0.25).until(
+                        lambda d: d.execute_script(OVERLAY_GONE_JS)
+                    )
+                except TimeoutException:
+                    logger.warning("Modal overlay still visible after 5s, continuing")
                 
                 # Take a screenshot for verification
-                screenshot_path = f"data/screenshots/scam_alert_closed_{int(time.time())}.png"
+                screenshot_path = f"data/screenshots/scam_alert_closed_{int(time.time())}{self._file_tag}.png"
                 self.driver.save_screenshot(screenshot_path)
                 logger.info(f"Saved screenshot after closing modal: {screenshot_path}")
                 
@@ -156,7 +176,7 @@ class PostLoginHandler:
             else:
                 logger.warning("Could not find close button for SCAM ALERT modal")
                 # Take a screenshot for debugging
-                screenshot_path = f"data/screenshots/scam_alert_no_close_button_{int(time.time())}.png"
+                screenshot_path = f"data/screenshots/scam_alert_no_close_button_{int(time.time())}{self._file_tag}.png"
                 self.driver.save_screenshot(screenshot_path)
                 logger.info(f"Saved screenshot of modal without close button: {screenshot_path}")
                 return False
@@ -164,7 +184,7 @@ class PostLoginHandler:
         except Exception as e:
             logger.error(f"Error handling SCAM ALERT modal: {str(e)}")
             # Take a screenshot for debugging
-            screenshot_path = f"data/screenshots/scam_alert_error_{int(time.time())}.png"
+            screenshot_path = f"data/screenshots/scam_alert_error_{int(time.time())}{self._file_tag}.png"
             self.driver.save_screenshot(screenshot_path)
             logger.info(f"Saved screenshot after error: {screenshot_path}")
             return False
@@ -235,9 +255,10 @@ class PostLoginHandler:
         try:
             time.sleep(random.uniform(2.0, 3.0))  # wait for page
             # Save screenshot for debugging
-            shot_path = f"data/screenshots/appointment_page_{int(time.time())}.png"
-            self.driver.save_screenshot(shot_path)
-            logger.info(f"Saved appointment-page screenshot: {shot_path}")
+            if BOT_CONFIG["debug_screenshots"]:
+                shot_path = f"data/screenshots/appointment_page_{int(time.time())}{self._file_tag}.png"
+                self.driver.save_screenshot(shot_path)
+                logger.info(f"Saved appointment-page screenshot: {shot_path}")
 
             # If we were unexpectedly redirected to MyAppointments page, click the green Book New Appointment button again
             current_url = self.driver.current_url
@@ -271,8 +292,9 @@ class PostLoginHandler:
             # Check for captcha
             if self.bot.captcha_utils.is_captcha_present():
                 logger.info("Captcha detected on appointment page – attempting to solve")
-                captcha_shot = f"data/screenshots/appointment_captcha_{int(time.time())}.png"
-                self.driver.save_screenshot(captcha_shot)
+                if BOT_CONFIG["debug_screenshots"]:
+                    captcha_shot = f"data/screenshots/appointment_captcha_{int(time.time())}{self._file_tag}.png"
+                    self.driver.save_screenshot(captcha_shot)
                 solved = self.bot.captcha_utils.solve_captcha()
                 if not solved:
                     logger.error("Failed to solve captcha on appointment page")
@@ -290,7 +312,7 @@ class PostLoginHandler:
             return True
         except Exception as exc:
             logger.error(f"Exception while handling appointment booking page: {exc}")
-            fail_shot = f"data/screenshots/appointment_handler_error_{int(time.time())}.png"
+            fail_shot = f"data/screenshots/appointment_handler_error_{int(time.time())}{self._file_tag}.png"
             try:
                 self.driver.save_screenshot(fail_shot)
                 logger.info(f"Saved error screenshot: {fail_shot}")
@@ -350,7 +372,7 @@ class PostLoginHandler:
             if not manage_applicants_link:
                 logger.error("Could not find Manage Applicants link")
                 # Take a screenshot for debugging
-                screenshot_path = f"data/screenshots/manage_applicants_not_found_{int(time.time())}.png"
+                screenshot_path = f"data/screenshots/manage_applicants_not_found_{int(time.time())}{self._file_tag}.png"
                 self.driver.save_screenshot(screenshot_path)
                 logger.info(f"Saved screenshot: {screenshot_path}")
                 return False
@@ -376,7 +398,7 @@ class PostLoginHandler:
             else:
                 logger.warning(f"Navigation may have failed. Expected URL with 'appointmentdata/MyAppointments', got: {current_url}")
                 # Take a screenshot for debugging
-                screenshot_path = f"data/screenshots/manage_applicants_navigation_failed_{int(time.time())}.png"
+                screenshot_path = f"data/screenshots/manage_applicants_navigation_failed_{int(time.time())}{self._file_tag}.png"
                 self.driver.save_screenshot(screenshot_path)
                 logger.info(f"Saved screenshot: {screenshot_path}")
                 return False
@@ -384,7 +406,7 @@ class PostLoginHandler:
         except Exception as e:
             logger.error(f"Error navigating to Manage Applicants page: {str(e)}")
             # Take a screenshot for debugging
-            screenshot_path = f"data/screenshots/manage_applicants_error_{int(time.time())}.png"
+            screenshot_path = f"data/screenshots/manage_applicants_error_{int(time.time())}{self._file_tag}.png"
             self.driver.save_screenshot(screenshot_path)
             logger.info(f"Saved screenshot: {screenshot_path}")
             return False
@@ -411,7 +433,7 @@ class PostLoginHandler:
                         logger.debug(f"Selector not available: {sel} – {e}")
                 if not inner_btn:
                     logger.error("Inner 'Book New Appointment' button not found on MyAppointments page")
-                    shot = f"data/screenshots/inner_book_new_not_found_{int(time.time())}.png"
+                    shot = f"data/screenshots/inner_book_new_not_found_{int(time.time())}{self._file_tag}.png"
                     try:
                         self.driver.save_screenshot(shot)
                         logger.info(f"Saved screenshot: {shot}")
@@ -438,9 +460,6 @@ class PostLoginHandler:
             bool: True if steps completed, False otherwise.
         """
         try:
-            from backend.appointment.appointment_form_handler import AppointmentFormHandler
-            from backend.captcha.captcha_utils import is_captcha_present, solve_captcha
-
             cur_url = self.driver.current_url
             logger.info(f"[PostLogin] Handling appointment booking page – URL: {cur_url}")
 
@@ -459,7 +478,7 @@ class PostLoginHandler:
             cap = is_captcha_present(self.driver)
             if cap:
                 logger.info(f"[PostLogin] Captcha detected after visa form: {cap}")
-                if not solve_captcha(self.driver, os.getenv("CAPTCHA_API_KEY")):
+                if not solve_captcha(self.driver, BOT_CONFIG["captcha_api_key"]):
                     logger.error("[PostLogin] Captcha solve failed after visa form")
                     return False
                 self.wait_for_url_change(cur_url, timeout=40)
@@ -498,7 +517,6 @@ class PostLoginHandler:
     # --------------------------------------------------
     def _complete_date_slot_page(self) -> bool:
         """Select date, slot, click submit and handle captcha."""
-        from backend.captcha.captcha_utils import is_captcha_present, solve_captcha
         try:
             if not self._select_date():
                 return False
@@ -527,7 +545,7 @@ class PostLoginHandler:
             # Handle possible captcha
             if is_captcha_present(self.driver):
                 logger.info("[PostLogin] Captcha appeared after Book – solving")
-                if not solve_captcha(self.driver, os.getenv("CAPTCHA_API_KEY")):
+                if not solve_captcha(self.driver, BOT_CONFIG["captcha_api_key"]):
                     logger.error("[PostLogin] Captcha solve failed after Book")
                     return False
             return True
@@ -605,8 +623,6 @@ class PostLoginHandler:
     # --------------------------------------------------
     def _complete_applicant_page(self) -> bool:
         """Handle applicant radio selection, photo upload, travel dates, submit, OTP."""
-        from backend.email.email_handler import fetch_otp
-        from backend.captcha.captcha_utils import is_captcha_present, solve_captcha
         try:
             applicant_id = os.getenv("APPLICANT_ID")
             photo_path = os.getenv("PHOTO_PATH")
@@ -625,7 +641,7 @@ class PostLoginHandler:
                     pass
             if not radio:
                 # fallback first visible radio
-                radios = self.driver.find_elements(By.XPATH, "//input[@type='radio' and contains(@class,'rdo-applicant')]")
+                radios = self.driver.find_elements(By.CSS_SELECTOR, "input[type='radio'][class*='rdo-applicant']")
                 for r in radios:
                     if r.is_displayed():
                         radio = r; break
@@ -640,7 +656,7 @@ class PostLoginHandler:
             # 2. Upload photo if input present and path set
             if photo_path and os.path.exists(photo_path):
                 try:
-                    file_input = self.driver.find_element(By.XPATH, "//input[@type='file']")
+                    file_input = self.driver.find_element(By.CSS_SELECTOR, "input[type='file']")
                     file_input.send_keys(photo_path)
                     logger.info("[PostLogin] Photo uploaded")
                     time.sleep(1)
@@ -662,21 +678,24 @@ class PostLoginHandler:
 
             # Solve captcha if appears
             if is_captcha_present(self.driver):
-                if not solve_captcha(self.driver, os.getenv("CAPTCHA_API_KEY")):
+                if not solve_captcha(self.driver, BOT_CONFIG["captcha_api_key"]):
                     return False
 
             # 5. OTP Page handling: look for 6-digit input
             try:
                 otp_input = WebDriverWait(self.driver,15).until(EC.presence_of_element_located((By.XPATH, "//input[@type='text' and contains(@name,'OTP')] | //input[contains(@placeholder,'OTP')]")))
                 logger.info("[PostLogin] OTP input detected, fetching OTP email…")
-                otp_code = fetch_otp(email_user, email_pass, wait_time=120)
-                if not otp_code:
-                    logger.error("[PostLogin] OTP not received")
-                    return False
-                otp_input.send_keys(otp_code)
-                otp_submit = self.driver.find_element(By.XPATH, "//button[contains(.,'Verify') or contains(.,'Submit') or contains(.,'Confirm')]")
-                otp_submit.click()
-                logger.info("[PostLogin] OTP submitted")
+                with _otp_lock:
+                    # Only codes sent to this account's address count
+                    otp_code = fetch_otp(email_user, email_pass, wait_time=120,
+                                         recipient=getattr(self.bot, "email", None))
+                    if not otp_code:
+                        logger.error("[PostLogin] OTP not received")
+                        return False
+                    otp_input.send_keys(otp_code)
+                    otp_submit = self.driver.find_element(By.XPATH, "//button[contains(.,'Verify') or contains(.,'Submit') or contains(.,'Confirm')]")
+                    otp_submit.click()
+                    logger.info("[PostLogin] OTP submitted")
             except Exception as exc:
                 logger.warning(f"[PostLogin] No OTP page detected or error: {exc}")
 
@@ -25,6 +25,7 @@ from selenium.webdriver.common.action_chains import ActionChains
 from webdriver_manager.chrome import ChromeDriverManager
 from backend.email.email_handler import fetch_otp, send_notification
 from backend.payment.payment_handler import make_payment
+from backend.post_login.post_login_handler import PostLoginHandler
 from verify_captcha_images import verify_captcha_images
 from loguru import logger
 
@@ -1062,9 +1063,6 @@ class VisaCheckerBot:
                 
                 # Use the PostLoginHandler to handle post-login functionality
                 try:
-                    # Import the PostLoginHandler here to avoid circular imports
-                    from backend.post_login.post_login_handler import PostLoginHandler
-                    
                     # Get environment variables for form fields
                     location = os.environ.get('LOCATION', '')
                     visa_type = os.environ.get('VISA_TYPE', '')
@@ -1082,8 +1080,6 @@ class VisaCheckerBot:
                     
                     if not post_login_success:
                         logger.error("Post-login process failed")
-                except ImportError as ie:
-                    logger.error(f"Failed to import PostLoginHandler: {str(ie)}")
                 except Exception as e:
                     logger.error(f"Error in post-login process: {str(e)}")
                 
@@ -1742,66 +1738,6 @@ class VisaCheckerBot:
         except Exception as e:
             logger.error(f"Error in coordinate captcha solving: {str(e)}")
             return False
-        # Old captcha solving logic removed to use coordinate-based solver exclusively
-        try:
-            captcha_type = self.is_captcha_present()
-            
-            if not captcha_type:
-                logger.info("No captcha detected on Italy visa website")
-                return True
-            
-            # Import the captcha solver module
-            from backend.captcha import captcha_sove2 as external_solve_captcha
-            
-            
-            # Try to use the external captcha solver first
-            try:
-                logger.info(f"Attempting to solve {captcha_type} captcha using captcha_solver module")
-                result = external_solve_captcha(self.driver, self.captcha_api_key)
-                if result:
-                    logger.info("Captcha solved successfully using external solver")
-                    return True
-                logger.warning("External captcha solver failed, falling back to internal implementation")
-            except Exception as e:
-                logger.warning(f"Error using external captcha solver: {str(e)}. Falling back to internal implementation")
-            
-            # If external solver failed or not available, use our internal implementation
-            if captcha_type == "image":
-                # Get the captcha image
-                captcha_img = self.driver.find_element(
-                    By.XPATH, "//img[contains(@src, 'captcha') or contains(@id, 'captcha')]"
-                )
-                captcha_img_src = captcha_img.get_attribute("src")
-                
-                # Solve the image captcha
-                solution = solve_image_captcha(self.driver, self.captcha_api_key)
-                
-                # Find the captcha input field - look for input near the captcha image
-                captcha_input = self.driver.find_element(
-                    By.XPATH, "//input[contains(@id, 'captcha') or contains(@name, 'captcha')]"
-                )
-                captcha_input.clear()
-                captcha_input.send_keys(solution)
-                
-            elif captcha_type == "recaptcha":
-                # Solve reCAPTCHA
-                result = solve_recaptcha(self.driver, self.captcha_api_key)
-                if not result:
-                    logger.error("Failed to solve reCAPTCHA")
-                    return False
-                
-            elif captcha_type == "number_box":
-                # Use the dedicated number box captcha solver
-                result = solve_number_box_captcha(self.driver, self.captcha_api_key)
-                if not result:
-                    logger.error("Failed to solve number box captcha")
-                    return False
-            
-            logger.info("Captcha solved successfully on Italy visa website")
-            return True
-        except Exception as e:
-            logger.error(f"Error solving captcha on Italy visa website: {str(e)}")
-            return False
 
     def check_appointment_availability(self):
         """Check if visa appointment slots are available on the Italy visa website with human-like behavior."""
@@ -2521,11 +2457,7 @@ class VisaCheckerBot:
                     except Exception as nav_error:
                         logger.error(f"Error navigating to target URL: {str(nav_error)}")
                     
-                # Import and use PostLoginHandler for post-login process
-                from backend.post_login.post_login_handler import PostLoginHandler
-                import os
-                
-                # Initialize PostLoginHandler to handle the SCAM ALERT modal
+                # One PostLoginHandler serves both the SCAM ALERT modal and the post-login process
                 post_login_handler = PostLoginHandler(self.driver, self)
                 
                 # Check for and handle the SCAM ALERT modal if it appears
@@ -2546,8 +2478,6 @@ class VisaCheckerBot:
                 current_url = self.driver.current_url
                 logger.info(f"Starting post-login process at URL: {current_url}")
                 
-                # Initialize and use the PostLoginHandler
-                post_login_handler = PostLoginHandler(self.driver, self)
                 if not post_login_handler.handle_post_login_process(location, visa_type, visa_subtype, issue_place):
                     logger.error("Failed to complete post-login process")
                     return False
@@ -11,6 +11,8 @@ It provides anti-bot detection measures and human-like behavior simulation.
 import os
 import time
 import random
+import socket
+import threading
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
@@ -22,20 +24,170 @@ from selenium.webdriver.common.action_chains import ActionChains
 from webdriver_manager.chrome import ChromeDriverManager
 from loguru import logger
 
+from config import BOT_CONFIG
+from utils import human_sleep, fast_set_value
+
+# chromedriver binary resolved by webdriver-manager, shared by every browser this process starts
+_CHROMEDRIVER_BINARY = None
+_chromedriver_lock = threading.Lock()
+
+# URL patterns blocked through CDP outside of captcha steps (images, fonts, media, trackers)
+BLOCKED_URL_PATTERNS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp",
+    "*.woff", "*.woff2", "*.ttf", "*.otf",
+    "*.mp4", "*.webm",
+    "*google-analytics.com*", "*googletagmanager.com*",
+    "*doubleclick.net*", "*facebook.net*", "*facebook.com/tr*",
+]
+
+# In-page humanizer: eased mouse path to the element, then staged key events with
+# random gaps, all driven by setTimeout so a whole field costs one WebDriver call;
+# arguments[2] scales every delay (SPEED_MODE)
+HUMANIZER_JS = """
+var el = arguments[0], text = arguments[1], scale = arguments[2], done = arguments[arguments.length - 1];
+try {
+    el.scrollIntoView({block: 'center'});
+    var r = el.getBoundingClientRect();
+    var tx = r.left + r.width * (0.3 + Math.random() * 0.4);
+    var ty = r.top + r.height * (0.3 + Math.random() * 0.4);
+    var sx = Math.random() * window.innerWidth, sy = Math.random() * window.innerHeight;
+    var cx = (sx + tx) / 2 + (Math.random() - 0.5) * 200, cy = (sy + ty) / 2 + (Math.random() - 0.5) * 200;
+    var steps = 12 + Math.floor(Math.random() * 8);
+    var setter = Object.getOwnPropertyDescriptor(Object.getPrototypeOf(el), 'value').set;
+    function fire(type, init) {
+        var ev = type.indexOf('key') === 0 ? new KeyboardEvent(type, init) : new MouseEvent(type, init);
+        el.dispatchEvent(ev);
+    }
+    function move(i) {
+        if (i > steps) {
+            fire('mouseover', {bubbles: true, clientX: tx, clientY: ty});
+            fire('mousedown', {bubbles: true, clientX: tx, clientY: ty});
+            el.focus();
+            fire('mouseup', {bubbles: true, clientX: tx, clientY: ty});
+            fire('click', {bubbles: true, clientX: tx, clientY: ty});
+            setter.call(el, '');
+            el.dispatchEvent(new Event('input', {bubbles: true}));
+            return setTimeout(function () { type(0); }, (200 + Math.random() * 300) * scale);
+        }
+        var t = i / steps, u = 1 - t;
+        var x = u * u * sx + 2 * u * t * cx + t * t * tx, y = u * u * sy + 2 * u * t * cy + t * t * ty;
+        document.dispatchEvent(new MouseEvent('mousemove', {bubbles: true, clientX: x, clientY: y}));
+        setTimeout(function () { move(i + 1); }, (10 + Math.random() * 25) * scale);
+    }
+    function type(i) {
+        if (i >= text.length) {
+            el.dispatchEvent(new Event('change', {bubbles: true}));
+            return setTimeout(function () { done(true); }, (200 + Math.random() * 300) * scale);
+        }
+        var ch = text[i];
+        fire('keydown', {bubbles: true, key: ch});
+        fire('keypress', {bubbles: true, key: ch});
+        setter.call(el, el.value + ch);
+        el.dispatchEvent(new Event('input', {bubbles: true}));
+        fire('keyup', {bubbles: true, key: ch});
+        setTimeout(function () { type(i + 1); }, (50 + Math.random() * 150) * scale);
+    }
+    move(0);
+} catch (e) {
+    done(false);
+}
+"""
+
+# True if a captcha image on the page finished loading without any pixels, i.e. it
+# was requested while the block list was active
+JS_CAPTCHA_IMAGE_BROKEN = """
+return Array.from(document.querySelectorAll(
+    "img[src*='captcha'], img[alt*='captcha'], [class*='captcha'] img, [id*='captcha'] img"
+)).some(img => img.complete && img.naturalWidth === 0);
+"""
+
+# Clears beforeunload handlers in the top window and every same-origin frame in one call
+CLEAR_UNLOAD_HANDLERS_JS = """
+(function applyToAllFrames(win) {
+    try { win.onbeforeunload = null; } catch (e) {}
+    for (var i = 0; i < win.frames.length; i++) {
+        try { applyToAllFrames(win.frames[i]); } catch (e) {}
+    }
+})(window);
+"""
+
 class BrowserManager:
     """Manages browser setup, configuration, and human-like interactions."""
 
-    def __init__(self):
-        """Initialize the browser manager."""
+    def __init__(self, profile_suffix=""):
+        """Initialize the browser manager.
+        profile_suffix keeps a separate Chrome profile per account when several run at once."""
         self.driver = None
+        self.block_resources = os.getenv("BLOCK_RESOURCES", "True").lower() == "true"
+        # Tracks whether the CDP block list is currently applied
+        self._resources_blocked = False
+        # No visible window, so nothing observes simulated mouse paths
+        self.headless = BOT_CONFIG["headless"]
+        # Persistent Chrome profile so cookies/storage survive restarts (empty to disable)
+        self.profile_dir = os.getenv("CHROME_PROFILE_DIR", os.path.join("data", "profile"))
+        # Account tag, also used by the handlers to keep per-account output files apart
+        self.account_tag = profile_suffix
+        if self.profile_dir and profile_suffix:
+            self.profile_dir = f"{self.profile_dir}_{profile_suffix}"
+
+    def _resolve_profile_dir(self):
+        """Return the absolute profile directory, clearing a lock left behind by a crashed
+        Chrome. Raises RuntimeError if a running Chrome still holds the profile."""
+        profile_dir = os.path.abspath(self.profile_dir)
+        os.makedirs(profile_dir, exist_ok=True)
+        
+        # POSIX: SingletonLock is a symlink to "<hostname>-<pid>" of the owning Chrome
+        lock = os.path.join(profile_dir, "SingletonLock")
+        if os.path.lexists(lock):
+            owner = os.readlink(lock) if os.path.islink(lock) else ""
+            host, _, pid = owner.rpartition("-")
+            if host == socket.gethostname() and pid.isdigit() and not self._pid_running(int(pid)):
+                logger.warning(f"Removing stale Chrome profile lock left by pid {pid}")
+                for name in ("SingletonLock", "SingletonCookie", "SingletonSocket"):
+                    try:
+                        os.remove(os.path.join(profile_dir, name))
+                    except FileNotFoundError:
+                        pass
+            else:
+                raise RuntimeError(f"Chrome profile {profile_dir} is in use by another Chrome ({owner or 'unknown owner'})")
+        
+        # Windows: the lockfile can only be deleted once no Chrome has it open
+        lockfile = os.path.join(profile_dir, "lockfile")
+        if os.path.exists(lockfile):
+            try:
+                os.remove(lockfile)
+                logger.warning("Removed stale Chrome profile lockfile")
+            except OSError:
+                raise RuntimeError(f"Chrome profile {profile_dir} is in use by another Chrome")
+        return profile_dir
+
+    @staticmethod
+    def _pid_running(pid):
+        """Return True if a process with this pid exists."""
+        if os.name == "nt":
+            # os.kill would terminate the process on Windows; assume it is alive
+            return True
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
 
     def setup_browser(self):
         """Set up the browser for automation with anti-bot detection bypass."""
         # If driver already exists and is active, don't create a new one
         if self.driver:
             try:
-                # Check if the driver is still responsive
-                self.driver.current_url
+                # Check that the chromedriver process is still alive without a WebDriver round-trip
+                service = getattr(self.driver, "service", None)
+                process = getattr(service, "process", None)
+                if process is not None:
+                    if process.poll() is not None:
+                        raise RuntimeError("chromedriver process has exited")
+                else:
+                    self.driver.current_url
                 logger.info("Reusing existing browser instance")
                 return self.driver
             except Exception:
@@ -51,6 +203,8 @@ class BrowserManager:
             logger.info("Setting up new browser instance")
             chrome_options = webdriver.ChromeOptions()
             chrome_options.add_argument("--start-maximized")
+            if self.headless:
+                chrome_options.add_argument("--headless=new")
             # Stronger anti-automation flags
             chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
             chrome_options.add_experimental_option('useAutomationExtension', False)
@@ -61,6 +215,17 @@ class BrowserManager:
             chrome_options.add_argument("--window-size=1920,1080")
             chrome_options.add_argument("--disable-notifications")
             chrome_options.add_argument("--disable-popup-blocking")
+            # Skip Chrome subsystems the bot never uses to speed up cold start
+            chrome_options.add_argument("--disable-features=Translate,MediaRouter,OptimizationHints,InterestFeedContentSuggestions,CalculateNativeWinOcclusion")
+            chrome_options.add_argument("--disable-sync")
+            chrome_options.add_argument("--metrics-recording-only")
+            chrome_options.add_argument("--no-first-run")
+            chrome_options.add_argument("--no-default-browser-check")
+            
+            # Reuse the signed-in profile from previous runs
+            if self.profile_dir:
+                chrome_options.add_argument(f"--user-data-dir={self._resolve_profile_dir()}")
+                chrome_options.add_argument("--profile-directory=Default")
             
             # Anti-bot detection: Randomize user agent from a pool of common browsers
             user_agents = [
@@ -82,17 +247,32 @@ class BrowserManager:
             # Anti-bot detection: Add language and geolocation preferences to appear more human
             chrome_options.add_argument("--lang=en-US,en;q=0.9")
             
+            # Return from driver.get() at DOMContentLoaded; callers wait for the elements they need
+            chrome_options.page_load_strategy = 'eager'
+            
+            # Coarse fallback when CDP blocking is unavailable: skip image decoding entirely
+            if self.block_resources and os.getenv("DISABLE_IMAGES", "False").lower() == "true":
+                chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+            
             # Create the WebDriver instance with ChromeDriverManager
-            self.driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
+            self.driver = webdriver.Chrome(service=Service(self._chromedriver_path()), options=chrome_options)
+            # Lets the shared captcha entry point lift and restore the block list for this browser
+            self.driver._browser_manager = self
+            # All element lookups use explicit WebDriverWaits with per-call timeouts; pin the
+            # implicit wait to 0 so a missing element never adds a hidden delay on top
+            self.driver.implicitly_wait(0)
             
             # Anti-bot detection: Execute CDP commands to modify navigator properties
             try:
                 self.driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {
                     "source": """
-                        Object.defineProperty(navigator, 'webdriver', {get: () => undefined});
-                        Object.defineProperty(navigator, 'plugins', {get: function() { return [1, 2, 3, 4, 5]; }});
-                        Object.defineProperty(navigator, 'languages', {get: function() { return ['en-US', 'en']; }});
-                        window.chrome = { runtime: {} };
+                        if (!window.__navPatched) {
+                            Object.defineProperty(window, '__navPatched', {value: true});
+                            Object.defineProperty(navigator, 'webdriver', {get: () => undefined, configurable: false});
+                            Object.defineProperty(navigator, 'plugins', {get: function() { return [1, 2, 3, 4, 5]; }, configurable: false});
+                            Object.defineProperty(navigator, 'languages', {get: function() { return ['en-US', 'en']; }, configurable: false});
+                            window.chrome = window.chrome || { runtime: {} };
+                        }
                     """
                 })
             except Exception as cdp_error:
@@ -101,6 +281,10 @@ class BrowserManager:
             
             logger.info("Browser setup completed successfully")
             
+            # Block images, fonts and trackers until a captcha step needs them
+            if self.block_resources:
+                self.reblock_resources()
+            
             # Set window size to a common desktop resolution
             try:
                 self.driver.maximize_window()
@@ -112,7 +296,7 @@ class BrowserManager:
                     logger.warning(f"Manual window sizing failed: {str(size_error)}")
             
             # Anti-bot detection: Add random delays to mimic human behavior
-            time.sleep(random.uniform(1.0, 3.0))
+            human_sleep(1.0, 3.0)
             
             logger.info("Browser setup completed successfully with anti-bot detection measures")
             return self.driver
@@ -120,18 +304,94 @@ class BrowserManager:
             logger.error(f"Failed to setup browser: {str(e)}")
             raise
 
+    def _chromedriver_path(self):
+        """Resolve the chromedriver binary once per process.
+        ChromeDriverManager().install() checks the installed Chrome version and the driver
+        cache on every call; a browser restarted during recovery can reuse the first answer."""
+        global _CHROMEDRIVER_BINARY
+        # Parallel account threads start browsers together; resolve (and download) once
+        with _chromedriver_lock:
+            if _CHROMEDRIVER_BINARY is None or not os.path.exists(_CHROMEDRIVER_BINARY):
+                _CHROMEDRIVER_BINARY = ChromeDriverManager().install()
+            return _CHROMEDRIVER_BINARY
+
+    def reblock_resources(self):
+        """Apply the CDP URL block list so images, fonts and trackers are not downloaded."""
+        if not self.driver or not self.block_resources:
+            return False
+        try:
+            self.driver.execute_cdp_cmd("Network.enable", {})
+            self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+            self._resources_blocked = True
+            logger.debug(f"Blocking {len(BLOCKED_URL_PATTERNS)} resource URL patterns")
+            return True
+        except Exception as cdp_error:
+            logger.warning(f"Could not apply resource blocking via CDP: {str(cdp_error)}")
+            return False
+
+    def unblock_for_captcha(self, reload=False):
+        """Clear the CDP URL block list so captcha images can load.
+        With reload=True the current page is reloaded only if a captcha image failed to
+        load under the block list, so the challenge renders in full; pages that loaded
+        fine (possibly as the result of a POST) are never refreshed.
+        Returns True only if this call lifted the block list (the caller should re-apply it)."""
+        if not self.driver or not self._resources_blocked:
+            return False
+        try:
+            self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": []})
+            self._resources_blocked = False
+            logger.debug("Resource blocking lifted for captcha step")
+            if reload and self.driver.execute_script(JS_CAPTCHA_IMAGE_BROKEN):
+                logger.info("Captcha image was blocked, reloading the page")
+                self.driver.refresh()
+                WebDriverWait(self.driver, 15, poll_frequency=0.1).until(
+                    lambda d: d.execute_script("return document.readyState") == "complete"
+                )
+            return True
+        except Exception as cdp_error:
+            logger.warning(f"Could not lift resource blocking via CDP: {str(cdp_error)}")
+            return False
+
+    def humanized_type(self, element, text):
+        """Move to and type into an element with human-like pacing in a single script call.
+        Gated like human_sleep(): STEALTH_LEVEL 0 (or SPEED_MODE 0) types with plain send_keys,
+        1 sets the value directly, 2 runs the humanizer. Falls back to the WebDriver-driven
+        helpers if the script fails."""
+        level = BOT_CONFIG["stealth_level"]
+        scale = BOT_CONFIG["speed_mode"]
+        if level <= 0 or scale <= 0:
+            element.clear()
+            element.send_keys(text)
+            return
+        if level == 1:
+            self.human_like_typing(element, text)
+            return
+        try:
+            if self.driver.execute_async_script(HUMANIZER_JS, element, text, scale):
+                return
+            logger.debug("Humanizer script reported failure, falling back to send_keys typing")
+        except Exception as e:
+            logger.debug(f"Humanizer script failed, falling back to send_keys typing: {str(e)}")
+        self.move_to_element_with_randomness(element)
+        self.human_like_typing(element, text)
+
     def human_like_typing(self, element, text):
         """Type text in a human-like manner with random delays between keystrokes."""
+        if BOT_CONFIG["stealth_level"] < 2:
+            fast_set_value(self.driver, element, text)
+            return
         element.clear()
         for char in text:
             element.send_keys(char)
             # Random delay between keystrokes (50-200ms)
-            time.sleep(random.uniform(0.05, 0.2))
+            human_sleep(0.05, 0.2)
         # Small pause after typing (200-500ms)
-        time.sleep(random.uniform(0.2, 0.5))
+        human_sleep(0.2, 0.5)
     
     def move_to_element_with_randomness(self, element):
         """Move to an element with random offsets and speeds to mimic human behavior."""
+        if self.headless or BOT_CONFIG["stealth_level"] == 0:
+            return
         try:
             # Create ActionChains object
             actions = ActionChains(self.driver)
@@ -149,31 +409,37 @@ class BrowserManager:
             offset_y = random.uniform(-size['height']/4, size['height']/4)
             
             # Move to a random position first (to simulate natural mouse movement)
-            random_x = random.randint(100, 800)
-            random_y = random.randint(100, 500)
-            actions.move_by_offset(random_x, random_y)
+            if BOT_CONFIG["stealth_level"] >= 2:
+                random_x = random.randint(100, 800)
+                random_y = random.randint(100, 500)
+                actions.move_by_offset(random_x, random_y)
             
             # Then move to the element with the random offset
             actions.move_to_element_with_offset(element, offset_x, offset_y)
             actions.perform()
             
             # Add a small delay to simulate human pause before clicking
-            time.sleep(random.uniform(0.3, 0.7))
+            human_sleep(0.3, 0.7)
         except Exception as e:
             logger.warning(f"Could not perform human-like mouse movement: {str(e)}")
             # Fallback to regular move_to_element
             actions = ActionChains(self.driver)
             actions.move_to_element(element)
             actions.perform()
-            time.sleep(random.uniform(0.2, 0.5))
+            human_sleep(0.2, 0.5)
 
     def close_browser(self):
         """Close the browser and clean up resources."""
         if self.driver:
             try:
-                # Add a delay before quitting to ensure any pending operations complete
-                logger.info("Waiting 5 seconds before closing browser to ensure pending operations complete")
-                time.sleep(5)
+                # Let an in-flight page load settle (bounded) instead of a fixed 5s pause;
+                # quit() tears the session down cleanly either way
+                try:
+                    WebDriverWait(self.driver, 2, poll_frequency=0.1).until(
+                        lambda d: d.execute_script("return document.readyState") == "complete"
+                    )
+                except Exception:
+                    logger.debug("Page still loading before close - quitting anyway")
                 
                 # Try to get the current URL before quitting (for debugging)
                 try:
@@ -184,8 +450,8 @@ class BrowserManager:
                 
                 # Use JavaScript to close any open dialogs before quitting
                 try:
-                    self.driver.execute_script("window.onbeforeunload = null;")
-                    logger.info("Disabled onbeforeunload event handler")
+                    self.driver.execute_script(CLEAR_UNLOAD_HANDLERS_JS)
+                    logger.info("Disabled onbeforeunload event handlers")
                 except Exception as js_err:
                     logger.debug(f"Could not disable onbeforeunload: {js_err}")
                 
@@ -52,12 +52,23 @@ logger.add(
     level="DEBUG"
 )
 
+def _parse_accounts(value):
+    """Parse ACCOUNTS ("email:password;email2:password2") into (email, password) pairs."""
+    accounts = []
+    for entry in value.split(";"):
+        email, _, password = entry.strip().partition(":")
+        if email and password:
+            accounts.append((email, password))
+    return accounts
+
 # Bot configuration
 # Build initial config dictionary from environment variables
 BOT_CONFIG = {
     # Login credentials
     "email": os.getenv("EMAIL") or os.getenv("USER_ID"),
     "password": os.getenv("PASSWORD") or os.getenv("USER_PASSWORD"),
+    # Extra accounts polled in parallel with their own browsers (optional)
+    "accounts": _parse_accounts(os.getenv("ACCOUNTS", "")),
     
     # URLs
     "target_url": os.getenv("TARGET_URL"),
@@ -86,6 +97,12 @@ BOT_CONFIG = {
     "retry_interval": int(os.getenv("RETRY_INTERVAL", "60")),  # seconds
     "max_retries": int(os.getenv("MAX_RETRIES", "3")),
     "page_load_timeout": int(os.getenv("PAGE_LOAD_TIMEOUT", "30")),  # seconds
+    # Human-like pauses/mouse movement: 0 = off, 1 = minimal, 2 = full (default)
+    "stealth_level": int(os.getenv("STEALTH_LEVEL", "2")),
+    # Multiplier for every human-like pause (e.g. 0.1 in development, 1.0 in production)
+    "speed_mode": float(os.getenv("SPEED_MODE", "1.0")),
+    # Capture progress screenshots on the happy path (error screenshots are always taken)
+    "debug_screenshots": os.getenv("DEBUG_SCREENSHOTS", "False").lower() == "true",
     
     # Email settings for OTP
     "email_imap_server": os.getenv("EMAIL_IMAP_SERVER"),
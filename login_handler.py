@@ -10,46 +10,181 @@ and verify successful login.
 """
 
 import os
+import json
 import time
 import random
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, StaleElementReferenceException
 from selenium.webdriver.common.action_chains import ActionChains
 from loguru import logger
 
+from utils import is_login_url, find_first_usable, file_suffix, PASSWORD_XPATHS
+
 # Import captcha utilities
 from backend.captcha.captcha_utils import solve_captcha, retry_with_password_retyping
 
+# Selector lists used by login(), built once at import time
+EMAIL_SELECTORS = (
+    # Specific selectors for this website's email fields
+    "//label[contains(text(), 'Email')]/following-sibling::input[@type='text']",
+    "//label[contains(text(), 'Email')]/..//input[@type='text']",
+    "//input[@type='text' and contains(@class, 'form-control')]",
+    
+    # Standard email selectors
+    "//input[@type='email']",
+    "//input[contains(@id, 'email') or contains(@name, 'email')]",
+    "//input[contains(@placeholder, 'email') or contains(@placeholder, 'Email')]",
+    
+    # Text inputs that might be email fields
+    "//input[@type='text']",
+    
+    # ID-based selectors for common patterns
+    "//input[contains(@id, 'user') or contains(@name, 'user')]",
+    "//input[contains(@id, 'login') or contains(@name, 'login')]",
+    "//input[contains(@id, 'username') or contains(@name, 'username')]",
+    
+    # Class-based selectors
+    "//input[contains(@class, 'email')]",
+    "//input[contains(@class, 'user')]",
+    "//input[contains(@class, 'login')]",
+    
+    # Generic form control inputs
+    "//div[contains(@class, 'form-group')]//input[@type='text']",
+    "//div[contains(@class, 'input-group')]//input[@type='text']"
+)
+
+CONTINUE_BUTTON_SELECTORS = (
+    "//button[contains(text(), 'Continue') or contains(text(), 'continue') or contains(text(), 'Next') or contains(text(), 'next')]",
+    "//input[@type='submit' and (contains(@value, 'Continue') or contains(@value, 'continue') or contains(@value, 'Next') or contains(@value, 'next'))]",
+    "//a[contains(text(), 'Continue') or contains(text(), 'continue') or contains(text(), 'Next') or contains(text(), 'next')]",
+    "//button[@type='submit']",
+    "//input[@type='submit']",
+    "//button[contains(@class, 'btn-primary') or contains(@class, 'primary')]"
+)
+
+RETYPE_PASSWORD_SELECTORS = (
+    "//input[@type='password' and contains(@class, 'form-control')]",
+    "//input[@type='password']",
+    "//input[contains(@placeholder, 'Password')]",
+)
+
+LOGIN_BUTTON_SELECTORS = (
+    "//button[contains(text(), 'Login') or contains(text(), 'login') or contains(text(), 'Sign in') or contains(text(), 'sign in')]",
+    "//input[@type='submit' and (contains(@value, 'Login') or contains(@value, 'login') or contains(@value, 'Sign in') or contains(@value, 'sign in'))]",
+    "//button[@type='submit']",
+    "//input[@type='submit']",
+    "//button[contains(@class, 'btn-primary') or contains(@class, 'primary')]"
+)
+
+# Describes every <input> on the page in one round-trip, for debug logging
+JS_DESCRIBE_INPUTS = """
+return Array.from(document.querySelectorAll('input')).map(i => ({
+    id: i.id, name: i.name, type: i.type, cls: i.className,
+    placeholder: i.placeholder,
+    displayed: !!(i.offsetWidth || i.offsetHeight || i.getClientRects().length),
+    enabled: !i.disabled
+}));
+"""
+
+# Elements that only appear once the user is signed in (dashboard/appointment links can
+# also sit in the login page's navigation, so only sign-out links count)
+SUCCESS_INDICATOR_XPATH = (
+    "//a[contains(@href, 'logout') or contains(@href, 'Logout')] | "
+    "//a[contains(text(), 'Logout') or contains(text(), 'Sign Out')]"
+)
+
+# Seconds to wait for a captcha submit to land; a rejected captcha never navigates
+POST_CAPTCHA_WAIT = 8
+
+# Validation messages shown when the captcha or credentials are rejected
+CAPTCHA_ERROR_XPATH = (
+    "//*[contains(@class, 'validation-summary-errors') or contains(@class, 'field-validation-error')"
+    " or contains(@class, 'alert-danger')][normalize-space()]"
+)
+
+# Identifies the captcha images currently shown, to notice when the site serves a new one
+JS_CAPTCHA_SIGNATURE = "return Array.from(document.images).filter(i => /captcha/i.test(i.src)).map(i => i.src).join('|');"
+
+# Sign-out links confirm the session even when the URL still mentions login
+LOGOUT_LINK_XPATH = "//a[contains(text(), 'Logout') or contains(text(), 'Sign Out') or contains(@href, 'logout')]"
+
+# Minimum seconds between debug screenshots
+SCREENSHOT_MIN_INTERVAL = 30
+
+# Cookie jar written after a successful login and replayed on the next start
+LOGIN_COOKIES_PATH = os.path.join('data', 'sessions', 'login_cookies.json')
+
+# Writes debug artifacts off the login thread; one worker shared by every handler, so
+# the handlers rebuilt after browser restarts do not each leave a thread behind
+_io_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="login-io")
+
+def _write_file(path, data):
+    """Write bytes or text to path, creating the parent directory if needed.
+    Text is encoded to UTF-8 in slices so no second full-size bytes copy is built."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if isinstance(data, str):
+        with open(path, 'w', encoding='utf-8') as f:
+            for i in range(0, len(data), 1 << 16):
+                f.write(data[i:i + (1 << 16)])
+        return
+    with open(path, 'wb') as f:
+        f.write(data)
+
 class LoginHandler:
     """Handles the login process for the Visa Checker Bot."""
 
-    def __init__(self, driver, browser_manager, user_id, user_password, login_url, captcha_api_key):
+    def __init__(self, driver, browser_manager, user_id, user_password, login_url, captcha_api_key, cookies_path=LOGIN_COOKIES_PATH):
         """Initialize the login handler."""
         self.driver = driver
+        # Where this account's login cookies are saved between runs
+        self.cookies_path = cookies_path
         self.browser_manager = browser_manager
         self.user_id = user_id
         self.user_password = user_password
         self.login_url = login_url
+        self._login_url = login_url or ""
         self.captcha_api_key = captcha_api_key
         self.max_login_attempts = 8  # increased for reliability
         self.max_captcha_attempts = 5  # increased to allow more retries
         # Internal counter to track recursive login retries
         self._login_attempt_counter = 0
+        # Last password field located, reused by captcha retries
+        self._password_field = None
+        # Selectors that matched on a previous attempt, tried first on retry
+        self._last_email_selector = None
+        # (url, iframe elements) from the last iframe enumeration
+        self._iframes_cache = None
+        # Timestamp of the last paced action, see pace()
+        self._last_action_t = 0.0
+        self._last_shot_t = 0.0
 
     def _retype_password(self):
-        """Clears any existing password input and retypes the stored password."""
+        """Retypes the stored password, skipping the work when the field still holds it."""
         try:
-            password_selectors = [
-                "//input[@type='password' and contains(@class, 'form-control')]",
-                "//input[@type='password']",
-                "//input[contains(@placeholder, 'Password')]",
-            ]
-            password_field = self._find_password_field_in_context(password_selectors)
+            password_selectors = RETYPE_PASSWORD_SELECTORS
+            password_field = self._password_field
+            current_value = None
+            if password_field is not None:
+                try:
+                    current_value = self.driver.execute_script("return arguments[0].value;", password_field)
+                except StaleElementReferenceException:
+                    # The form was re-rendered; look the field up again below
+                    password_field = None
+            if password_field is None:
+                password_field = self._find_password_field_in_context(password_selectors)
+                self._password_field = password_field
+                if password_field:
+                    current_value = self.driver.execute_script("return arguments[0].value;", password_field)
             if password_field:
+                if current_value == self.user_password:
+                    logger.debug("Password field still holds the password, skipping retype")
+                    return
                 password_field.clear()
-                time.sleep(random.uniform(0.2,0.4))
+                self.pace(random.uniform(0.2, 0.4))
                 password_field.send_keys(self.user_password)
                 logger.info("Password retyped successfully for captcha retry")
             else:
@@ -57,103 +192,236 @@ class LoginHandler:
         except Exception as e:
             logger.error(f"Error retyping password: {e}")
 
+    def _save_debug_info(self, tag):
+        """Save the page source and a screenshot for a failed login step.
+        Screenshots are throttled to one every SCREENSHOT_MIN_INTERVAL seconds and
+        all file writes happen on a background thread."""
+        try:
+            stamp = f"{int(time.time())}{file_suffix(getattr(self.browser_manager, 'account_tag', ''))}"
+            html_path = os.path.join('data', 'debug', f'login_error_{tag}_{stamp}.html')
+            _io_executor.submit(_write_file, html_path, self.driver.page_source)
+            logger.info(f"Saving page source to {html_path}")
+            
+            if time.time() - self._last_shot_t < SCREENSHOT_MIN_INTERVAL:
+                logger.debug("Skipping debug screenshot, one was taken recently")
+                return
+            self._last_shot_t = time.time()
+            png_path = os.path.join('data', 'screenshots', f'login_error_{tag}_{stamp}.png')
+            _io_executor.submit(_write_file, png_path, self.driver.get_screenshot_as_png())
+            logger.info(f"Saving screenshot to {png_path}")
+        except Exception as e:
+            logger.warning(f"Could not save debug info: {str(e)}")
+
+    def _visible_and_enabled(self, element):
+        """Check visibility and enabled state in one script call instead of two WebDriver commands."""
+        return self.driver.execute_script(
+            "const e = arguments[0]; return !!(e && e.offsetParent !== null && !e.disabled);", element)
+
     def _find_password_field_in_context(self, password_selectors):
         """Helper method to find a password field in the current context (main document or iframe).
         Returns the password field element if found, otherwise None."""
-        for selector in password_selectors:
+        # All selectors are evaluated in-page, in priority order, with the
+        # visible/enabled filter applied there as well – one round-trip per context
+        field = self._find_first_clickable(password_selectors)
+        if field is not None:
+            logger.info(f"Found password field with ID: {field.get_attribute('id')}")
+        return field
+
+    def save_login_cookies(self):
+        """Persist the current cookies so the next start can skip the login flow."""
+        try:
+            os.makedirs(os.path.dirname(self.cookies_path), exist_ok=True)
+            with open(self.cookies_path, 'w', encoding='utf-8') as f:
+                json.dump(self.driver.get_cookies(), f)
+            logger.info(f"Saved login cookies to {self.cookies_path}")
+        except Exception as e:
+            logger.warning(f"Could not save login cookies: {str(e)}")
+
+    def is_logged_in(self):
+        """Check, without navigating, whether the live browser is on a page of the site
+        other than the login page (a browser kept open by a previous run)."""
+        try:
+            url = self._current_url()
+        except Exception:
+            return False
+        if not url.startswith("http") or self.is_login_page(url):
+            return False
+        return urlparse(url).netloc == urlparse(self.login_url).netloc
+
+    def try_resume_session(self, target_url):
+        """Check whether the target page is reachable without logging in, replaying saved
+        cookies first if there are any (a persistent browser profile may already hold them).
+        Returns True if the session is still valid, otherwise False."""
+        has_cookie_file = os.path.exists(self.cookies_path)
+        if not has_cookie_file and not getattr(self.browser_manager, "profile_dir", None):
+            return False
+        try:
+            # Cookies can only be added for the domain currently loaded
+            self.driver.get(target_url)
+            if has_cookie_file:
+                with open(self.cookies_path, 'r', encoding='utf-8') as f:
+                    cookies = json.load(f)
+                for cookie in cookies:
+                    try:
+                        if "expiry" in cookie:
+                            cookie["expiry"] = int(cookie["expiry"])
+                        self.driver.add_cookie(cookie)
+                    except Exception as cookie_err:
+                        logger.debug(f"Error adding cookie: {str(cookie_err)}")
+                self.driver.get(target_url)
+            
+            if self.is_login_page(self.driver.current_url):
+                logger.info("Saved session has expired, full login required")
+                return False
+            logger.info("✅ Resumed previous session")
+            return True
+        except Exception as e:
+            logger.warning(f"Could not resume previous session: {str(e)}")
+            return False
+
+    def pace(self, min_gap):
+        """Keep at least min_gap seconds between actions, counting time already spent in WebDriver calls."""
+        remaining = min_gap - (time.time() - self._last_action_t)
+        if remaining > 0:
+            time.sleep(remaining)
+        self._last_action_t = time.time()
+
+    def _current_url(self):
+        """Read the page URL with a script call, which is cheaper than the WebDriver /url command."""
+        try:
+            return self.driver.execute_script("return location.href;")
+        except Exception:
+            return self.driver.current_url
+
+    def _get_iframes(self, refresh=False):
+        """Return the iframes on the current page, reusing the last lookup while the URL is unchanged."""
+        current_url = self._current_url()
+        if refresh or self._iframes_cache is None or self._iframes_cache[0] != current_url:
+            self._iframes_cache = (current_url, self.driver.find_elements(By.TAG_NAME, "iframe"))
+        return self._iframes_cache[1]
+
+    def _find_first_clickable(self, selectors):
+        """Return the first visible, enabled element matching any of the XPaths using one script call."""
+        try:
+            return find_first_usable(self.driver, selectors)[0]
+        except Exception as e:
+            logger.debug(f"In-page selector search failed: {str(e)}")
+            return None
+
+    def _wait_for_post_submit(self, pre_url, pre_handles, timeout, stop_on_captcha_retry=False):
+        """Wait until the URL changes, a new window opens or a signed-in element appears.
+        With stop_on_captcha_retry, also stop early (returning False) when the site rejects
+        the captcha: an alert, a validation error or a freshly served captcha image.
+        If the submit opened a new window, switches to it once.
+        Returns True as soon as the submit lands, False on rejection or timeout."""
+        signature = self.driver.execute_script(JS_CAPTCHA_SIGNATURE) if stop_on_captcha_retry else None
+        
+        def _state(d):
+            if stop_on_captcha_retry and EC.alert_is_present()(d):
+                # Checked first: an open alert blocks every other command
+                return "retry"
+            if (d.execute_script("return location.href;") != pre_url
+                    or set(d.window_handles) != pre_handles
+                    or d.find_elements(By.XPATH, SUCCESS_INDICATOR_XPATH)):
+                return "done"
+            if stop_on_captcha_retry and (d.find_elements(By.XPATH, CAPTCHA_ERROR_XPATH)
+                                          or d.execute_script(JS_CAPTCHA_SIGNATURE) != signature):
+                return "retry"
+            return False
+        
+        try:
+            state = WebDriverWait(self.driver, timeout, poll_frequency=0.25).until(_state)
+        except TimeoutException:
+            return False
+        if state == "retry":
+            logger.info("Captcha was rejected, retrying without waiting for navigation")
             try:
-                fields = self.driver.find_elements(By.XPATH, selector)
-                for field in fields:
-                    if field.is_displayed() and field.is_enabled():
-                        logger.info(f"Found password field with ID: {field.get_attribute('id')} and selector: {selector}")
-                        return field
-            except Exception as e:
-                logger.debug(f"Error with password selector {selector}: {str(e)}")
-                continue
-        return None
+                # Clear a rejection alert so the next attempt can talk to the page
+                self.driver.switch_to.alert.accept()
+            except Exception:
+                pass
+            return False
+        # Only the handle that was not there before the click can be the new window
+        new_handles = [h for h in self.driver.window_handles if h not in pre_handles]
+        if new_handles:
+            self.driver.switch_to.window(new_handles[-1])
+            logger.info("Switched to window opened by submit")
+        return True
+
+    def _wait_for_login_success(self, timeout=5):
+        """Single wait that succeeds once the URL leaves the login page or a sign-out link appears."""
+        try:
+            WebDriverWait(self.driver, timeout).until(
+                lambda d: not self.is_login_page(d.execute_script("return location.href;"))
+                or d.find_elements(By.XPATH, LOGOUT_LINK_XPATH))
+            return True
+        except TimeoutException:
+            return False
 
     def is_login_page(self, url):
         """Check if the given URL is a login page."""
-        return ("login" in url.lower() or 
-                "signin" in url.lower() or 
-                self.login_url in url)
+        return is_login_url(url, self._login_url)
 
     def login(self):
         """Login to the Italy visa appointment website with human-like behavior.
         Automatically retries the entire flow when the website redirects back to the
         Login URL with an `err=` query string.
         """
-        """Login to the Italy visa appointment website with human-like behavior."""
         # Wrap the entire method in a try-except to catch any unexpected errors
         try:
             # Navigate to the login URL with a random delay before starting
-            time.sleep(random.uniform(1.0, 2.0))
+            self.pace(random.uniform(1.0, 2.0))
+            # The login page carries the image captcha, so let images through
+            self.browser_manager.unblock_for_captcha()
             logger.info(f"Navigating to login page: {self.login_url}")
             self.driver.get(self.login_url)
             
-            # Random delay after page load to simulate reading the page
-            time.sleep(random.uniform(2.0, 4.0))
+            # Wait for the DOM and the email inputs instead of sleeping a fixed time
+            try:
+                WebDriverWait(self.driver, 15).until(
+                    lambda d: d.execute_script("return document.readyState") in ('interactive', 'complete'))
+                WebDriverWait(self.driver, 15).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, "input[type='text'], input[type='email']")))
+            except TimeoutException:
+                logger.warning("Timed out waiting for login form inputs, continuing with selector search")
             
             # STEP 1: Handle Email Entry Page
             logger.info("Step 1: Looking for email input field...")
             logger.info(f"Current URL: {self.driver.current_url}")
             logger.info(f"Page title: {self.driver.title}")
             
-            # Wait a bit more for the page to fully load
-            time.sleep(random.uniform(2.0, 3.0))
-            
             # Debug: Log all input fields on the page
             try:
-                all_inputs = self.driver.find_elements(By.XPATH, "//input")
+                all_inputs = self.driver.execute_script(JS_DESCRIBE_INPUTS) or []
                 logger.info(f"Found {len(all_inputs)} total input fields on the page")
                 for i, inp in enumerate(all_inputs):
-                    inp_id = inp.get_attribute('id') or 'no-id'
-                    inp_name = inp.get_attribute('name') or 'no-name'
-                    inp_type = inp.get_attribute('type') or 'no-type'
-                    inp_class = inp.get_attribute('class') or 'no-class'
-                    inp_placeholder = inp.get_attribute('placeholder') or 'no-placeholder'
-                    is_displayed = inp.is_displayed()
-                    is_enabled = inp.is_enabled()
-                    logger.info(f"Input {i+1}: id='{inp_id}', name='{inp_name}', type='{inp_type}', class='{inp_class}', placeholder='{inp_placeholder}', displayed={is_displayed}, enabled={is_enabled}")
+                    inp_id = inp.get('id') or 'no-id'
+                    inp_name = inp.get('name') or 'no-name'
+                    inp_type = inp.get('type') or 'no-type'
+                    inp_class = inp.get('cls') or 'no-class'
+                    inp_placeholder = inp.get('placeholder') or 'no-placeholder'
+                    is_displayed = inp.get('displayed')
+                    is_enabled = inp.get('enabled')
+                    # Deferred formatting: skipped entirely unless DEBUG is enabled
+                    logger.debug("Input {}: id='{}', name='{}', type='{}', class='{}', placeholder='{}', displayed={}, enabled={}",
+                                 i + 1, inp_id, inp_name, inp_type, inp_class, inp_placeholder, is_displayed, is_enabled)
             except Exception as e:
                 logger.warning(f"Could not debug input fields: {str(e)}")
             
             # Look for email input fields with comprehensive selectors
             # The website has multiple disabled email fields as anti-bot protection
             # We need to find the one that gets enabled by JavaScript
-            email_selectors = [
-                # Specific selectors for this website's email fields
-                "//label[contains(text(), 'Email')]/following-sibling::input[@type='text']",
-                "//label[contains(text(), 'Email')]/..//input[@type='text']",
-                "//input[@type='text' and contains(@class, 'form-control')]",
-                
-                # Standard email selectors
-                "//input[@type='email']",
-                "//input[contains(@id, 'email') or contains(@name, 'email')]",
-                "//input[contains(@placeholder, 'email') or contains(@placeholder, 'Email')]",
-                
-                # Text inputs that might be email fields
-                "//input[@type='text']",
-                
-                # ID-based selectors for common patterns
-                "//input[contains(@id, 'user') or contains(@name, 'user')]",
-                "//input[contains(@id, 'login') or contains(@name, 'login')]",
-                "//input[contains(@id, 'username') or contains(@name, 'username')]",
-                
-                # Class-based selectors
-                "//input[contains(@class, 'email')]",
-                "//input[contains(@class, 'user')]",
-                "//input[contains(@class, 'login')]",
-                
-                # Generic form control inputs
-                "//div[contains(@class, 'form-group')]//input[@type='text']",
-                "//div[contains(@class, 'input-group')]//input[@type='text']"
-            ]
+            email_selectors = list(EMAIL_SELECTORS)
             
             # The website uses anti-bot protection with multiple disabled email fields
             # We need to wait for JavaScript to enable one of them and then use it
             email_field = None
             
+            # Try the selector that matched on a previous attempt first
+            if self._last_email_selector in email_selectors:
+                email_selectors.remove(self._last_email_selector)
+                email_selectors.insert(0, self._last_email_selector)
+            
             # First, try to find an enabled email field
             for i, selector in enumerate(email_selectors):
                 try:
@@ -177,6 +445,7 @@ class LoginHandler:
                                     'hidden' not in class_attr.lower() and 
                                     'display: none' not in style_attr.lower()):
                                     email_field = field
+                                    self._last_email_selector = selector
                                     logger.info(f"✅ Found enabled email field with ID: '{field_id}' using selector: {selector}")
                                     break
                         except Exception as field_err:
@@ -215,7 +484,7 @@ class LoginHandler:
                                     """, input_field)
                                     
                                     # Check if it's now enabled
-                                    if input_field.is_displayed() and input_field.is_enabled():
+                                    if self._visible_and_enabled(input_field):
                                         email_field = input_field
                                         logger.info(f"✅ Successfully enabled email field with ID: {label_for}")
                                         break
@@ -228,7 +497,7 @@ class LoginHandler:
                     if not email_field:
                         logger.info("Still no email field found, trying more aggressive JavaScript approach...")
                         # Try to enable all input fields
-                        input_fields = self.driver.find_elements(By.XPATH, "//input[@type='text' or @type='email']")
+                        input_fields = self.driver.find_elements(By.CSS_SELECTOR, "input[type='text'], input[type='email']")
                         for input_field in input_fields:
                             try:
                                 self.driver.execute_script("""
@@ -241,7 +510,7 @@ class LoginHandler:
                                 """, input_field)
                                 
                                 # Check if it's now enabled
-                                if input_field.is_displayed() and input_field.is_enabled():
+                                if self._visible_and_enabled(input_field):
                                     email_field = input_field
                                     logger.info(f"✅ Successfully enabled input field with ID: {input_field.get_attribute('id')}")
                                     break
@@ -253,49 +522,21 @@ class LoginHandler:
             # If we still don't have an email field, take a screenshot and raise an error
             if not email_field:
                 logger.error("❌ Could not find a usable email input field")
-                # Take a screenshot for debugging
-                screenshot_path = os.path.join('data', 'debug', f'login_error_no_email_field_{int(time.time())}.html')
-                os.makedirs(os.path.dirname(screenshot_path), exist_ok=True)
-                with open(screenshot_path, 'w', encoding='utf-8') as f:
-                    f.write(self.driver.page_source)
-                logger.info(f"Saved page source to {screenshot_path}")
-                
-                # Take a screenshot image as well
-                screenshot_img_path = os.path.join('data', 'screenshots', f'login_error_no_email_field_{int(time.time())}.png')
-                os.makedirs(os.path.dirname(screenshot_img_path), exist_ok=True)
-                self.driver.save_screenshot(screenshot_img_path)
-                logger.info(f"Saved screenshot to {screenshot_img_path}")
+                # Save page source and screenshot for debugging
+                self._save_debug_info('no_email_field')
                 
                 raise Exception("Could not find a usable email input field")
             
             # Enter email with human-like typing
             logger.info(f"Entering email: {self.user_id}")
-            self.browser_manager.move_to_element_with_randomness(email_field)
-            self.browser_manager.human_like_typing(email_field, self.user_id)
+            self.browser_manager.humanized_type(email_field, self.user_id)
             
             # Look for the "Continue" or "Next" button
-            continue_button_selectors = [
-                "//button[contains(text(), 'Continue') or contains(text(), 'continue') or contains(text(), 'Next') or contains(text(), 'next')]",
-                "//input[@type='submit' and (contains(@value, 'Continue') or contains(@value, 'continue') or contains(@value, 'Next') or contains(@value, 'next'))]",
-                "//a[contains(text(), 'Continue') or contains(text(), 'continue') or contains(text(), 'Next') or contains(text(), 'next')]",
-                "//button[@type='submit']",
-                "//input[@type='submit']",
-                "//button[contains(@class, 'btn-primary') or contains(@class, 'primary')]"
-            ]
+            continue_button_selectors = CONTINUE_BUTTON_SELECTORS
             
-            continue_button = None
-            for selector in continue_button_selectors:
-                try:
-                    buttons = self.driver.find_elements(By.XPATH, selector)
-                    for button in buttons:
-                        if button.is_displayed() and button.is_enabled():
-                            continue_button = button
-                            logger.info(f"Found continue button with text: {button.text}")
-                            break
-                    if continue_button:
-                        break
-                except Exception as e:
-                    logger.debug(f"Error with continue button selector {selector}: {str(e)}")
+            continue_button = self._find_first_clickable(continue_button_selectors)
+            if continue_button:
+                logger.info(f"Found continue button with text: {continue_button.text}")
             
             # If we found a continue button, click it
             if continue_button:
@@ -304,7 +545,7 @@ class LoginHandler:
                 continue_button.click()
                 
                 # Wait for the password field to appear
-                time.sleep(random.uniform(2.0, 4.0))
+                self.pace(random.uniform(2.0, 4.0))
             else:
                 # If there's no continue button, we might be on a single-page login form
                 # Look for the password field directly
@@ -314,12 +555,7 @@ class LoginHandler:
             logger.info("Step 2: Looking for password input field...")
             
             # Look for password field with dynamic IDs
-            password_selectors = [
-                "//input[@type='password' and contains(@class, 'form-control')]",
-                "//input[@type='password']",
-                "//label[contains(text(), 'Password')]/following-sibling::input",
-                "//label[contains(text(), 'Password')]/..//input[@type='password']"
-            ]
+            password_selectors = PASSWORD_XPATHS
             
             # First try in the main document
             password_field = self._find_password_field_in_context(password_selectors)
@@ -333,12 +569,19 @@ class LoginHandler:
                     self.driver.switch_to.default_content()
                     
                     # Find all iframes
-                    iframes = self.driver.find_elements(By.TAG_NAME, "iframe")
+                    iframes = self._get_iframes()
                     logger.debug(f"Found {len(iframes)} iframes to check")
                     
-                    for idx, iframe in enumerate(iframes):
+                    for idx in range(len(iframes)):
                         try:
-                            self.driver.switch_to.frame(iframe)
+                            try:
+                                self.driver.switch_to.frame(iframes[idx])
+                            except StaleElementReferenceException:
+                                # Frames were re-rendered since the cached lookup
+                                iframes = self._get_iframes(refresh=True)
+                                if idx >= len(iframes):
+                                    break
+                                self.driver.switch_to.frame(iframes[idx])
                             logger.debug(f"Switched to iframe #{idx}")
                             
                             # Try to find password field in this iframe
@@ -364,53 +607,30 @@ class LoginHandler:
             # If we still don't have a password field, take a screenshot and raise an error
             if not password_field:
                 logger.error("❌ Could not find a usable password input field")
-                # Take a screenshot for debugging
-                screenshot_path = os.path.join('data', 'debug', f'login_error_no_password_field_{int(time.time())}.html')
-                os.makedirs(os.path.dirname(screenshot_path), exist_ok=True)
-                with open(screenshot_path, 'w', encoding='utf-8') as f:
-                    f.write(self.driver.page_source)
-                logger.info(f"Saved page source to {screenshot_path}")
-                
-                # Take a screenshot image as well
-                screenshot_img_path = os.path.join('data', 'screenshots', f'login_error_no_password_field_{int(time.time())}.png')
-                os.makedirs(os.path.dirname(screenshot_img_path), exist_ok=True)
-                self.driver.save_screenshot(screenshot_img_path)
-                logger.info(f"Saved screenshot to {screenshot_img_path}")
+                # Save page source and screenshot for debugging
+                self._save_debug_info('no_password_field')
                 
                 raise Exception("Could not find a usable password input field")
             
+            self._password_field = password_field
+            
             # Enter password with human-like typing
             logger.info("Entering password")
-            self.browser_manager.move_to_element_with_randomness(password_field)
-            self.browser_manager.human_like_typing(password_field, self.user_password)
+            self.browser_manager.humanized_type(password_field, self.user_password)
             
             # Look for the login button
-            login_button_selectors = [
-                "//button[contains(text(), 'Login') or contains(text(), 'login') or contains(text(), 'Sign in') or contains(text(), 'sign in')]",
-                "//input[@type='submit' and (contains(@value, 'Login') or contains(@value, 'login') or contains(@value, 'Sign in') or contains(@value, 'sign in'))]",
-                "//button[@type='submit']",
-                "//input[@type='submit']",
-                "//button[contains(@class, 'btn-primary') or contains(@class, 'primary')]"
-            ]
+            login_button_selectors = LOGIN_BUTTON_SELECTORS
             
-            login_button = None
-            for selector in login_button_selectors:
-                try:
-                    buttons = self.driver.find_elements(By.XPATH, selector)
-                    for button in buttons:
-                        if button.is_displayed() and button.is_enabled():
-                            login_button = button
-                            logger.info(f"Found login button with text: {button.text}")
-                            break
-                    if login_button:
-                        break
-                except Exception as e:
-                    logger.debug(f"Error with login button selector {selector}: {str(e)}")
+            login_button = self._find_first_clickable(login_button_selectors)
+            if login_button:
+                logger.info(f"Found login button with text: {login_button.text}")
             
             # If we found a login button, click it
             if login_button:
                 logger.info("Clicking login button")
                 self.browser_manager.move_to_element_with_randomness(login_button)
+                pre_url = self._current_url()
+                pre_handles = set(self.driver.window_handles)
                 login_button.click()
                 
                 # Handle potential alert about incorrect captcha boxes
@@ -426,7 +646,7 @@ class LoginHandler:
                         if not solve_captcha(self.driver, self.captcha_api_key):
                             logger.error("Retry captcha failed after alert")
                         # Give page time to reload captcha elements
-                        time.sleep(random.uniform(2.0, 4.0))
+                        self.pace(random.uniform(2.0, 4.0))
                         # Continue loop to retry login automatically
                     else:
                         logger.info(f"Other alert detected: {alert_text}")
@@ -435,39 +655,32 @@ class LoginHandler:
                     # No alert present
                     pass
                 
-                # Wait for the login process to complete
-                time.sleep(random.uniform(3.0, 5.0))
+                # Wait for the login process to complete; a captcha keeps us on the same page
+                self._wait_for_post_submit(pre_url, pre_handles, timeout=5)
             else:
                 logger.error("❌ Could not find a login button")
-                # Take a screenshot for debugging
-                screenshot_path = os.path.join('data', 'debug', f'login_error_no_login_button_{int(time.time())}.html')
-                os.makedirs(os.path.dirname(screenshot_path), exist_ok=True)
-                with open(screenshot_path, 'w', encoding='utf-8') as f:
-                    f.write(self.driver.page_source)
-                logger.info(f"Saved page source to {screenshot_path}")
-                
-                # Take a screenshot image as well
-                screenshot_img_path = os.path.join('data', 'screenshots', f'login_error_no_login_button_{int(time.time())}.png')
-                os.makedirs(os.path.dirname(screenshot_img_path), exist_ok=True)
-                self.driver.save_screenshot(screenshot_img_path)
-                logger.info(f"Saved screenshot to {screenshot_img_path}")
+                # Save page source and screenshot for debugging
+                self._save_debug_info('no_login_button')
                 
                 raise Exception("Could not find a login button")
             
             # Check for captcha
-            captcha_attempts = 0
-            while captcha_attempts < self.max_captcha_attempts:
-                # Check if we're still on the login page
-                if self.is_login_page(self.driver.current_url):
+            for attempt in range(1, self.max_captcha_attempts + 1):
+                # Check if we're still on the login page; retyping the password does not navigate,
+                # so this URL also serves as the pre-submit reference below
+                current_url = self._current_url()
+                if self.is_login_page(current_url):
                     # Check for captcha
-                    logger.info("Still on login page, checking for captcha...")
+                    logger.info(f"Still on login page, checking for captcha (attempt {attempt}/{self.max_captcha_attempts})...")
                     # Ensure password is typed before next captcha attempt
                     self._retype_password()
+                    pre_url = current_url
+                    pre_handles = set(self.driver.window_handles)
                     
                     # Solve captcha if present
                     if solve_captcha(self.driver, self.captcha_api_key):
                         logger.info("Captcha solved, waiting for page to load...")
-                        time.sleep(random.uniform(3.0, 5.0))
+                        self._wait_for_post_submit(pre_url, pre_handles, timeout=POST_CAPTCHA_WAIT, stop_on_captcha_retry=True)
                     else:
                         # If captcha solving failed, retry with password retyping
                         logger.warning("Captcha solving failed, retrying with password retyping...")
@@ -475,77 +688,47 @@ class LoginHandler:
                             # Try to solve captcha again
                             if solve_captcha(self.driver, self.captcha_api_key):
                                 logger.info("Captcha solved after password retyping, waiting for page to load...")
-                                time.sleep(random.uniform(3.0, 5.0))
+                                self._wait_for_post_submit(pre_url, pre_handles, timeout=POST_CAPTCHA_WAIT, stop_on_captcha_retry=True)
                             else:
                                 logger.warning("Captcha solving failed again after password retyping")
                         else:
                             logger.warning("Password retyping failed")
-                    
-                    captcha_attempts += 1
                 else:
                     # We're no longer on the login page, login might be successful
                     logger.info("No longer on login page, login might be successful")
                     break
             
             # Check if login was successful
-            if self.is_login_page(self.driver.current_url):
+            if not self._wait_for_login_success():
                 logger.error("❌ Login failed, still on login page after multiple attempts")
-                # Take a screenshot for debugging
-                screenshot_path = os.path.join('data', 'debug', f'login_error_login_error_max_captcha_attempts_{int(time.time())}.html')
-                os.makedirs(os.path.dirname(screenshot_path), exist_ok=True)
-                with open(screenshot_path, 'w', encoding='utf-8') as f:
-                    f.write(self.driver.page_source)
-                logger.info(f"Saved page source to {screenshot_path}")
-                
-                # Take a screenshot image as well
-                screenshot_img_path = os.path.join('data', 'screenshots', f'login_error_login_error_max_captcha_attempts_{int(time.time())}.png')
-                os.makedirs(os.path.dirname(screenshot_img_path), exist_ok=True)
-                self.driver.save_screenshot(screenshot_img_path)
-                logger.info(f"Saved screenshot to {screenshot_img_path}")
+                # Save page source and screenshot for debugging
+                self._save_debug_info('login_error_max_captcha_attempts')
                 
                 # Detect error redirect and retry full login automatically
-                if "err=" in self.driver.current_url.lower():
+                if "err=" in self._current_url().lower():
                     logger.warning("Detected error login redirect (err=). Retrying full login flow …")
-                    time.sleep(random.uniform(1.0, 2.0))
+                    self.pace(random.uniform(1.0, 2.0))
                     # Navigate fresh to login page before retrying
                     self.driver.get(self.login_url)
                     return self.login()
                 return False
             
             logger.info("✅ Login successful")
+            self.save_login_cookies()
+            self.browser_manager.reblock_resources()
             # Reset counter on success so future logins start fresh
             self._login_attempt_counter = 0
             return True
             
         except TimeoutException as e:
             logger.error(f"Timeout during login: {str(e)}")
-            # Take a screenshot for debugging
-            screenshot_path = os.path.join('data', 'debug', f'login_error_timeout_{int(time.time())}.html')
-            os.makedirs(os.path.dirname(screenshot_path), exist_ok=True)
-            with open(screenshot_path, 'w', encoding='utf-8') as f:
-                f.write(self.driver.page_source)
-            logger.info(f"Saved page source to {screenshot_path}")
-            
-            # Take a screenshot image as well
-            screenshot_img_path = os.path.join('data', 'screenshots', f'login_error_timeout_{int(time.time())}.png')
-            os.makedirs(os.path.dirname(screenshot_img_path), exist_ok=True)
-            self.driver.save_screenshot(screenshot_img_path)
-            logger.info(f"Saved screenshot to {screenshot_img_path}")
+            # Save page source and screenshot for debugging
+            self._save_debug_info('timeout')
             
             return False
         except Exception as e:
             logger.error(f"Error during login: {str(e)}")
-            # Take a screenshot for debugging
-            screenshot_path = os.path.join('data', 'debug', f'login_error_general_error_{int(time.time())}.html')
-            os.makedirs(os.path.dirname(screenshot_path), exist_ok=True)
-            with open(screenshot_path, 'w', encoding='utf-8') as f:
-                f.write(self.driver.page_source)
-            logger.info(f"Saved page source to {screenshot_path}")
-            
-            # Take a screenshot image as well
-            screenshot_img_path = os.path.join('data', 'screenshots', f'login_error_general_error_{int(time.time())}.png')
-            os.makedirs(os.path.dirname(screenshot_img_path), exist_ok=True)
-            self.driver.save_screenshot(screenshot_img_path)
-            logger.info(f"Saved screenshot to {screenshot_img_path}")
+            # Save page source and screenshot for debugging
+            self._save_debug_info('general_error')
             
             return False
\ No newline at end of file
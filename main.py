@@ -21,7 +21,7 @@ from config import BOT_CONFIG, validate_config
 from backend.captcha.captcha_utils import check_tesseract_installation
 
 # Import bot instance manager
-from visa_bot import get_bot_instance
+from visa_bot import get_bot_instance, run_accounts, stop_all_bots
 
 def check_selenium_chrome_compatibility():
     """
@@ -103,13 +103,20 @@ def main():
         # Check Selenium and Chrome compatibility
         check_selenium_chrome_compatibility()
         
-        # Get bot instance
-        bot = get_bot_instance()
-        
-        # Run the bot
         # For debugging, keep the browser open so we can inspect the page after failures
         keep_browser_open = True
-        result = bot.run(keep_browser_open=keep_browser_open)
+        
+        if BOT_CONFIG["accounts"]:
+            # Poll the main account and every extra account in parallel
+            accounts = [(None, None)] + [
+                account for account in BOT_CONFIG["accounts"] if account[0] != os.getenv("EMAIL")
+            ]
+            results = run_accounts(accounts, keep_browser_open=keep_browser_open)
+            result = all(results)
+        else:
+            # Get bot instance and run the bot
+            bot = get_bot_instance()
+            result = bot.run(keep_browser_open=keep_browser_open)
         
         if result:
             logger.info("Bot execution completed successfully")
@@ -121,8 +128,7 @@ def main():
         logger.info("Bot execution interrupted by user")
         # Ensure browser is closed
         try:
-            bot = get_bot_instance()
-            bot.stop()
+            stop_all_bots()
         except Exception as e:
             logger.error(f"Error stopping bot: {str(e)}")
         return False
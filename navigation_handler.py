@@ -8,15 +8,15 @@ This module handles URL-based navigation and page detection for the Visa Checker
 It includes functions to check current URL, detect page types, and navigate to specific pages.
 """
 
-import os
-import time
-import random
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 from loguru import logger
 
+from config import BOT_CONFIG
+from utils import human_pause, is_login_url
+
 class NavigationHandler:
     """Handles URL-based navigation and page detection for the Visa Checker Bot."""
 
@@ -24,13 +24,12 @@ class NavigationHandler:
         """Initialize the navigation handler."""
         self.driver = driver
         self.login_url = login_url
+        self._login_url = login_url or ""
         self.target_url = target_url
 
     def is_login_page(self, url):
         """Check if the given URL is a login page."""
-        return ("login" in url.lower() or 
-                "signin" in url.lower() or 
-                self.login_url in url)
+        return is_login_url(url, self._login_url)
 
     def is_dashboard_page(self, url):
         """Check if the given URL is a dashboard/post-login page."""
@@ -54,7 +53,7 @@ class NavigationHandler:
                 captcha_type = captcha_utils.is_captcha_present(self.driver)
                 if captcha_type:
                     logger.info(f"Detected captcha page with type: {captcha_type}, solving captcha")
-                    solved = captcha_utils.solve_captcha(self.driver, os.getenv("CAPTCHA_API_KEY"))
+                    solved = captcha_utils.solve_captcha(self.driver, BOT_CONFIG["captcha_api_key"])
                     if solved:
                         logger.info("Captcha solved successfully")
                         return True
@@ -76,7 +75,7 @@ class NavigationHandler:
                 captcha_type = captcha_utils.is_captcha_present(self.driver)
                 if captcha_type:
                     logger.info(f"Detected captcha page after navigation with type: {captcha_type}, solving captcha")
-                    solved = captcha_utils.solve_captcha(self.driver, os.getenv("CAPTCHA_API_KEY"))
+                    solved = captcha_utils.solve_captcha(self.driver, BOT_CONFIG["captcha_api_key"])
                     if solved:
                         logger.info("Captcha solved successfully after navigation")
                         return True
@@ -103,7 +102,7 @@ class NavigationHandler:
             self.driver.get(self.target_url)
             
             # Add a random delay to simulate human behavior
-            time.sleep(random.uniform(3.0, 5.0))
+            human_pause("page")
             
             # Check if the page has loaded
             try:
@@ -130,7 +129,7 @@ class NavigationHandler:
             self.driver.get(self.login_url)
             
             # Add a random delay to simulate human behavior
-            time.sleep(random.uniform(3.0, 5.0))
+            human_pause("page")
             
             # Check if the page has loaded
             try:
@@ -8,16 +8,107 @@ This module provides common utility functions for the Visa Checker Bot.
 """
 
 import os
+import re
 import json
 import time
 import random
 import string
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 from loguru import logger
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
 
 # Import configuration
-from config import DATA_DIR, SCREENSHOTS_DIR, SCRAPED_DATA_DIR
+from config import DATA_DIR, SCREENSHOTS_DIR, SCRAPED_DATA_DIR, BOT_CONFIG
+
+# Substrings that mark a sign-in URL, matched case-insensitively
+LOGIN_URL_RE = re.compile(r"login|signin", re.IGNORECASE)
+
+@lru_cache(maxsize=128)
+def is_login_url(url, login_url=""):
+    """Return True if the URL looks like a sign-in page or contains the configured login URL.
+    Cached per (url, login_url) because every handler polls it with the same few URLs."""
+    return bool(LOGIN_URL_RE.search(url)) or (bool(login_url) and login_url in url)
+
+# Sets an input's value and fires the input/change events frameworks listen for
+JS_SET_VALUE = """
+const el = arguments[0];
+// Native prototype setter, so React/masked inputs register the change like typed input
+const setter = Object.getOwnPropertyDescriptor(Object.getPrototypeOf(el), 'value').set;
+setter.call(el, arguments[1]);
+el.dispatchEvent(new Event('input', {bubbles: true}));
+el.dispatchEvent(new Event('change', {bubbles: true}));
+"""
+
+def fast_set_value(driver, element, text):
+    """Fill an input in a single script call instead of one send_keys per character."""
+    driver.execute_script(JS_SET_VALUE, element, text)
+
+# XPaths for the password input, most specific first
+PASSWORD_XPATHS = (
+    "//input[@type='password' and contains(@class, 'form-control')]",
+    "//input[@type='password']",
+    "//label[contains(text(), 'Password')]/following-sibling::input",
+    "//label[contains(text(), 'Password')]/..//input[@type='password']",
+)
+
+# Evaluates a list of XPaths in-page and returns [element, selector index] for the
+# first visible match (skipping disabled elements when arguments[1] is true), or null
+JS_FIRST_USABLE = """
+const sels = arguments[0], needEnabled = arguments[1];
+for (let k = 0; k < sels.length; k++) {
+    const snap = document.evaluate(sels[k], document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    for (let i = 0; i < snap.snapshotLength; i++) {
+        const el = snap.snapshotItem(i);
+        if ((el.offsetWidth || el.offsetHeight || el.getClientRects().length)
+                && getComputedStyle(el).visibility !== 'hidden' && !(needEnabled && el.disabled)) {
+            return [el, k];
+        }
+    }
+}
+return null;
+"""
+
+def find_first_usable(driver, selectors, require_enabled=True):
+    """Return (element, selector) for the first visible match across the XPaths in one script call, or (None, None)."""
+    selectors = list(selectors)
+    found = driver.execute_script(JS_FIRST_USABLE, selectors, require_enabled)
+    if not found:
+        return None, None
+    return found[0], selectors[found[1]]
+
+# Named (min, max) ranges for the recurring human-like pauses
+HUMAN_PAUSES = {
+    "tiny": (0.1, 0.3),    # between scroll steps
+    "short": (0.5, 1.0),   # after a scroll or click settles
+    "read": (1.0, 3.0),    # looking at a page before acting
+    "page": (3.0, 5.0),    # after a full navigation
+}
+
+def human_sleep(min_seconds, max_seconds):
+    """Pause for a human-like interval, scaled by STEALTH_LEVEL and SPEED_MODE.
+    0 skips the pause, 1 waits a tenth of the minimum, 2 waits the full random interval."""
+    level = BOT_CONFIG["stealth_level"]
+    scale = BOT_CONFIG["speed_mode"]
+    if level <= 0 or scale <= 0:
+        return
+    if level == 1:
+        time.sleep(min_seconds * 0.1 * scale)
+        return
+    time.sleep(random.uniform(min_seconds, max_seconds) * scale)
+
+def file_suffix(account_tag):
+    """Return "_<account_tag>" for output file names, or "" for the primary account, so
+    screenshots and snapshots written by parallel account threads never collide."""
+    return f"_{account_tag}" if account_tag else ""
+
+def human_pause(kind):
+    """human_sleep() over one of the HUMAN_PAUSES ranges."""
+    human_sleep(*HUMAN_PAUSES[kind])
 
 def generate_random_string(length=8):
     """Generate a random string of specified length."""
@@ -160,11 +251,6 @@ def find_all_visible_elements(driver, selectors):
 
 def wait_for_element(driver, selector, timeout=10):
     """Wait for an element to be visible and return it."""
-    from selenium.webdriver.common.by import By
-    from selenium.webdriver.support.ui import WebDriverWait
-    from selenium.webdriver.support import expected_conditions as EC
-    from selenium.common.exceptions import TimeoutException
-    
     try:
         element = WebDriverWait(driver, timeout).until(
             EC.visibility_of_element_located((By.XPATH, selector))
@@ -179,11 +265,6 @@ def wait_for_element(driver, selector, timeout=10):
 
 def wait_for_any_element(driver, selectors, timeout=10):
     """Wait for any of the elements to be visible and return the first one found."""
-    from selenium.webdriver.common.by import By
-    from selenium.webdriver.support.ui import WebDriverWait
-    from selenium.webdriver.support import expected_conditions as EC
-    from selenium.common.exceptions import TimeoutException
-    
     try:
         for selector in selectors:
             try:
@@ -222,11 +303,11 @@ def scroll_to_element(driver, element):
             # Calculate the next scroll position with some randomness
             next_scroll = current_scroll + (scroll_distance * (i + 1) / steps) + random.uniform(-10, 10)
             driver.execute_script(f"window.scrollTo(0, {next_scroll});")
-            time.sleep(random.uniform(0.1, 0.3))
+            human_pause("tiny")
         
         # Final scroll to ensure the element is in view
         driver.execute_script("arguments[0].scrollIntoView({block: 'center', behavior: 'smooth'});", element)
-        time.sleep(random.uniform(0.5, 1.0))
+        human_pause("short")
         
         return True
     except Exception as e:
@@ -9,17 +9,22 @@ for the Visa Checker Bot application.
 """
 
 import os
+import re
 import time
-import random
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from loguru import logger
 from dotenv import load_dotenv
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
 
 # Import all component modules
 from config import BOT_CONFIG
 from browser_manager import BrowserManager
-from login_handler import LoginHandler
+from login_handler import LoginHandler, LOGIN_COOKIES_PATH
 from navigation_handler import NavigationHandler
 from backend.form.form_handler import FormHandler
 from backend.appointment.appointment_handler import AppointmentHandler
@@ -27,17 +32,64 @@ from backend.confirmation.confirmation_handler import ConfirmationHandler
 from backend.error.error_handler import ErrorHandler
 from backend.session.session_handler import SessionHandler
 from backend.captcha.captcha_utils import CaptchaUtils, check_tesseract_installation
+from utils import human_pause
 
 # Import external handlers
 from backend.payment.payment_handler import make_payment
-from backend.email.email_handler import fetch_otp_from_email
+from backend.email.email_handler import fetch_otp_from_email, send_notification
 from backend.post_login.post_login_handler import PostLoginHandler
 
+# OTP step locators (each a union of the field/button variants seen on the site)
+OTP_INPUT_XPATH = (
+    "//input[contains(@placeholder, 'OTP') or contains(@id, 'otp') or contains(@name, 'otp')]"
+    " | //label[contains(text(), 'OTP') or contains(text(), 'One Time Password')]/following::input"
+)
+OTP_SUBMIT_XPATH = (
+    "//button[contains(text(), 'Submit') or contains(text(), 'Verify') or contains(text(), 'Confirm')]"
+    " | //input[@type='submit' or @value='Submit' or @value='Verify' or @value='Confirm']"
+)
+
+# Sends notification emails off the main thread; its worker is joined at interpreter
+# exit, so a send that is still in flight when run() returns is not cut short
+_notify_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="notify")
+
+# Upper bound for the polling interval when failed cycles keep doubling it
+POLL_BACKOFF_CAP_SEC = 900
+
+# In-place re-checks allowed before a cycle must reload the page and check the session
+POLL_FORCE_REFRESH_EVERY = 3
+
+# Containers whose changes can mean a slot opened; the rest of the page (ads, spinners,
+# live widgets) is deliberately not watched
+SLOT_CONTAINER_CSS = (
+    "table[class*='appointment'], table[id*='appointment'], "
+    "div[class*='appointment'], div[id*='appointment'], div[class*='slot']"
+)
+
+# Watches the first container matching arguments[0] with a MutationObserver (re-attaching
+# if the container was replaced) and clears the change flag; returns false if no
+# container is on the page
+JS_WATCH_DOM = """
+const node = document.querySelector(arguments[0]);
+if (!node) return false;
+if (window.__slotWatchNode !== node) {
+    if (window.__slotObserver) window.__slotObserver.disconnect();
+    window.__slotObserver = new MutationObserver(() => { window.__slotSeen = true; });
+    window.__slotObserver.observe(node, {childList: true, subtree: true, characterData: true});
+    window.__slotWatchNode = node;
+}
+window.__slotSeen = false;
+return true;
+"""
+# Returns whether the DOM changed since the last call and clears the flag
+JS_TAKE_DOM_CHANGE = "const s = window.__slotSeen; window.__slotSeen = false; return !!s;"
+
 class VisaCheckerBot:
     """Main bot class that integrates all components for the Visa Checker Bot."""
 
-    def __init__(self):
-        """Initialize the Visa Checker Bot with all necessary components."""
+    def __init__(self, email=None, password=None):
+        """Initialize the Visa Checker Bot with all necessary components.
+        email/password select an account other than the one in EMAIL/PASSWORD."""
         # Load environment variables
         load_dotenv()
         
@@ -55,12 +107,17 @@ class VisaCheckerBot:
         self.post_login_handler = None
         
         # Get configuration from environment variables
-        self.email = os.getenv("EMAIL")
-        self.password = os.getenv("PASSWORD")
+        self.email = email or os.getenv("EMAIL")
+        self.password = password or os.getenv("PASSWORD")
+        # Extra accounts get their own Chrome profile and cookie file; the default keeps the shared ones
+        self.account_tag = "" if self.email == os.getenv("EMAIL") else re.sub(r"\W+", "_", self.email or "")
         self.target_url = os.getenv("TARGET_URL")
         self.login_url = os.getenv("LOGIN_URL")
         self.preferred_date = os.getenv("PREFERRED_DATE")
         self.preferred_time = os.getenv("PREFERRED_TIME")
+        self.polling_enabled = os.getenv("POLLING_ENABLED", "true").lower() in ("1","true","yes")
+        self.poll_interval = int(os.getenv("POLLING_INTERVAL_SEC", "120"))
+        self.notify_email = os.getenv("NOTIFY_EMAIL")
         
         # Validate required environment variables
         if not all([self.email, self.password, self.target_url, self.login_url]):
@@ -75,15 +132,25 @@ class VisaCheckerBot:
     def initialize(self):
         """Initialize all components of the bot."""
         try:
+            # A previous run kept the browser open and it is still alive – reuse it
+            # (and the handlers bound to it) instead of cold-starting Chrome again;
+            # login() then skips the login flow while that session is still signed in
+            if self.post_login_handler is not None and self.is_driver_alive():
+                logger.info("Reusing the live browser session")
+                return True
+            
             logger.info("Initializing Visa Checker Bot")
             
             # Initialize browser manager and get driver
-            self.browser_manager = BrowserManager()
+            self.browser_manager = BrowserManager(profile_suffix=self.account_tag)
             self.driver = self.browser_manager.setup_browser()
             
             # Initialize all handlers with the driver and necessary dependencies
             self.navigation_handler = NavigationHandler(self.driver, BOT_CONFIG['login_url'], BOT_CONFIG['target_url'])
-            self.login_handler = LoginHandler(self.driver, self.browser_manager, BOT_CONFIG['email'], BOT_CONFIG['password'], BOT_CONFIG['login_url'], BOT_CONFIG['captcha_api_key'])
+            cookies_path = LOGIN_COOKIES_PATH
+            if self.account_tag:
+                cookies_path = cookies_path.replace(".json", f"_{self.account_tag}.json")
+            self.login_handler = LoginHandler(self.driver, self.browser_manager, self.email, self.password, BOT_CONFIG['login_url'], BOT_CONFIG['captcha_api_key'], cookies_path)
             self.captcha_utils = CaptchaUtils(self.driver, self.browser_manager)
             self.form_handler = FormHandler(self.driver, self.browser_manager)
             self.appointment_handler = AppointmentHandler(self.driver, self.browser_manager, BOT_CONFIG['target_url'])
@@ -99,18 +166,36 @@ class VisaCheckerBot:
             traceback.print_exc()
             return False
 
+    def is_driver_alive(self):
+        """Cheap liveness probe for the current WebDriver session."""
+        if self.driver is None:
+            return False
+        try:
+            _ = self.driver.title
+            return True
+        except Exception:
+            return False
+
     def login(self):
         """Log in to the visa application website."""
         try:
             logger.info("Logging in to the visa application website")
             
-            # Navigate to the login page
-            if not self.navigation_handler.navigate_to_login():
-                logger.error("Failed to navigate to login page")
-                return False
+            # A reused browser that is still signed in needs neither the login flow
+            # nor a cookie replay
+            if self.login_handler.is_logged_in():
+                logger.info("Browser session is still logged in, skipping login")
+                self.browser_manager.reblock_resources()
+                return True
+            
+            # Skip the login flow when the cookies from the last run are still valid
+            if self.login_handler.try_resume_session(self.target_url):
+                self.browser_manager.reblock_resources()
+                return True
             
             # Perform login
-            # LoginHandler already has credentials, simply call login()
+            # LoginHandler already has credentials and navigates to the login URL itself with
+            # driver.get(), so no separate pre-navigation is needed here
             login_success = self.login_handler.login()
             
             # Handle post-login actions if login was successful
@@ -156,6 +241,25 @@ class VisaCheckerBot:
             traceback.print_exc()
             return False
 
+    def _wait_for_dom_change(self, timeout):
+        """Wait up to timeout seconds for the slot container to change; True if it did."""
+        try:
+            if not self.driver.execute_script(JS_WATCH_DOM, SLOT_CONTAINER_CSS):
+                # Nothing slot-related to watch on this page – plain wait
+                time.sleep(timeout)
+                return False
+            WebDriverWait(self.driver, timeout, poll_frequency=2).until(
+                lambda d: d.execute_script(JS_TAKE_DOM_CHANGE)
+            )
+            return True
+        except TimeoutException:
+            return False
+        except Exception as e:
+            # Could not watch the page – fall back to a plain wait
+            logger.debug(f"DOM change watch unavailable: {str(e)}")
+            time.sleep(timeout)
+            return False
+
     def select_appointment(self):
         """Select an available appointment."""
         try:
@@ -226,11 +330,12 @@ class VisaCheckerBot:
         try:
             logger.info("Handling OTP verification")
             
-            # Check if OTP input is present
-            otp_input = self.driver.find_elements("xpath", "//input[contains(@placeholder, 'OTP') or contains(@id, 'otp') or contains(@name, 'otp')]") or \
-                       self.driver.find_elements("xpath", "//label[contains(text(), 'OTP') or contains(text(), 'One Time Password')]/following::input")
-            
-            if not otp_input:
+            # Check if OTP input is present (give the field a moment to render)
+            try:
+                otp_input = WebDriverWait(self.driver, 5, poll_frequency=0.2).until(
+                    EC.presence_of_element_located((By.XPATH, OTP_INPUT_XPATH))
+                )
+            except TimeoutException:
                 logger.info("No OTP input field found")
                 return True  # No OTP required, consider it handled
             
@@ -242,20 +347,29 @@ class VisaCheckerBot:
                 return False
             
             # Enter OTP with human-like typing
-            otp_input = otp_input[0]
             self.browser_manager.human_like_typing(otp_input, otp)
             
             # Look for submit button
-            submit_button = self.driver.find_elements("xpath", "//button[contains(text(), 'Submit') or contains(text(), 'Verify') or contains(text(), 'Confirm')]") or \
-                           self.driver.find_elements("xpath", "//input[@type='submit' or @value='Submit' or @value='Verify' or @value='Confirm']")
+            try:
+                submit_button = WebDriverWait(self.driver, 5, poll_frequency=0.2).until(
+                    EC.element_to_be_clickable((By.XPATH, OTP_SUBMIT_XPATH))
+                )
+            except TimeoutException:
+                submit_button = None
             
             if submit_button:
                 # Move to the button with randomness and click
-                self.browser_manager.move_to_element_with_randomness(submit_button[0])
-                submit_button[0].click()
+                self.browser_manager.move_to_element_with_randomness(submit_button)
+                current_url = self.driver.current_url
+                submit_button.click()
                 
-                # Wait for processing
-                time.sleep(random.uniform(3.0, 5.0))
+                # Wait for processing: the page navigates or the OTP field goes away
+                try:
+                    WebDriverWait(self.driver, 10, poll_frequency=0.2).until(
+                        lambda d: d.current_url != current_url or EC.staleness_of(otp_input)(d)
+                    )
+                except TimeoutException:
+                    logger.debug("No navigation detected within 10s after submitting OTP")
             
             logger.info("OTP handled successfully")
             return True
@@ -274,10 +388,7 @@ class VisaCheckerBot:
                 logger.error("Not on a confirmation page")
                 return False
             
-            # Scrape confirmation data
-            confirmation_data = self.confirmation_handler.scrape_confirmation_data()
-            
-            # Complete the application
+            # Complete the application (this also scrapes and saves the confirmation data)
             completed = self.confirmation_handler.complete_application()
             
             if completed:
@@ -356,8 +467,9 @@ class VisaCheckerBot:
         try:
             logger.info("Checking current URL and taking appropriate action")
             
-            # Use the appointment handler's method to check URL and act
-            action_taken = self.appointment_handler.check_current_url_and_act()
+            # Use the appointment handler's method to check URL and act; going through
+            # its cache lets the availability check that follows reuse this result
+            action_taken = self.appointment_handler.check_url_cached()
             
             if action_taken:
                 logger.info("Action taken based on current URL")
@@ -381,7 +493,7 @@ class VisaCheckerBot:
                 return False
             
             # Add a human-like delay before starting
-            time.sleep(random.uniform(1.0, 3.0))
+            human_pause("read")
             
             # Log in to the website
             if not self.login():
@@ -392,9 +504,11 @@ class VisaCheckerBot:
             self.check_current_url_and_act()
             
             # ---- Persistent polling for appointment availability ----
-            polling_enabled = os.getenv("POLLING_ENABLED", "true").lower() in ("1","true","yes")
-            poll_interval = int(os.getenv("POLLING_INTERVAL_SEC", "120"))
+            polling_enabled = self.polling_enabled
+            poll_interval = self.poll_interval
 
+            interval = poll_interval
+            in_place_checks = 0
             while True:
                 if self.check_appointment_availability():
                     logger.info("Appointments appear to be available – proceeding with booking flow")
@@ -403,23 +517,33 @@ class VisaCheckerBot:
                     if not polling_enabled:
                         logger.info("No appointments available and polling disabled – exiting")
                         return True
-                    logger.info(f"No appointments available – will retry in {poll_interval} seconds while staying logged in…")
-                    time.sleep(poll_interval)
-
-                    # Simple session check – if login page detected, re-login
-                    current_url = self.driver.current_url
-                    if "account/login" in current_url.lower():
-                        logger.warning("Session appears logged out, re-logging in …")
-                        if not self.login():
-                            logger.error("Re-login failed while polling – aborting")
-                            return False
-                    else:
-                        # Attempt to navigate back to main or appointments page
-                        try:
-                            self.navigation_handler.go_to_dashboard()
-                        except Exception:
-                            # fallback reload target_url
-                            self.driver.get(self.target_url)
+                    logger.info("No appointments available – will retry in {} seconds while staying logged in…", interval)
+                    if self._wait_for_dom_change(interval) and in_place_checks < POLL_FORCE_REFRESH_EVERY:
+                        # The slot area updated in place – re-check it without reloading
+                        in_place_checks += 1
+                        logger.info("Appointment area changed – re-checking availability now")
+                        continue
+                    in_place_checks = 0
+
+                    try:
+                        # Simple session check – if login page detected, re-login
+                        current_url = self.driver.current_url
+                        if "account/login" in current_url.lower():
+                            logger.warning("Session appears logged out, re-logging in …")
+                            if not self.login():
+                                logger.error("Re-login failed while polling – aborting")
+                                return False
+                        else:
+                            # Attempt to navigate back to main or appointments page
+                            try:
+                                self.navigation_handler.go_to_dashboard()
+                            except Exception:
+                                # fallback reload target_url
+                                self.driver.get(self.target_url)
+                        interval = poll_interval
+                    except Exception as poll_err:
+                        interval = min(interval * 2, POLL_BACKOFF_CAP_SEC)
+                        logger.warning(f"Polling cycle failed ({poll_err}) – backing off to {interval} seconds")
                     # Loop continues
             
             # Select an appointment
@@ -450,18 +574,20 @@ class VisaCheckerBot:
                     logger.error("Failed to complete application")
                     return False
             
-            # Optionally send email notification that appointment flow executed/completed
+            # Optionally send email notification that appointment flow executed/completed.
+            # SMTP does not touch the driver, so the send overlaps the browser teardown
             try:
-                notify_email = os.getenv("NOTIFY_EMAIL")
+                notify_email = self.notify_email
                 if notify_email:
-                    from backend.email.email_handler import send_notification
-                    send_notification(
+                    future = _notify_executor.submit(
+                        send_notification,
                         sender_email=self.email,
                         sender_password=self.password,
                         recipient_email=notify_email,
                         subject="VisaBot – Appointment Found",
                         message="VisaBot has detected an appointment and initiated the booking flow."
                     )
+                    future.add_done_callback(_log_notification_failure)
             except Exception as exc:
                 logger.warning(f"Notification email failed: {exc}")
 
@@ -483,7 +609,7 @@ class VisaCheckerBot:
             
             # Close the browser
             if self.browser_manager and self.driver:
-                self.browser_manager.close_browser(self.driver)
+                self.browser_manager.close_browser()
                 self.driver = None
             
             logger.info("Visa Checker Bot stopped successfully")
@@ -491,12 +617,38 @@ class VisaCheckerBot:
             logger.error(f"Error stopping Visa Checker Bot: {str(e)}")
             traceback.print_exc()
 
-# Singleton instance
-_bot_instance = None
+def _log_notification_failure(future):
+    """Done-callback for background notification sends."""
+    exc = future.exception()
+    if exc is not None:
+        logger.warning(f"Notification email failed: {exc}")
+
+# One bot instance per account, keyed by account email (None = the EMAIL/PASSWORD account)
+_bot_instances = {}
+
+def get_bot_instance(email=None, password=None):
+    """Get or create the VisaCheckerBot instance for an account (default: EMAIL/PASSWORD)."""
+    bot = _bot_instances.get(email)
+    if bot is None:
+        bot = _bot_instances[email] = VisaCheckerBot(email, password)
+    elif bot.driver is not None and not bot.is_driver_alive():
+        # Drop a dead session so run() starts a fresh browser instead of failing on it
+        logger.warning("Cached bot's browser session is no longer alive – discarding it")
+        try:
+            bot.driver.quit()
+        except Exception:
+            pass
+        bot.driver = None
+    return bot
+
+def stop_all_bots():
+    """Stop every bot instance created so far."""
+    for bot in list(_bot_instances.values()):
+        bot.stop()
 
-def get_bot_instance():
-    """Get or create a singleton instance of the VisaCheckerBot."""
-    global _bot_instance
-    if _bot_instance is None:
-        _bot_instance = VisaCheckerBot()
-    return _bot_instance
\ No newline at end of file
+def run_accounts(accounts, keep_browser_open=False):
+    """Run the workflow for several (email, password) accounts in parallel, each bot
+    driving its own browser from its own worker thread. Returns one result per account."""
+    bots = [get_bot_instance(email, password) for email, password in accounts]
+    with ThreadPoolExecutor(max_workers=len(bots), thread_name_prefix="account") as pool:
+        return list(pool.map(lambda bot: bot.run(keep_browser_open=keep_browser_open), bots))
\ No newline at end of file